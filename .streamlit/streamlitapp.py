@@ -458,9 +458,25 @@ import streamlit as st
 from huggingface_hub import InferenceClient
 import requests
 import json
+import os
+import sys
 
 api_key = st.secrets["HUGGINGFACE_API_KEY"]
 client = InferenceClient(api_key=api_key)
+LLM_MODEL = "meta-llama/Llama-3.2-3B-Instruct"
+
+# The LLM answer cache is shared with the recsys API; prompt_cache.py only needs the stdlib
+RECSYS_APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "recsys", "app")
+sys.path.insert(0, RECSYS_APP_DIR)
+from prompt_cache import PromptCache, default_cache_path
+
+
+@st.cache_resource
+def get_prompt_cache():
+    return PromptCache(default_cache_path(RECSYS_APP_DIR))
+
+
+prompt_cache = get_prompt_cache()
 
 # --- Page Configuration ---
 st.set_page_config(page_title="PalmPal", page_icon="🌴", layout="centered")
@@ -753,8 +769,12 @@ def translate_content(text, from_lang, to_lang):
 
         Translation:"""
 
+        cached = prompt_cache.get(LLM_MODEL, 0.3, translation_prompt, namespace="translate")
+        if cached is not None:
+            return cached
+
         response = client.chat_completion(
-            model="meta-llama/Llama-3.2-3B-Instruct",
+            model=LLM_MODEL,
             messages=[{"role": "user", "content": translation_prompt}],
             temperature=0.3,
             max_tokens=300,
@@ -768,6 +788,7 @@ def translate_content(text, from_lang, to_lang):
         if translated_text.startswith('"') and translated_text.endswith('"'):
             translated_text = translated_text[1:-1]
 
+        prompt_cache.set(LLM_MODEL, 0.3, translation_prompt, translated_text)
         return translated_text
 
     except Exception as e:
@@ -883,16 +904,26 @@ def generate_response(user_input):
         messages.append({"role": role, "content": msg["content"]})
     messages.append({"role": "user", "content": user_input})
 
+    # Only an opening question is answered the same way every time; later ones depend on the chat so far
+    cacheable = len(st.session_state.messages) <= 1
+    if cacheable:
+        cached = prompt_cache.get(LLM_MODEL, 0.7, user_input, namespace="streamlit_chat")
+        if cached is not None:
+            return cached
+
     with st.spinner(t['thinking']):
         try:
             response = client.chat_completion(
-                model="meta-llama/Llama-3.2-3B-Instruct",
+                model=LLM_MODEL,
                 messages=messages,
                 temperature=0.7,
                 max_tokens=500,
                 top_p=0.9
             )
-            return response.choices[0].message.content
+            reply = response.choices[0].message.content
+            if cacheable:
+                prompt_cache.set(LLM_MODEL, 0.7, user_input, reply)
+            return reply
         except Exception as e:
             st.error(f"{t['error']}: {str(e)}")
             return t['error']
@@ -1046,3 +1077,6 @@ with st.expander(t["advanced"]):
         st.session_state.similar_products = {}
         st.rerun()
     st.markdown(t["model_info"])
+    for namespace, counts in prompt_cache.stats()["namespaces"].items():
+        if counts["hit_rate"] is not None:
+            st.caption(f"Cache `{namespace}`: {counts['hit_rate']:.0%} hits ({counts['hits']}/{counts['hits'] + counts['misses']})")
@@ -572,3 +572,22 @@ INSERT INTO sale_order_item (id, sale_order_id, product_id, price, quantity) VAL
 --- Should you create more schemas/tables please add prefix to the table name `np25<team_number>_<table_name>` ---
 --- Example: np2501_table_name ---
 --------------------------------
+
+--- Table: np2504_recommendation_feedback ---
+--- Feedback on recommendations, bulk-loaded from the recsys feedback event log ---
+--- with `python -m app.event_log export-postgres` ---
+CREATE TABLE IF NOT EXISTS public.np2504_recommendation_feedback(
+	-- Time the feedback was received, UTC --
+	created_at TIMESTAMPTZ NOT NULL,
+	-- ID of the user giving the feedback, refers to the user of sale_order --
+	user_id VARCHAR NOT NULL,
+	-- ID of the product, refers to product table --
+	product_id VARCHAR NOT NULL,
+	-- ID of the recommendation response the feedback is about, if any --
+	recommendation_id VARCHAR NULL,
+	-- clicked, added_to_cart, purchased or reviewed --
+	action VARCHAR NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS np2504_recommendation_feedback_created_at_idx
+	ON public.np2504_recommendation_feedback (created_at);
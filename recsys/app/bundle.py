@@ -0,0 +1,291 @@
+"""Versioned, memory-mappable model bundles.
+
+A bundle is a directory of raw ``.npy`` arrays plus a ``manifest.json``::
+
+    <root>/<version>/
+        manifest.json
+        user_factors.npy        float32 (n_users, factors), rows in user_encoder order
+        item_factors.npy        float32 (n_items, factors), rows in product_encoder order
+        user_items_data.npy     CSR components of the user x item interaction matrix
+        user_items_indices.npy
+        user_items_indptr.npy
+        user_ids.npy            fixed-width unicode, i.e. user_encoder.classes_
+        product_ids.npy         fixed-width unicode, i.e. product_encoder.classes_
+
+Everything is opened with ``mmap_mode="r"``, so loading is near-instant and
+every worker process on the host shares the same page-cache copy.
+
+Convert the pickles in app/models into a new bundle with:
+
+    python -m app.bundle convert
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pickle
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Optional, Sequence
+
+import numpy as np
+from scipy.sparse import csr_matrix, load_npz
+
+if TYPE_CHECKING:
+    from implicit.cpu.als import AlternatingLeastSquares
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+ARRAYS = (
+    "user_factors",
+    "item_factors",
+    "user_items_data",
+    "user_items_indices",
+    "user_items_indptr",
+    "user_ids",
+    "product_ids",
+)
+
+
+def model_fingerprint(user_factors: np.ndarray, item_factors: np.ndarray) -> str:
+    """Short hash identifying a model's factors; bundles record it in their manifest."""
+    h = hashlib.blake2b(digest_size=16)
+    for factors in (user_factors, item_factors):
+        h.update(str(factors.shape).encode())
+        h.update(np.ascontiguousarray(factors, dtype=np.float32).tobytes())
+    return h.hexdigest()
+
+
+def orient_model(model, n_users: int, n_items: int):
+    """Make model.user_factors/item_factors line up with the user/product encoders.
+
+    Older training notebooks fitted the model on the item-user matrix, which
+    leaves the product factors in ``user_factors`` and vice versa.
+    """
+    if n_users != n_items and model.user_factors.shape[0] == n_items and model.item_factors.shape[0] == n_users:
+        logger.warning("ALS model was fitted on the item-user matrix, swapping user and item factors")
+        model.user_factors, model.item_factors = model.item_factors, model.user_factors
+        model._user_norms, model._item_norms = model._item_norms, model._user_norms
+        # Gramians cached from the old orientation would hand cold-start solves the wrong YtY
+        model._YtY = model._XtX = None
+    return model
+
+
+def bundle_root(base_dir: str) -> str:
+    """Directory holding the bundle versions.
+
+    ``MODEL_BUNDLE_DIR`` wins, then ``$SHARED_DIR/models/bundles`` (the
+    volume shared with the Jupyter service), then ``app/models/bundles``.
+    """
+    if os.environ.get("MODEL_BUNDLE_DIR"):
+        return os.environ["MODEL_BUNDLE_DIR"]
+    if os.environ.get("SHARED_DIR"):
+        return os.path.join(os.environ["SHARED_DIR"], "models", "bundles")
+    return os.path.join(base_dir, "models", "bundles")
+
+
+def latest_bundle(root: str) -> Optional[str]:
+    """Path of the newest complete bundle under ``root``, or None."""
+    if not os.path.isdir(root):
+        return None
+    versions = sorted(
+        name for name in os.listdir(root)
+        if not name.endswith(".tmp") and os.path.isfile(os.path.join(root, name, MANIFEST))
+    )
+    return os.path.join(root, versions[-1]) if versions else None
+
+
+class IdEncoder:
+    """Sorted ids <-> row indices: the part of sklearn's LabelEncoder serving uses.
+
+    Bundles come with these instead of LabelEncoders so that the API never has
+    to import scikit-learn, which takes over a second.
+    """
+
+    def __init__(self, classes: np.ndarray):
+        self.classes_ = classes
+
+    def transform(self, ids: Sequence[str]) -> np.ndarray:
+        ids = np.asarray(ids, dtype=str)
+        idx = np.searchsorted(self.classes_, ids)
+        found = idx < len(self.classes_)
+        found[found] = self.classes_[idx[found]] == ids[found]
+        if not found.all():
+            raise ValueError(f"y contains previously unseen labels: {ids[~found].tolist()}")
+        return idx
+
+    def inverse_transform(self, idx: Sequence[int]) -> np.ndarray:
+        return self.classes_[np.asarray(idx, dtype=np.int64)]
+
+
+@dataclass
+class ModelBundle:
+    version: str
+    manifest: Dict
+    model: "AlternatingLeastSquares"
+    user_encoder: IdEncoder
+    product_encoder: IdEncoder
+    user_items_csr: csr_matrix
+    product_reverse_map: Dict[int, str] = field(repr=False)
+
+
+def load_bundle(path: str, mmap_mode: Optional[str] = "r") -> ModelBundle:
+    """Open the bundle at ``path``, memory-mapping its arrays by default."""
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format {manifest.get('format_version')} at {path}")
+
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAYS}
+
+    from implicit.cpu.als import AlternatingLeastSquares  # slow to import, and only needed here
+
+    # Regularization and alpha matter for fold-in updates (app.fold_in); older bundles lack them
+    model = AlternatingLeastSquares(
+        factors=manifest["factors"],
+        regularization=manifest.get("regularization", 0.01),
+        alpha=manifest.get("alpha", 1.0),
+    )
+    model.user_factors = arrays["user_factors"]
+    model.item_factors = arrays["item_factors"]
+
+    user_items_csr = csr_matrix(
+        (arrays["user_items_data"], arrays["user_items_indices"], arrays["user_items_indptr"]),
+        shape=(manifest["n_users"], manifest["n_items"]),
+        copy=False,
+    )
+    product_ids = arrays["product_ids"]
+
+    return ModelBundle(
+        version=manifest["version"],
+        manifest=manifest,
+        model=model,
+        user_encoder=IdEncoder(arrays["user_ids"]),
+        product_encoder=IdEncoder(product_ids),
+        user_items_csr=user_items_csr,
+        product_reverse_map={i: str(pid) for i, pid in enumerate(product_ids)},
+    )
+
+
+def write_bundle(
+    root: str,
+    user_factors: np.ndarray,
+    item_factors: np.ndarray,
+    user_items_csr,
+    user_ids,
+    product_ids,
+    version: Optional[str] = None,
+    extra: Optional[Dict] = None,
+) -> str:
+    """Write a new bundle version under ``root`` and return its path."""
+    user_ids = np.asarray(user_ids).astype(str)
+    product_ids = np.asarray(product_ids).astype(str)
+    user_items_csr = csr_matrix(user_items_csr)
+    if user_factors.shape[0] != len(user_ids) or item_factors.shape[0] != len(product_ids):
+        raise ValueError(
+            f"Factor shapes {user_factors.shape}/{item_factors.shape} do not match "
+            f"{len(user_ids)} users and {len(product_ids)} products"
+        )
+    if user_items_csr.shape != (len(user_ids), len(product_ids)):
+        raise ValueError(f"Interaction matrix shape {user_items_csr.shape} does not match the id tables")
+
+    version = version or time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+    path = os.path.join(root, version)
+    if os.path.exists(path):
+        raise FileExistsError(f"Bundle version {version} already exists at {path}")
+    tmp_path = path + ".tmp"
+    os.makedirs(tmp_path)
+
+    arrays = {
+        "user_factors": np.ascontiguousarray(user_factors, dtype=np.float32),
+        "item_factors": np.ascontiguousarray(item_factors, dtype=np.float32),
+        "user_items_data": user_items_csr.data.astype(np.float32),
+        "user_items_indices": user_items_csr.indices.astype(np.int32),
+        "user_items_indptr": user_items_csr.indptr.astype(np.int64),
+        "user_ids": user_ids,
+        "product_ids": product_ids,
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "created_at": int(time.time()),
+        "n_users": len(user_ids),
+        "n_items": len(product_ids),
+        "factors": int(user_factors.shape[1]),
+        "nnz": int(user_items_csr.nnz),
+        # Lets readers match derived artifacts (app.topk) without hashing the factors again
+        "model_fingerprint": model_fingerprint(arrays["user_factors"], arrays["item_factors"]),
+        **(extra or {}),
+    }
+    with open(os.path.join(tmp_path, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Readers only pick up directories that contain a manifest, and the rename is atomic
+    os.rename(tmp_path, path)
+    return path
+
+
+def convert_pickles(models_dir: str, root: str, version: Optional[str] = None) -> str:
+    """Convert the legacy pickled model assets in ``models_dir`` into a bundle."""
+    def _load(name):
+        with open(os.path.join(models_dir, name), "rb") as f:
+            return pickle.load(f)
+
+    model = _load("als_model.pkl")
+    user_encoder = _load("user_encoder.pkl")
+    product_encoder = _load("product_encoder.pkl")
+    if os.path.isfile(os.path.join(models_dir, "user_items_csr.pkl")):
+        user_items_csr = _load("user_items_csr.pkl")
+    else:
+        user_items_csr = load_npz(os.path.join(models_dir, "interaction_matrix.npz"))
+
+    model = orient_model(model, len(user_encoder.classes_), len(product_encoder.classes_))
+    return write_bundle(
+        root,
+        model.user_factors,
+        model.item_factors,
+        user_items_csr,
+        user_encoder.classes_,
+        product_encoder.classes_,
+        version=version,
+        extra={
+            "source": "pickles",
+            "regularization": float(getattr(model, "regularization", 0.01)),
+            "alpha": float(getattr(model, "alpha", 1.0)),
+        },
+    )
+
+
+def main():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Manage memory-mapped model bundles.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    convert = sub.add_parser("convert", help="convert the pickled model assets into a new bundle")
+    convert.add_argument("--models-dir", default=os.path.join(base_dir, "models"))
+    convert.add_argument("--out", default=None, help="bundle root (default: see bundle_root())")
+    convert.add_argument("--version", default=None)
+
+    show = sub.add_parser("show", help="print the manifest of the latest bundle")
+    show.add_argument("--root", default=None)
+
+    args = parser.parse_args()
+    if args.command == "convert":
+        path = convert_pickles(args.models_dir, args.out or bundle_root(base_dir), args.version)
+        print(f"Wrote bundle {path}")
+    elif args.command == "show":
+        path = latest_bundle(args.root or bundle_root(base_dir))
+        if path is None:
+            parser.exit(1, "No bundle found\n")
+        with open(os.path.join(path, MANIFEST)) as f:
+            print(f"{path}\n{f.read()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import logging
+import math
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_NAME = "Unknown Product"
+UNKNOWN_TYPE = "Unknown"
+
+
+def normalize_type(product_type) -> str:
+    return str(product_type).strip().lower()
+
+
+class ProductCatalog:
+    """Deduplicated product metadata, indexed by encoded product index.
+
+    Row ``i`` describes the product that the encoder maps to ``i``, so the
+    item ids coming out of the ALS model can be enriched with a plain array
+    lookup instead of a scan over the sales history. Products that appear in
+    the sales data but not in the encoder are appended after the encoded ones.
+    """
+
+    def __init__(
+        self,
+        product_ids: Iterable[str],
+        names: Iterable[Optional[str]],
+        types: Iterable[Optional[str]],
+        prices: Iterable[Optional[float]],
+        n_encoded: Optional[int] = None,
+    ):
+        self.product_ids = np.asarray(list(product_ids), dtype=object)
+        self.names = np.asarray(list(names), dtype=object)
+        self.types = np.asarray(list(types), dtype=object)
+        self.prices = np.asarray(
+            [np.nan if p is None else p for p in prices], dtype=np.float64
+        )
+        self.n_encoded = len(self.product_ids) if n_encoded is None else n_encoded
+        self.index: Dict[str, int] = {pid: i for i, pid in enumerate(self.product_ids)}
+        # Product types as integer codes (case-insensitive), so filter masks compare ints, not strings
+        self.type_code: Dict[str, int] = {}
+        self.type_codes = np.fromiter(
+            (self.type_code.setdefault(normalize_type(t), len(self.type_code)) for t in self.types),
+            dtype=np.int32, count=len(self.types),
+        )
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self.index
+
+    def info(self, idx: int) -> Dict:
+        """Return the product fields for an encoded product index."""
+        price = self.prices[idx]
+        return {
+            "product_id": self.product_ids[idx],
+            "product_name_en": self.names[idx],
+            "price": None if math.isnan(price) else float(price),
+            "product_type": self.types[idx],
+        }
+
+    def info_for_id(self, product_id: str) -> Optional[Dict]:
+        """Return the product fields for a product id, or None if unknown."""
+        idx = self.index.get(product_id)
+        if idx is None:
+            return None
+        return self.info(idx)
+
+
+def _price_column(df: pd.DataFrame) -> Optional[str]:
+    # `product_price` is the current list price of the product, `price` is what
+    # a particular sale line was charged. Prefer the list price when present.
+    for col in ("product_price", "price"):
+        if col in df.columns:
+            return col
+    return None
+
+
+def build_product_catalog(
+    df_sale: Optional[pd.DataFrame],
+    product_ids: Iterable[str],
+) -> ProductCatalog:
+    """Build a ProductCatalog from the sales history.
+
+    ``product_ids`` are the product ids in encoded order (i.e.
+    ``product_encoder.classes_``).
+    """
+    product_ids = [str(pid) for pid in product_ids]
+    n_encoded = len(product_ids)
+
+    if df_sale is None or df_sale.empty or "product_id" not in df_sale.columns:
+        logger.warning("No sales data available, product catalog will only contain ids")
+        return ProductCatalog(
+            product_ids,
+            [UNKNOWN_NAME] * n_encoded,
+            [UNKNOWN_TYPE] * n_encoded,
+            [None] * n_encoded,
+            n_encoded=n_encoded,
+        )
+
+    products = df_sale.drop_duplicates(subset=["product_id"], keep="first").copy()
+    products["product_id"] = products["product_id"].astype(str)
+    products = products.set_index("product_id")
+
+    known = set(product_ids)
+    extra = [pid for pid in products.index if pid not in known]
+    all_ids: List[str] = product_ids + extra
+    products = products.reindex(all_ids)
+
+    def _column(name: str, default):
+        if name not in products.columns:
+            return [default] * len(all_ids)
+        return [default if pd.isna(v) else v for v in products[name].tolist()]
+
+    price_col = _price_column(products)
+    prices = _column(price_col, None) if price_col else [None] * len(all_ids)
+
+    return ProductCatalog(
+        all_ids,
+        _column("product_name_en", UNKNOWN_NAME),
+        _column("product_type", UNKNOWN_TYPE),
+        prices,
+        n_encoded=n_encoded,
+    )
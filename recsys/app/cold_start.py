@@ -0,0 +1,248 @@
+"""Recommendations for users the model was not trained on.
+
+A new user's factor is the ALS least-squares solution against the model's
+fixed item factors, given the handful of products they interacted with: the
+same per-row solve that fold-in uses for existing users (see app.fold_in),
+just without writing the result back into the model. One solve costs a
+``factors x factors`` system, so it runs in the request.
+
+Interactions come from the request body or, when a user first shows up, from
+their events in the feedback log (see app.event_log). ``FeedbackIndex`` keeps
+every user's recent feedback weights in memory by tailing the log, so a
+lookup never rescans it. Factors are cached per user in a TTLCache. A new
+feedback event for a user drops their entry, whichever worker logged it:
+each worker writes its own log stream, and the index sees them all.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .cache import TTLCache
+from .event_log import ACTION_CODES, LogTail
+from .models import Action
+
+logger = logging.getLogger(__name__)
+
+# Confidence added per feedback event, on the same scale as purchase quantities in training
+ACTION_WEIGHTS: Dict[Action, float] = {
+    Action.clicked: 1.0,
+    Action.added_to_cart: 2.0,
+    Action.purchased: 4.0,
+    Action.reviewed: 2.0,
+}
+_CODE_WEIGHTS = np.zeros(256, dtype=np.float32)
+for _action, _code in ACTION_CODES.items():
+    _CODE_WEIGHTS[_code] = ACTION_WEIGHTS[_action]
+
+_NO_HISTORY = object()
+
+
+@dataclass(frozen=True)
+class UserFactor:
+    factor: np.ndarray
+    seen: np.ndarray  # product indices the factor was solved from; excluded from recommendations
+    source: str  # "request" or "feedback_log"
+
+
+def interaction_row(item_weights: Dict[int, float], n_items: int) -> csr_matrix:
+    items = np.fromiter(item_weights.keys(), dtype=np.int32, count=len(item_weights))
+    order = np.argsort(items)
+    weights = np.fromiter(item_weights.values(), dtype=np.float32, count=len(item_weights))
+    return csr_matrix((weights[order], items[order], [0, len(items)]), shape=(1, n_items))
+
+
+def solve_user_factor(model, row: csr_matrix) -> np.ndarray:
+    """The ALS factor for one user's row of interactions against ``model.item_factors``.
+
+    Same least-squares solve as ``model.recalculate_user``, done in NumPy because
+    implicit's Cython solver needs writable factors and bundle factors are
+    memory-mapped read-only.
+    """
+    item_factors = model.item_factors
+    seen = np.asarray(item_factors[row.indices], dtype=np.float64)
+    confidence = row.data.astype(np.float64) * model.alpha
+    # (YtY + Yu^T (Cu - I) Yu + reg I) x = Yu^T Cu p(u), with the model's cached YtY
+    A = np.asarray(model.YtY, dtype=np.float64) + model.regularization * np.eye(item_factors.shape[1])
+    A += (seen.T * (confidence - 1.0)) @ seen
+    return np.linalg.solve(A, seen.T @ confidence).astype(np.float32)
+
+
+def rank_items(
+    item_factors: np.ndarray,
+    factor: np.ndarray,
+    exclude: np.ndarray,
+    N: int,
+    allowed: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-N (items, scores) for ``factor``, best first, skipping ``exclude`` and items not ``allowed``."""
+    scores = np.asarray(item_factors @ factor, dtype=np.float32)
+    if allowed is not None:
+        scores = np.where(allowed, scores, np.float32(-np.inf))
+    scores[exclude] = -np.inf
+    if allowed is None:
+        N = min(N, len(scores) - len(exclude))
+    else:
+        N = min(N, int(np.count_nonzero(scores > -np.inf)))
+    if N <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    top = np.argpartition(-scores, N - 1)[:N]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return top, scores[top]
+
+
+class FeedbackIndex:
+    """Feedback weights per user and product, kept current by tailing the log.
+
+    Weights are summed into ``bucket``-second buckets so that the ones older
+    than ``lookback`` can be dropped; memory is bounded by the (user, product)
+    pairs with feedback in that window. The log is read again at most every
+    ``refresh_interval`` seconds, or on the next refresh after ``mark_stale``.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        lookback: Optional[float] = None,
+        bucket: float = 3600.0,
+        refresh_interval: float = 1.0,
+        timer=time.time,
+    ):
+        self.lookback = lookback
+        self.refresh_interval = refresh_interval
+        self._timer = timer
+        self._bucket_us = int(bucket * 1_000_000)
+        self._tail = LogTail(directory, start=timer() - lookback if lookback else None)
+        # bucket -> user id bytes -> product id bytes -> weight
+        self._buckets: Dict[int, Dict[bytes, Dict[bytes, float]]] = {}
+        self._lock = threading.Lock()
+        self._next_refresh = 0.0
+        self.records = 0
+
+    def mark_stale(self) -> None:
+        self._next_refresh = 0.0
+
+    def refresh(self) -> Set[bytes]:
+        """Read the events logged since the last refresh; returns the users they are for."""
+        changed: Set[bytes] = set()
+        with self._lock:
+            now = self._timer()
+            if now < self._next_refresh:
+                return changed
+            self._next_refresh = now + self.refresh_interval
+            for records in self._tail.read_new():
+                self._add(records, changed)
+            if self.lookback:
+                oldest = int((now - self.lookback) * 1_000_000) // self._bucket_us
+                for bucket in [b for b in self._buckets if b < oldest]:
+                    del self._buckets[bucket]
+        return changed
+
+    def _add(self, records: np.ndarray, changed: Set[bytes]) -> None:
+        # Sum per (bucket, user, product) in NumPy first; the first refresh reads the whole lookback
+        keys = np.empty(len(records), dtype=[("bucket", "<i8"), ("user_id", "V16"), ("product_id", "V16")])
+        keys["bucket"] = records["ts_us"] // self._bucket_us
+        keys["user_id"] = records["user_id"]
+        keys["product_id"] = records["product_id"]
+        unique, inverse = np.unique(keys, return_inverse=True)
+        weights = np.bincount(inverse.ravel(), weights=_CODE_WEIGHTS[records["action"]], minlength=len(unique))
+        for (bucket, user, product), weight in zip(unique.tolist(), weights.tolist()):
+            products = self._buckets.setdefault(bucket, {}).setdefault(user, {})
+            products[product] = products.get(product, 0.0) + weight
+            changed.add(user)
+        self.records += len(records)
+
+    def weights(self, user_id: UUID, product_index: Dict[str, int], n_items: int) -> Dict[int, float]:
+        """Summed feedback weights per product index for ``user_id``, skipping products outside the model."""
+        user = user_id.bytes
+        weights: Dict[int, float] = {}
+        with self._lock:
+            for users in self._buckets.values():
+                for product, weight in users.get(user, {}).items():
+                    idx = product_index.get(str(UUID(bytes=product)))
+                    if idx is not None and idx < n_items:
+                        weights[idx] = weights.get(idx, 0.0) + weight
+        return weights
+
+
+class ColdStartUsers:
+    """Per-user factors for users outside the model, solved on demand and cached.
+
+    ``lookback`` limits how far back (seconds) feedback counts; the log is
+    checked for new events at most every ``refresh_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        cache: TTLCache,
+        log_dir: Optional[str] = None,
+        lookback: Optional[float] = None,
+        refresh_interval: float = 1.0,
+    ):
+        self.cache = cache
+        self.log_dir = log_dir
+        self.lookback = lookback
+        self.feedback = FeedbackIndex(log_dir, lookback, refresh_interval=refresh_interval) if log_dir else None
+        self.solves = 0
+
+    def cached(self, user_id: str) -> Optional[UserFactor]:
+        state = self.cache.get(user_id)
+        return state if isinstance(state, UserFactor) else None
+
+    def from_interactions(self, snap, user_id: str, interactions: Dict[str, float]) -> Optional[UserFactor]:
+        """Solve and cache a factor from (product_id -> weight); known users keep their training row too."""
+        n_items = snap.model.item_factors.shape[0]
+        weights: Dict[int, float] = {}
+        if user_id in snap.known_users:
+            row = snap.user_items_csr[int(snap.user_encoder.transform([user_id])[0])]
+            weights.update(zip(row.indices.tolist(), row.data.tolist()))
+        for product_id, weight in interactions.items():
+            idx = snap.catalog.index.get(product_id)
+            if idx is not None and idx < n_items:
+                weights[idx] = weights.get(idx, 0.0) + float(weight)
+        return self._solve(snap, user_id, weights, "request")
+
+    def lookup(self, snap, user_id: str) -> Optional[UserFactor]:
+        """The cached factor for ``user_id``, else one solved from their feedback log history."""
+        weights = {}
+        if self.feedback is not None:
+            # Feedback logged by any worker since the last look invalidates those users here
+            for user in self.feedback.refresh():
+                changed = str(UUID(bytes=user))
+                if changed not in snap.known_users:
+                    self.cache.pop(changed)
+        state = self.cache.get(user_id, _NO_HISTORY)
+        if state is not _NO_HISTORY:
+            return state
+        if self.feedback is not None:
+            weights = self.feedback.weights(UUID(user_id), snap.catalog.index, snap.model.item_factors.shape[0])
+        state = self._solve(snap, user_id, weights, "feedback_log")
+        if state is None:
+            # Users without history are remembered too; their first event drops the entry
+            self.cache.set(user_id, None)
+        return state
+
+    def _solve(self, snap, user_id: str, weights: Dict[int, float], source: str) -> Optional[UserFactor]:
+        weights = {idx: w for idx, w in weights.items() if w > 0}
+        if not weights:
+            return None
+        row = interaction_row(weights, snap.model.item_factors.shape[0])
+        state = UserFactor(solve_user_factor(snap.model, row), row.indices.copy(), source)
+        self.solves += 1
+        self.cache.set(user_id, state)
+        return state
+
+    def invalidate(self, user_id: str) -> None:
+        self.cache.pop(user_id)
+        if self.feedback is not None:
+            # So the next lookup reads the event this worker just logged
+            self.feedback.mark_stale()
+
+    def stats(self) -> Dict:
+        return {"solves": self.solves, **self.cache.stats()}
+
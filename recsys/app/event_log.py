@@ -0,0 +1,439 @@
+"""Append-only, segmented log of recommendation feedback events.
+
+Every event is a fixed 57-byte record (see ``RECORD_DTYPE``): a microsecond
+timestamp, the user, product and recommendation UUIDs as raw 16-byte values
+and the action as a one-byte code. Each writer process appends to the
+newest segment of its own stream, ``<dir>/<host>-<pid>/<first timestamp>-<n>.seg``;
+a segment is closed and a new one started once it reaches ``segment_bytes``.
+
+Writes use group commit: the first caller to find no flush in progress
+writes and fsyncs everything buffered so far, including records appended by
+other threads while the previous fsync was running, and every one of them
+returns once its record is on disk. Under load one fsync covers many events.
+
+Read events back for retraining with ``read_batches`` (structured numpy
+arrays) or ``read_events`` (one ``FeedbackEvent`` at a time); both only open
+the segments that can overlap the requested time range. ``LogTail`` follows
+a live log, returning only the records appended since its previous read.
+
+    python -m app.event_log stats
+    python -m app.event_log export-postgres --since 2024-01-01
+"""
+import argparse
+import bisect
+import heapq
+import io
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+from uuid import UUID
+
+import numpy as np
+
+from .models import Action
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".seg"
+MAGIC = b"FBLOG\x00\x00\x01"  # 8 bytes, last byte is the record format version
+RECORD_DTYPE = np.dtype([
+    ("ts_us", "<i8"),
+    ("user_id", "V16"),
+    ("product_id", "V16"),
+    ("recommendation_id", "V16"),  # all zero bytes when the feedback had none
+    ("action", "u1"),
+])
+_RECORD = struct.Struct("<q16s16s16sB")  # same layout as RECORD_DTYPE
+
+# Codes are stored on disk, so they must never be renumbered; only append new ones
+ACTION_CODES = {
+    Action.clicked: 1,
+    Action.added_to_cart: 2,
+    Action.purchased: 3,
+    Action.reviewed: 4,
+}
+ACTIONS_BY_CODE = {code: action for action, code in ACTION_CODES.items()}
+NO_RECOMMENDATION = bytes(16)
+
+TimeArg = Union[None, float, datetime]
+
+
+class FeedbackEvent(NamedTuple):
+    timestamp: datetime
+    user_id: UUID
+    product_id: UUID
+    recommendation_id: Optional[UUID]
+    action: Action
+
+
+def _to_us(value: TimeArg) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        value = value.timestamp()
+    return int(value * 1_000_000)
+
+
+def encode_record(ts_us: int, user_id: UUID, product_id: UUID, recommendation_id: Optional[UUID], action: Action) -> bytes:
+    return _RECORD.pack(
+        ts_us,
+        user_id.bytes,
+        product_id.bytes,
+        recommendation_id.bytes if recommendation_id else NO_RECOMMENDATION,
+        ACTION_CODES[Action(action)],
+    )
+
+
+def decode_records(records: np.ndarray) -> Iterator[FeedbackEvent]:
+    for r in records:
+        rec_id = r["recommendation_id"].tobytes()
+        yield FeedbackEvent(
+            timestamp=datetime.fromtimestamp(int(r["ts_us"]) / 1_000_000, tz=timezone.utc),
+            user_id=UUID(bytes=r["user_id"].tobytes()),
+            product_id=UUID(bytes=r["product_id"].tobytes()),
+            recommendation_id=UUID(bytes=rec_id) if rec_id != NO_RECOMMENDATION else None,
+            action=ACTIONS_BY_CODE[int(r["action"])],
+        )
+
+
+def list_streams(directory: str) -> List[str]:
+    """One subdirectory per writer process (see ``EventLog``)."""
+    if not os.path.isdir(directory):
+        return []
+    return [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if os.path.isdir(os.path.join(directory, name))
+    ]
+
+
+def list_segments(stream_dir: str) -> List[str]:
+    """Segment paths of one stream in the order they were written."""
+    if not os.path.isdir(stream_dir):
+        return []
+    return [
+        os.path.join(stream_dir, name)
+        for name in sorted(os.listdir(stream_dir))
+        if name.endswith(SEGMENT_SUFFIX)
+    ]
+
+
+def _segment_start_us(path: str) -> int:
+    return int(os.path.basename(path)[: -len(SEGMENT_SUFFIX)].split("-")[0])
+
+
+def _open_records(path: str) -> np.ndarray:
+    n_records = (os.path.getsize(path) - len(MAGIC)) // RECORD_DTYPE.itemsize
+    if n_records <= 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a feedback log segment")
+    # Ignores a partially written trailing record
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=len(MAGIC), shape=(n_records,))
+
+
+class EventLog:
+    """Writer side of the log. Safe to share between threads of one process.
+
+    Each process writes its own stream, ``<directory>/<host>-<pid>/``, so
+    gunicorn workers never interleave writes in one file. The stream is picked
+    on the first commit, i.e. after the fork when the app is preloaded.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, fsync: bool = True):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+
+        self._cond = threading.Condition()
+        self._buffer: List[bytes] = []
+        self._appended = 0  # sequence number of the last appended record
+        self._committed = 0  # sequence number of the last record on disk
+        self._flushing = False
+        self._pid = None
+        self._file = None
+        self._n_segments = 0
+        self._last_ts_us = 0
+        self.commits = 0
+
+    def _attach(self) -> None:
+        self._pid = os.getpid()
+        self.stream_dir = os.path.join(self.directory, f"{socket.gethostname()}-{self._pid}")
+        os.makedirs(self.stream_dir, exist_ok=True)
+        self._file = None
+        segments = list_segments(self.stream_dir)
+        self._n_segments = len(segments)
+        if segments:
+            # A restarted process with a recycled pid keeps appending to its newest
+            # segment, after dropping a torn record left by a crash mid-write
+            path = segments[-1]
+            size = os.path.getsize(path) - len(MAGIC)
+            self._file = open(path, "r+b")
+            self._file.truncate(len(MAGIC) + size - size % RECORD_DTYPE.itemsize)
+            self._file.seek(0, os.SEEK_END)
+
+    def _new_segment(self, first_ts_us: int) -> None:
+        # Named after its first record, so a reader can tell which segments a time range touches
+        name = f"{first_ts_us:020d}-{self._n_segments:08d}{SEGMENT_SUFFIX}"
+        self._file = open(os.path.join(self.stream_dir, name), "xb")
+        self._file.write(MAGIC)
+        self._n_segments += 1
+
+    @property
+    def segment_path(self) -> Optional[str]:
+        return self._file.name if self._file is not None else None
+
+    def append(
+        self,
+        user_id: UUID,
+        product_id: UUID,
+        recommendation_id: Optional[UUID],
+        action: Action,
+        sync: bool = True,
+    ) -> int:
+        """Append one event; with ``sync`` return only once it is on disk.
+
+        Returns the event's sequence number within this process.
+        """
+        with self._cond:
+            # Timestamps never go backwards within a stream, so its segments stay sorted by time
+            ts_us = max(time.time_ns() // 1000, self._last_ts_us)
+            self._last_ts_us = ts_us
+            self._buffer.append(encode_record(ts_us, user_id, product_id, recommendation_id, action))
+            self._appended += 1
+            seq = self._appended
+        if sync:
+            self.wait_for(seq)
+        return seq
+
+    def wait_for(self, seq: int) -> None:
+        """Block until record ``seq`` has been committed, committing it ourselves if nobody is."""
+        with self._cond:
+            while self._committed < seq:
+                if not self._flushing:
+                    self._commit_locked()
+                else:
+                    self._cond.wait()
+
+    def flush(self) -> None:
+        self.wait_for(self._appended)
+
+    def _commit_locked(self) -> None:
+        # Called with the condition held; the write and fsync run without it so
+        # other threads can keep appending to the next group meanwhile.
+        # A failed write puts the batch back and raises; waiters then retry it
+        # themselves, so nobody is told their events are on disk when they are not.
+        batch, self._buffer = self._buffer, []
+        last = self._appended
+        self._flushing = True
+        self._cond.release()
+        committed = False
+        try:
+            if batch:
+                if self._pid != os.getpid():
+                    self._attach()
+                if self._file is None:
+                    self._new_segment(_RECORD.unpack_from(batch[0])[0])
+                start = self._file.tell()
+                try:
+                    self._file.write(b"".join(batch))
+                    self._file.flush()
+                    if self.fsync:
+                        os.fsync(self._file.fileno())
+                except BaseException:
+                    self._discard_after(start)
+                    raise
+                if self._file.tell() >= self.segment_bytes:
+                    # The next commit opens a new segment
+                    self._file.close()
+                    self._file = None
+            committed = True
+        finally:
+            self._cond.acquire()
+            self._flushing = False
+            if committed:
+                self._committed = last
+                self.commits += 1
+            else:
+                self._buffer = batch + self._buffer
+            self._cond.notify_all()
+
+    def _discard_after(self, offset: int) -> None:
+        """Drop whatever a failed write left past ``offset``, so the retried batch is not written twice."""
+        try:
+            self._file.truncate(offset)
+            self._file.seek(offset)
+        except (OSError, ValueError):
+            # The file is unusable; the retry starts a new segment instead
+            try:
+                self._file.close()
+            except (OSError, ValueError):
+                pass
+            self._file = None
+
+    def close(self) -> None:
+        self.flush()
+        with self._cond:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> dict:
+        segments = [p for stream in list_streams(self.directory) for p in list_segments(stream)]
+        with self._cond:
+            return {
+                "directory": self.directory,
+                "streams": len(list_streams(self.directory)),
+                "segments": len(segments),
+                "bytes": sum(os.path.getsize(p) for p in segments),
+                "appended": self._appended,
+                "committed": self._committed,
+                "commits": self.commits,
+            }
+
+
+def _read_stream(stream_dir: str, start_us: Optional[int], end_us: Optional[int]) -> Iterator[np.ndarray]:
+    segments = list_segments(stream_dir)
+    for i, path in enumerate(segments):
+        if end_us is not None and _segment_start_us(path) >= end_us:
+            break
+        # No record in this segment is newer than the next segment's first record
+        if start_us is not None and i + 1 < len(segments) and _segment_start_us(segments[i + 1]) < start_us:
+            continue
+        records = _open_records(path)
+        if start_us is not None or end_us is not None:
+            ts = records["ts_us"]
+            lo = np.searchsorted(ts, start_us, side="left") if start_us is not None else 0
+            hi = np.searchsorted(ts, end_us, side="left") if end_us is not None else len(ts)
+            records = records[lo:hi]
+        if len(records):
+            yield records
+
+
+def read_batches(directory: str, start: TimeArg = None, end: TimeArg = None) -> Iterator[np.ndarray]:
+    """Yield the records in ``[start, end)`` as structured arrays, one per segment.
+
+    Batches are time-ordered within a writer stream but not across streams.
+    """
+    start_us, end_us = _to_us(start), _to_us(end)
+    for stream_dir in list_streams(directory):
+        yield from _read_stream(stream_dir, start_us, end_us)
+
+
+class LogTail:
+    """Reads the records appended to a log since the previous ``read_new``, across all writer streams.
+
+    Only each stream's newest segment read so far and any later ones are
+    looked at, and a segment is only opened when its size has grown.
+    """
+
+    def __init__(self, directory: str, start: TimeArg = None):
+        self.directory = directory
+        self._start_us = _to_us(start)
+        self._positions: Dict[str, Tuple[str, int]] = {}  # stream dir -> (segment, records read)
+
+    def read_new(self) -> Iterator[np.ndarray]:
+        for stream_dir in list_streams(self.directory):
+            segments = list_segments(stream_dir)
+            path, done = self._positions.get(stream_dir, (None, 0))
+            first = bisect.bisect_left(segments, path) if path is not None else 0
+            for i in range(first, len(segments)):
+                segment = segments[i]
+                if path is None and self._start_us is not None and i + 1 < len(segments) \
+                        and _segment_start_us(segments[i + 1]) < self._start_us:
+                    continue
+                lo = done if segment == path else 0
+                if (os.path.getsize(segment) - len(MAGIC)) // RECORD_DTYPE.itemsize <= lo:
+                    continue
+                records = _open_records(segment)
+                if path is None and self._start_us is not None:
+                    lo = np.searchsorted(records["ts_us"], self._start_us, side="left")
+                self._positions[stream_dir] = (segment, len(records))
+                if len(records) > lo:
+                    yield records[lo:]
+
+
+def read_events(directory: str, start: TimeArg = None, end: TimeArg = None) -> Iterator[FeedbackEvent]:
+    """Yield the events in ``[start, end)`` in timestamp order across all streams."""
+    start_us, end_us = _to_us(start), _to_us(end)
+    streams = [
+        (event for records in _read_stream(stream_dir, start_us, end_us) for event in decode_records(records))
+        for stream_dir in list_streams(directory)
+    ]
+    return heapq.merge(*streams, key=lambda event: event.timestamp)
+
+
+# Matches the np2504_recommendation_feedback table in database.sql
+POSTGRES_TABLE = "np2504_recommendation_feedback"
+
+
+def copy_to_postgres(conn, directory: str, start: TimeArg = None, end: TimeArg = None,
+                     table: str = POSTGRES_TABLE, batch_size: int = 100_000) -> int:
+    """Bulk-load events from the log into Postgres with COPY. Returns the row count."""
+    sql = f"COPY {table} (created_at, user_id, product_id, recommendation_id, action) FROM STDIN"
+    total = 0
+    with conn.cursor() as cur:
+        buf = io.StringIO()
+        for event in read_events(directory, start, end):
+            rec_id = str(event.recommendation_id) if event.recommendation_id else r"\N"
+            buf.write(f"{event.timestamp.isoformat()}\t{event.user_id}\t{event.product_id}\t"
+                      f"{rec_id}\t{event.action.value}\n")
+            total += 1
+            if total % batch_size == 0:
+                buf.seek(0)
+                cur.copy_expert(sql, buf)
+                buf = io.StringIO()
+        if buf.tell():
+            buf.seek(0)
+            cur.copy_expert(sql, buf)
+    conn.commit()
+    return total
+
+
+def default_log_dir(base_dir: str) -> str:
+    """``FEEDBACK_LOG_DIR``, then ``$SHARED_DIR/feedback``, then ``app/data/feedback``."""
+    if os.environ.get("FEEDBACK_LOG_DIR"):
+        return os.environ["FEEDBACK_LOG_DIR"]
+    if os.environ.get("SHARED_DIR"):
+        return os.path.join(os.environ["SHARED_DIR"], "feedback")
+    return os.path.join(base_dir, "data", "feedback")
+
+
+def main():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Inspect or export the feedback event log.")
+    parser.add_argument("--dir", default=None, help="log directory (default: see default_log_dir())")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="print segment and event counts")
+    export = sub.add_parser("export-postgres", help="COPY events into Postgres")
+    export.add_argument("--dsn", default=os.getenv("DATABASE_URL"))
+    export.add_argument("--table", default=POSTGRES_TABLE)
+    export.add_argument("--since", type=datetime.fromisoformat, default=None)
+    export.add_argument("--until", type=datetime.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    directory = args.dir or default_log_dir(base_dir)
+    if args.command == "stats":
+        segments = [p for stream in list_streams(directory) for p in list_segments(stream)]
+        events = sum(len(_open_records(p)) for p in segments)
+        print(f"{directory}: {len(segments)} segments, {events} events")
+    elif args.command == "export-postgres":
+        if not args.dsn:
+            parser.exit(1, "Set DATABASE_URL or pass --dsn\n")
+        import psycopg2
+
+        with psycopg2.connect(args.dsn) as conn:
+            rows = copy_to_postgres(conn, directory, args.since, args.until, table=args.table)
+        print(f"Copied {rows} events into {args.table}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Asynchronous, batched forwarding of recommendation feedback to analytics.
+
+The feedback endpoint only puts the event on a bounded in-memory queue; a
+background thread drains it, groups events per client into batches and hands
+them to a sink. When the queue is full new events are dropped and counted
+rather than slowing the request down.
+
+Sinks implement ``send(client_id, events)`` and raise on failure. Only
+failures that may pass on their own are retried: ``TransientSendError``
+(which ``GA4Sink`` raises for connection errors, timeouts, 429 and 5xx
+responses) and the built-in ``ConnectionError`` and ``TimeoutError``. Anything
+else, such as a 4xx response, drops the batch at once. ``GA4Sink`` posts to
+the GA4 Measurement Protocol; ``MemorySink`` keeps the most recent batches in
+memory for tests.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Protocol, Tuple
+
+from .metrics import EXTERNAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# The Measurement Protocol accepts at most 25 events per request
+GA4_MAX_EVENTS = 25
+
+
+class TransientSendError(Exception):
+    """A send failed in a way that may succeed if retried."""
+
+
+_TRANSIENT = (TransientSendError, ConnectionError, TimeoutError)
+
+
+class FeedbackSink(Protocol):
+    def send(self, client_id: str, events: List[Dict]) -> None:
+        ...
+
+
+class GA4Sink:
+    """Posts events to the GA4 Measurement Protocol over a pooled session."""
+
+    def __init__(self, measurement_id: str, api_secret: str, timeout: float = 5.0, pool_size: int = 4):
+        self.endpoint = (
+            "https://www.google-analytics.com/mp/collect"
+            f"?measurement_id={measurement_id}&api_secret={api_secret}"
+        )
+        self.timeout = timeout
+        # Imported here: only deployments with GA4 configured pay for importing requests
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._network_errors = (requests.ConnectionError, requests.Timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+
+    def send(self, client_id: str, events: List[Dict]) -> None:
+        try:
+            response = self.session.post(
+                self.endpoint, json={"client_id": client_id, "events": events}, timeout=self.timeout
+            )
+        except self._network_errors as e:
+            raise TransientSendError(str(e)) from e
+        if response.status_code == 429 or response.status_code >= 500:
+            raise TransientSendError(f"GA4 answered {response.status_code}")
+        # Other 4xx responses will not change on a retry
+        response.raise_for_status()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class MemorySink:
+    """Keeps the last ``max_batches`` batches it receives; used in tests and when analytics is disabled."""
+
+    def __init__(self, max_batches: int = 1000):
+        self.batches: Deque[Tuple[str, List[Dict]]] = deque(maxlen=max_batches)
+
+    def send(self, client_id: str, events: List[Dict]) -> None:
+        self.batches.append((client_id, list(events)))
+
+    @property
+    def events(self) -> List[Dict]:
+        return [event for _, events in self.batches for event in events]
+
+
+class FeedbackForwarder:
+    """Bounded queue plus a sender thread that batches, retries and counts drops."""
+
+    def __init__(
+        self,
+        sink: FeedbackSink,
+        maxsize: int = 10_000,
+        batch_size: int = GA4_MAX_EVENTS,
+        flush_interval: float = 1.0,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+    ):
+        self.sink = sink
+        self.batch_size = min(batch_size, GA4_MAX_EVENTS)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._queue: "queue.Queue[Tuple[str, Dict]]" = queue.Queue(maxsize=maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+
+    def submit(self, client_id: str, event: Dict) -> bool:
+        """Queue one event without blocking. Returns False if it was dropped."""
+        try:
+            self._queue.put_nowait((client_id, event))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="feedback-forwarder", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the sender after it has flushed whatever is still queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def flush(self) -> None:
+        """Send everything currently queued from the calling thread."""
+        while True:
+            batch = self._take(block=False)
+            if not batch:
+                return
+            self._send_batch(batch)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "maxsize": self._queue.maxsize,
+                "enqueued": self.enqueued,
+                "sent": self.sent,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "retries": self.retries,
+            }
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._take(block=True)
+            if batch:
+                self._send_batch(batch)
+        self.flush()
+
+    def _take(self, block: bool) -> List[Tuple[str, Dict]]:
+        """Collect up to a few batches' worth of events, waiting at most flush_interval."""
+        items = []
+        limit = self.batch_size * 8
+        deadline = time.monotonic() + self.flush_interval
+        while len(items) < limit:
+            try:
+                if block and not items:
+                    items.append(self._queue.get(timeout=self.flush_interval))
+                    continue
+                remaining = deadline - time.monotonic()
+                if block and remaining > 0 and len(items) < self.batch_size:
+                    items.append(self._queue.get(timeout=remaining))
+                else:
+                    items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _send_batch(self, items: List[Tuple[str, Dict]]) -> None:
+        # A Measurement Protocol payload belongs to a single client
+        by_client: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        for client_id, event in items:
+            by_client.setdefault(client_id, []).append(event)
+        for client_id, events in by_client.items():
+            for start in range(0, len(events), self.batch_size):
+                self._send_with_retry(client_id, events[start:start + self.batch_size])
+
+    def _send_with_retry(self, client_id: str, events: List[Dict]) -> None:
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                self.sink.send(client_id, events)
+            except Exception as e:
+                EXTERNAL_SECONDS.labels("ga4", "error").observe(time.perf_counter() - start)
+                if attempt == self.max_retries or not isinstance(e, _TRANSIENT):
+                    logger.error(f"Dropping {len(events)} feedback events after {attempt + 1} attempts: {e}")
+                    with self._lock:
+                        self.failed += len(events)
+                    return
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self.backoff * 2 ** attempt)
+            else:
+                EXTERNAL_SECONDS.labels("ga4", "ok").observe(time.perf_counter() - start)
+                with self._lock:
+                    self.sent += len(events)
+                return
@@ -0,0 +1,63 @@
+"""Business-rule filters on recommendations (product type, price range, exclusions).
+
+An ``ItemFilter`` becomes a boolean mask over the model's items, built with
+NumPy from the catalog's precomputed type codes and prices. The scoring
+functions in app.inference push disallowed items to ``-inf`` in the full
+score vector before picking the top N with ``argpartition``, so a filtered
+request still returns up to N items and never more, and the cost is O(items)
+array work rather than a Python loop over candidates. Filtered requests are
+always scored live: the top-K tables only hold each user's best ``k`` items
+regardless of the filters.
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .catalog import ProductCatalog, normalize_type
+
+
+@dataclass(frozen=True)
+class ItemFilter:
+    """Which products a request may recommend. Hashable, so it can be part of a cache key."""
+
+    product_types: Optional[Tuple[str, ...]] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    exclude: Tuple[str, ...] = ()
+
+    @property
+    def filters_attributes(self) -> bool:
+        return bool(self.product_types) or self.min_price is not None or self.max_price is not None
+
+    @property
+    def active(self) -> bool:
+        return self.filters_attributes or bool(self.exclude)
+
+    def mask(self, catalog: ProductCatalog, n_items: int) -> Optional[np.ndarray]:
+        """Boolean mask of the allowed items among the model's ``n_items``, or None if nothing is filtered.
+
+        Products with an unknown price never match a price range.
+        """
+        if not self.active:
+            return None
+        allowed = np.ones(n_items, dtype=bool)
+        n = min(n_items, len(catalog))
+        # Items without catalog metadata cannot be checked against the attribute filters
+        if self.filters_attributes:
+            allowed[n:] = False
+        if self.product_types:
+            # A few equality scans over the int codes beat np.isin, which sorts
+            types = np.zeros(n, dtype=bool)
+            for code in {catalog.type_code.get(normalize_type(t)) for t in self.product_types} - {None}:
+                types |= catalog.type_codes[:n] == code
+            allowed[:n] &= types
+        if self.min_price is not None:
+            allowed[:n] &= catalog.prices[:n] >= self.min_price
+        if self.max_price is not None:
+            allowed[:n] &= catalog.prices[:n] <= self.max_price
+        for product_id in self.exclude:
+            idx = catalog.index.get(product_id)
+            if idx is not None and idx < n_items:
+                allowed[idx] = False
+        return allowed
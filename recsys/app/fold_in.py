@@ -0,0 +1,58 @@
+"""Incremental ALS updates by folding new interactions into a trained model.
+
+A full refit re-solves every user and item factor. New interactions only
+change the least-squares problems of the users and items they touch, so
+``fold_in`` re-solves just those rows: the touched users against the fixed
+item factors, then the touched items against the (updated) user factors.
+Each row is the exact ALS solution given the other side, using the model's
+own regularization and alpha. Untouched factors stay as they were, so the
+model drifts from a full refit only gradually and should still be refit
+from scratch periodically.
+"""
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FoldInResult:
+    user_items: csr_matrix
+    users: np.ndarray
+    items: np.ndarray
+
+
+def _writable(array: np.ndarray) -> np.ndarray:
+    # Factors from a memory-mapped bundle are read-only; fold into a private copy
+    return array if array.flags.writeable else np.array(array)
+
+
+def fold_in(model, user_items: csr_matrix, delta: csr_matrix, iterations: int = 1) -> FoldInResult:
+    """Add ``delta`` to ``user_items`` and update only the affected factor rows of ``model``.
+
+    Both matrices are users x items in encoder order (see app.bundle.orient_model).
+    ``iterations`` alternates user and item re-solves that many times over the
+    touched rows. Returns the updated interaction matrix and the touched indices.
+    """
+    if delta.shape != user_items.shape:
+        raise ValueError(f"Delta shape {delta.shape} does not match interaction matrix {user_items.shape}")
+    delta = csr_matrix(delta)
+    updated = csr_matrix(user_items + delta)
+    updated.sum_duplicates()
+    coo = delta.tocoo()
+    users = np.unique(coo.row).astype(np.int32)
+    items = np.unique(coo.col).astype(np.int32)
+    if len(users) == 0:
+        return FoldInResult(updated, users, items)
+
+    model.user_factors = _writable(model.user_factors)
+    model.item_factors = _writable(model.item_factors)
+    item_users = updated.T.tocsr()
+    for _ in range(iterations):
+        model.partial_fit_users(users, updated[users])
+        model.partial_fit_items(items, item_users[items])
+    logger.info(f"Folded {delta.nnz} interactions into {len(users)} users and {len(items)} items")
+    return FoldInResult(updated, users, items)
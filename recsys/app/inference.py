@@ -1,12 +1,25 @@
 import os
 import pickle
 import logging
-from typing import List, Dict, Optional
+import threading
+import uuid
+from typing import Iterator, List, Dict, Optional, Tuple
 
+import numpy as np
 import pandas as pd
-from implicit.als import AlternatingLeastSquares
 from scipy.sparse import csr_matrix
 
+from .bundle import bundle_root, latest_bundle, load_bundle, orient_model
+from .catalog import ProductCatalog, build_product_catalog
+from .cold_start import UserFactor, rank_items
+from .intent import build_intent_matcher
+from .metrics import FALLBACKS, RECOMMENDATION_SOURCE, STAGE_SECONDS
+from .search import ProductSearch
+from .serialization import ProductFragments
+from .similarity import ExactIndex, build_similarity_index
+from .model_store import ModelSnapshot
+from .topk import TopKStore, load_topk_store, select_topk
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 logging.basicConfig(level=logging.INFO)
@@ -22,30 +35,157 @@ def load_pickle(filename: str):
         return pickle.load(f)
 
 
-# Load model & encoders
-try:
-    als_model = load_pickle("als_model.pkl")
-    user_encoder = load_pickle("user_encoder.pkl")
-    product_encoder = load_pickle("product_encoder.pkl")
-    product_reverse_map = load_pickle("product_reverse_map.pkl")
-    user_items_csr = load_pickle("user_items_csr.pkl")
-except Exception as e:
-    logger.error(f"Error loading model assets: {e}")
-    raise
-
-# Load rating and sales data
-try:
-    ratings = load_pickle("ratings.pkl")
-except FileNotFoundError:
-    ratings = None
-    logger.warning("ratings.pkl not found. Continuing without ratings.")
-
-try:
+# Ratings, the sales export and the default model are loaded on first use rather
+# than at import, so the API can start serving /ping before they are in
+_loaded: Dict[str, object] = {}
+_load_lock = threading.RLock()
+
+
+def _once(name: str, load):
+    if name not in _loaded:
+        with _load_lock:
+            if name not in _loaded:
+                _loaded[name] = load()
+    return _loaded[name]
+
+
+def _load_ratings():
+    try:
+        return load_pickle("ratings.pkl")
+    except FileNotFoundError:
+        logger.warning("ratings.pkl not found. Continuing without ratings.")
+        return None
+
+
+def _load_sales() -> pd.DataFrame:
     df_sale_path = os.path.join(BASE_DIR, "data", "df_sale.csv")
-    df_sale = pd.read_csv(df_sale_path)
-except FileNotFoundError:
-    df_sale = pd.DataFrame()
-    logger.warning(f"df_sale.csv not found at {df_sale_path}. Using empty DataFrame.")
+    try:
+        return pd.read_csv(df_sale_path)
+    except FileNotFoundError:
+        logger.warning(f"df_sale.csv not found at {df_sale_path}. Using empty DataFrame.")
+        return pd.DataFrame()
+
+
+def ratings_data():
+    return _once("ratings", _load_ratings)
+
+
+def sales_data() -> pd.DataFrame:
+    return _once("df_sale", _load_sales)
+
+
+def find_latest_bundle() -> Optional[str]:
+    return latest_bundle(bundle_root(BASE_DIR))
+
+
+def topk_dir_for(bundle_path: Optional[str]) -> str:
+    return os.path.join(bundle_path or os.path.join(BASE_DIR, "models"), "topk")
+
+
+def _product_descriptions(df: pd.DataFrame) -> Dict[str, str]:
+    if df.empty or "product_description_en" not in df.columns:
+        return {}
+    products = df.drop_duplicates(subset=["product_id"])
+    return dict(zip(products["product_id"].astype(str), products["product_description_en"].fillna("")))
+
+
+def _popular_products(catalog: ProductCatalog, user_items_csr, N: int = 100) -> pd.DataFrame:
+    """The N most interacted-with products, for users the model knows nothing about."""
+    totals = np.asarray(user_items_csr.sum(axis=0)).ravel()[: catalog.n_encoded]
+    order = np.argsort(-totals, kind="stable")[:N]
+    return pd.DataFrame([catalog.info(int(idx)) for idx in order if totals[idx] > 0])
+
+
+def load_snapshot(bundle_path: Optional[str] = None) -> ModelSnapshot:
+    """Load the model and everything derived from it into one ModelSnapshot.
+
+    Reads the bundle at ``bundle_path``, or the pickles in app/models when it is None.
+    """
+    if bundle_path:
+        bundle = load_bundle(bundle_path)
+        logger.info(f"Loaded model bundle {bundle.version} from {bundle_path}")
+        version = bundle.version
+        model = bundle.model
+        user_enc = bundle.user_encoder
+        product_enc = bundle.product_encoder
+        reverse_map = bundle.product_reverse_map
+        interactions = bundle.user_items_csr
+        fingerprint = bundle.manifest.get("model_fingerprint")
+    else:
+        logger.info("No model bundle found, loading pickled model assets")
+        version = f"pickles-{int(os.path.getmtime(os.path.join(BASE_DIR, 'models', 'als_model.pkl')))}"
+        model = load_pickle("als_model.pkl")
+        user_enc = load_pickle("user_encoder.pkl")
+        product_enc = load_pickle("product_encoder.pkl")
+        reverse_map = load_pickle("product_reverse_map.pkl")
+        interactions = load_pickle("user_items_csr.pkl")
+        model = orient_model(model, len(user_enc.classes_), len(product_enc.classes_))
+        fingerprint = None
+
+    df_sale = sales_data()
+    catalog = build_product_catalog(df_sale, product_enc.classes_)
+    descriptions = _product_descriptions(df_sale)
+    return ModelSnapshot(
+        version=version,
+        model=model,
+        user_encoder=user_enc,
+        product_encoder=product_enc,
+        product_reverse_map=reverse_map,
+        user_items_csr=interactions,
+        known_users=frozenset(user_enc.classes_),
+        known_products=frozenset(product_enc.classes_),
+        # Deduplicated product metadata keyed by encoded product index
+        catalog=catalog,
+        ratings=ratings_data(),
+        # Precomputed top-K tables, if `python -m app.topk` has been run for this model
+        topk=load_topk_store(topk_dir_for(bundle_path), model, fingerprint),
+        # Item-item similarity index for the similar-products endpoint (SIMILARITY_INDEX=exact|ivf)
+        similarity_index=build_similarity_index(model.item_factors),
+        # Maps chatbot messages like "pupuk npk" to catalog products
+        intent_matcher=build_intent_matcher(catalog, descriptions),
+        # BM25 full-text index over product names and descriptions
+        search_index=ProductSearch(catalog, descriptions),
+        # Most popular products, served when a user has no history at all
+        fallback_list=_popular_products(catalog, interactions),
+        # Pre-encoded JSON of each product's fields, spliced into responses (see app.serialization)
+        fragments=ProductFragments(catalog),
+        user_index={u: i for i, u in enumerate(user_enc.classes_)},
+        path=bundle_path,
+    )
+
+
+def default_snapshot() -> ModelSnapshot:
+    """The model from the newest memory-mapped bundle (or the pickles), loaded once on first use."""
+    return _once("snapshot", lambda: load_snapshot(find_latest_bundle()))
+
+
+# Module-level names for scripts and notebooks, resolved on first access. The API
+# goes through app.model_store so that it picks up hot reloads.
+_SNAPSHOT_NAMES = {
+    "snapshot": None,
+    "model_version": "version",
+    "als_model": "model",
+    "user_encoder": "user_encoder",
+    "product_encoder": "product_encoder",
+    "product_reverse_map": "product_reverse_map",
+    "user_items_csr": "user_items_csr",
+    "product_catalog": "catalog",
+    "topk_store": "topk",
+    "similarity_index": "similarity_index",
+}
+
+
+def __getattr__(name: str):
+    if name == "df_sale":
+        return sales_data()
+    if name == "ratings":
+        return ratings_data()
+    if name == "topk_dir":
+        return topk_dir_for(default_snapshot().path)
+    if name in _SNAPSHOT_NAMES:
+        field = _SNAPSHOT_NAMES[name]
+        return default_snapshot() if field is None else getattr(default_snapshot(), field)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def _fallback_products(fallback_list: Optional[pd.DataFrame], N: int) -> List[Dict]:
@@ -55,16 +195,88 @@ def _fallback_products(fallback_list: Optional[pd.DataFrame], N: int) -> List[Di
 
     fallback = []
     for _, row in fallback_list.head(N).iterrows():
+        price = row.get("product_price", row.get("price"))
         fallback.append({
             "product_id": str(row.get("product_id")),
-            "product_name_en": row.get("product_name_en", "Unknown"),
+            "product_name_en": row.get("product_name_en", "Unknown Product"),
             "product_type": row.get("product_type", "Unknown"),
-            "price": float(row.get("price", 0)) if row.get("price") is not None else 0.0,
-            "relevance_score": 0.0,
+            "price": None if pd.isna(price) else float(price),
+            "relevance_score": None,
+            "recommendation_id": str(uuid.uuid4()),
         })
     return fallback
 
 
+def _allowed_fallback(
+    fallback_list: Optional[pd.DataFrame], catalog: Optional[ProductCatalog], allowed: Optional[np.ndarray]
+) -> Optional[pd.DataFrame]:
+    """The popular products that pass the ``allowed`` mask (see app.filters)."""
+    if allowed is None or fallback_list is None or fallback_list.empty or catalog is None:
+        return fallback_list
+    idx = np.array([catalog.index.get(str(pid), -1) for pid in fallback_list["product_id"]], dtype=np.int64)
+    keep = (idx >= 0) & (idx < len(allowed))
+    keep[keep] = allowed[idx[keep]]
+    return fallback_list[keep]
+
+
+def _encoded_index(encoder, value: str, index: Optional[Dict[str, int]] = None) -> Optional[int]:
+    """``value``'s encoded index, from the prebuilt ``index`` when given; None if it is unknown."""
+    if index is not None:
+        return index.get(value)
+    # Scans classes_ once; callers on the request path pass the snapshot's index
+    try:
+        return int(encoder.transform([value])[0])
+    except ValueError:
+        return None
+
+
+def _fallback(function: str, reason: str, fallback_list: Optional[pd.DataFrame], N: int) -> List[Dict]:
+    # Counted per reason: a jump in "error" or "empty" means the model is not serving
+    FALLBACKS.labels(function, reason).inc()
+    with STAGE_SECONDS.labels(function, "fallback").time():
+        return _fallback_products(fallback_list, N)
+
+
+_FILTERED_SCORE = np.finfo(np.float32).min / 2
+
+
+def _enrich(
+    item_idx: int,
+    score: float,
+    product_reverse_map: Dict[int, str],
+    catalog: Optional[ProductCatalog],
+) -> Optional[Dict]:
+    """Attach product details to a recommended item, or None if it is unmapped."""
+    if catalog is not None and 0 <= item_idx < catalog.n_encoded:
+        product_info = catalog.info(item_idx)
+    else:
+        pid = product_reverse_map.get(item_idx)
+        if not pid:
+            return None
+        product_info = {
+            "product_id": pid,
+            "product_name_en": "Unknown Product",
+            "price": None,
+            "product_type": "Unknown",
+        }
+
+    product_info["relevance_score"] = float(score)
+    product_info["recommendation_id"] = str(uuid.uuid4())
+    return product_info
+
+
+def _to_results(items, scores, product_reverse_map: Dict[int, str], catalog: Optional[ProductCatalog]) -> List[Dict]:
+    """Turn a row of (item, score) ids from the model into enriched recommendations."""
+    results = []
+    for item_idx, score in zip(items, scores):
+        # implicit pads rows with -FLT_MAX scores once it runs out of unfiltered items
+        if score <= _FILTERED_SCORE:
+            continue
+        product_info = _enrich(int(item_idx), score, product_reverse_map, catalog)
+        if product_info is not None:
+            results.append(product_info)
+    return results
+
 
 def recommend_products_for_user(
     user_id: str,
@@ -73,140 +285,222 @@ def recommend_products_for_user(
     product_reverse_map: Dict[int, str],
     user_items_csr,  # CSR matrix of user-item interactions; must be passed or accessible
     ratings: Optional[pd.DataFrame],
-    df_sale: Optional[pd.DataFrame],
+    catalog: Optional[ProductCatalog],
     fallback_list: Optional[pd.DataFrame] = None,
-    N: int = 10
+    N: int = 10,
+    topk: Optional[TopKStore] = None,
+    allowed: Optional[np.ndarray] = None,
+    user_index: Optional[Dict[str, int]] = None,
 ) -> List[Dict]:
-    """Recommend top-N products for a given user."""
-    
-    def _fallback_products(fallback_df, n):
-        if fallback_df is None or fallback_df.empty:
-            return []
-        fallback_recs = []
-        for _, row in fallback_df.head(n).iterrows():
-            fallback_recs.append({
-                "product_id": row.get("product_id", "unknown"),
-                "product_name_en": row.get("product_name_en", "Unknown Product"),
-                "price": row.get("product_price", None),
-                "product_type": row.get("product_type", "Unknown"),
-                "relevance_score": None,
-                "recommendation_id": str(uuid.uuid4()),
-            })
-        return fallback_recs
-    
-    if user_id not in user_encoder.classes_:
-        return _fallback_products(fallback_list, N)
+    """Recommend top-N products for a given user, from the top-K tables when they cover the request.
+
+    ``allowed`` (see app.filters) masks the items that may be recommended;
+    filtered requests are scored against every item. ``user_index`` is the
+    snapshot's user id -> row map.
+    """
+    function = "recommend_products_for_user"
+    fallback_list = _allowed_fallback(fallback_list, catalog, allowed)
+    with STAGE_SECONDS.labels(function, "lookup").time():
+        user_idx = _encoded_index(user_encoder, user_id, user_index)
+    if user_idx is None:
+        return _fallback(function, "unknown_user", fallback_list, N)
 
     try:
-        user_idx = user_encoder.transform([user_id])[0]
-        items, scores = model.recommend(user_idx, user_items_csr[user_idx], N)
-        
-        results = []
-        for item_idx, score in zip(items, scores):
-            pid = product_reverse_map.get(item_idx)
-            if not pid:
-                continue
-
-            product_info = {
-                "product_id": pid,
-                "product_name_en": "Unknown Product",
-                "price": None,
-                "product_type": "Unknown",
-                "relevance_score": float(score),
-                "recommendation_id": str(uuid.uuid4()),
-            }
-
-            if df_sale is not None and not df_sale.empty:
-                row = df_sale[df_sale['product_id'] == pid]
-                if not row.empty:
-                    first_row = row.iloc[0]
-                    product_info["product_name_en"] = first_row.get("product_name_en", product_info["product_name_en"])
-                    product_info["price"] = first_row.get("product_price", product_info["price"])
-                    product_info["product_type"] = first_row.get("product_type", product_info["product_type"])
+        with STAGE_SECONDS.labels(function, "score").time():
+            if allowed is not None:
+                source = "filtered"
+                seen = user_items_csr.indices[user_items_csr.indptr[user_idx]:user_items_csr.indptr[user_idx + 1]]
+                items, scores = rank_items(model.item_factors, model.user_factors[user_idx], seen, N, allowed)
+            else:
+                hit = topk.user_topk(user_idx, N) if topk is not None else None
+                source = "model" if hit is None else "topk"
+                items, scores = hit if hit is not None else model.recommend(user_idx, user_items_csr[user_idx], N)
+        RECOMMENDATION_SOURCE.labels(function, source).inc()
+        with STAGE_SECONDS.labels(function, "enrich").time():
+            results = _to_results(items, scores, product_reverse_map, catalog)
+
+        return results if results else _fallback(function, "empty", fallback_list, N)
 
-            results.append(product_info)
+    except Exception as e:
+        logger.error(f"Error in recommend_products_for_user: {e}")
+        return _fallback(function, "error", fallback_list, N)
 
-        return results if results else _fallback_products(fallback_list, N)
 
+def recommend_products_for_factor(
+    user_factor: UserFactor,
+    model,
+    product_reverse_map: Dict[int, str],
+    catalog: Optional[ProductCatalog],
+    fallback_list: Optional[pd.DataFrame] = None,
+    N: int = 10,
+    allowed: Optional[np.ndarray] = None,
+) -> List[Dict]:
+    """Recommend top-N products from a user factor solved outside the model (see app.cold_start)."""
+    function = "recommend_products_for_factor"
+    fallback_list = _allowed_fallback(fallback_list, catalog, allowed)
+    RECOMMENDATION_SOURCE.labels(function, user_factor.source).inc()
+    try:
+        with STAGE_SECONDS.labels(function, "score").time():
+            items, scores = rank_items(model.item_factors, user_factor.factor, user_factor.seen, N, allowed)
+        with STAGE_SECONDS.labels(function, "enrich").time():
+            results = _to_results(items, scores, product_reverse_map, catalog)
+        return results or _fallback(function, "empty", fallback_list, N)
     except Exception as e:
-        logger.error(f"Error in recommend_products_for_user: {e}")
-        return _fallback_products(fallback_list, N)
+        logger.error(f"Error in recommend_products_for_factor: {e}")
+        return _fallback(function, "error", fallback_list, N)
 
 
-import uuid
-from typing import List, Dict, Optional
-import pandas as pd
-import logging
+def _rank_users(
+    model, user_items_csr, user_idxs: np.ndarray, N: int, allowed: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise top-N over every item for a chunk of users, skipping seen and disallowed items."""
+    user_factors = np.asarray(model.user_factors[user_idxs], dtype=np.float32)
+    scores = user_factors @ np.asarray(model.item_factors, dtype=np.float32).T
+    liked = user_items_csr[user_idxs]
+    scores[np.repeat(np.arange(len(user_idxs)), np.diff(liked.indptr)), liked.indices] = -np.inf
+    scores[:, ~allowed] = -np.inf
+    # -inf scores left in a row (fewer than N candidates) are dropped by _to_results
+    return select_topk(scores, N)
+
+
+def recommend_products_for_users(
+    user_ids: List[str],
+    model,  # AlternatingLeastSquares
+    user_encoder,
+    product_reverse_map: Dict[int, str],
+    user_items_csr,
+    catalog: Optional[ProductCatalog],
+    N: int = 10,
+    chunk_size: int = 1024,
+    topk: Optional[TopKStore] = None,
+    allowed: Optional[np.ndarray] = None,
+    user_index: Optional[Dict[str, int]] = None,
+) -> Iterator[Tuple[str, Optional[List[Dict]]]]:
+    """Recommend top-N products for many users, yielding (user_id, recs) in input order.
+
+    Users are scored ``chunk_size`` at a time with a single batched
+    ``model.recommend`` call per chunk, so memory stays bounded by the chunk
+    rather than the whole request. Unknown users yield ``None``. With an
+    ``allowed`` mask each chunk is scored against every item instead.
+    Pass the snapshot's ``user_index`` (user id -> row) to avoid rebuilding it
+    from ``user_encoder`` on every call.
+    """
+    function = "recommend_products_for_users"
+    if user_index is None:
+        user_index = {u: i for i, u in enumerate(user_encoder.classes_)}
+    N = min(N, model.item_factors.shape[0])
+    use_topk = topk is not None and N <= topk.k and allowed is None
+    source = "topk" if use_topk else "model" if allowed is None else "filtered"
+
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        known = [user_index[u] for u in chunk if u in user_index]
+
+        rows = {}
+        if known and N > 0:
+            user_idxs = np.asarray(known)
+            try:
+                with STAGE_SECONDS.labels(function, "score").time():
+                    if use_topk:
+                        items, scores = topk.user_items[user_idxs, :N], topk.user_scores[user_idxs, :N]
+                    elif allowed is not None:
+                        items, scores = _rank_users(model, user_items_csr, user_idxs, N, allowed)
+                    else:
+                        items, scores = model.recommend(user_idxs, user_items_csr[user_idxs], N)
+                RECOMMENDATION_SOURCE.labels(function, source).inc(len(known))
+                with STAGE_SECONDS.labels(function, "enrich").time():
+                    for user_idx, item_row, score_row in zip(known, items, scores):
+                        rows[user_idx] = _to_results(item_row, score_row, product_reverse_map, catalog)
+            except Exception as e:
+                logger.error(f"Error in recommend_products_for_users: {e}")
+
+        for user_id in chunk:
+            user_idx = user_index.get(user_id)
+            if user_idx is None:
+                yield user_id, None
+            else:
+                yield user_id, rows.get(user_idx, [])
 
-logger = logging.getLogger(__name__)
 
 def recommend_similar_products(
     product_id: str,
     model,
     product_encoder,
     product_reverse_map: Dict[int, str],
-    df_sale: Optional[pd.DataFrame] = None,
+    catalog: Optional[ProductCatalog] = None,
     fallback_list: Optional[pd.DataFrame] = None,
-    N: int = 10
+    N: int = 10,
+    topk: Optional[TopKStore] = None,
+    similarity_index=None,
+    allowed: Optional[np.ndarray] = None,
 ) -> List[Dict]:
-    """Recommend top-N similar products to a given product."""
-    if product_id not in product_encoder.classes_:
-        return _fallback_products(fallback_list, N)
+    """Recommend top-N similar products to a given product.
+
+    Served from the top-K tables when they cover the request, then from
+    ``similarity_index`` (see app.similarity), then from ``model.similar_items``.
+    Requests filtered by an ``allowed`` mask skip the top-K tables.
+    """
+    function = "recommend_similar_products"
+    fallback_list = _allowed_fallback(fallback_list, catalog, allowed)
+    with STAGE_SECONDS.labels(function, "lookup").time():
+        # The catalog lists the model's products first, in encoded order
+        if catalog is not None:
+            product_idx = catalog.index.get(product_id)
+            if product_idx is not None and product_idx >= catalog.n_encoded:
+                product_idx = None
+        else:
+            product_idx = _encoded_index(product_encoder, product_id)
+    if product_idx is None:
+        return _fallback(function, "unknown_product", fallback_list, N)
 
     try:
-        product_idx = product_encoder.transform([product_id])[0]
-        similar_items, scores = model.similar_items(product_idx, N + 1)
-        filtered_items = [(idx, score) for idx, score in zip(similar_items, scores) if idx != product_idx][:N]
-
-        results = []
-        for idx, score in filtered_items:
-            pid = product_reverse_map.get(idx)
-            if not pid:
-                continue
-
-            product_info = {
-                "product_id": pid,
-                "product_name_en": "Unknown Product",
-                "price": None,
-                "product_type": "Unknown",
-                "relevance_score": float(score),
-                "recommendation_id": str(uuid.uuid4())  # Added UUID here
-            }
-
-            if df_sale is not None and not df_sale.empty:
-                row = df_sale[df_sale['product_id'] == pid].head(1)
-                if not row.empty:
-                    product_info.update({
-                        "product_name_en": row.iloc[0].get("product_name_en", product_info["product_name_en"]),
-                        "price": row.iloc[0].get("price", product_info["price"]),
-                        "product_type": row.iloc[0].get("product_type", product_info["product_type"]),
-                    })
-
-            results.append(product_info)
-
-        return results or _fallback_products(fallback_list, N)
+        with STAGE_SECONDS.labels(function, "score").time():
+            source = "topk"
+            hit = topk.item_topk(product_idx, N) if topk is not None and allowed is None else None
+            if hit is None and similarity_index is not None:
+                source = "similarity_index"
+                hit = similarity_index.search(product_idx, N, allowed)
+            if hit is not None:
+                filtered_items = list(zip(*hit))
+            elif allowed is not None:
+                # Scored over the allowed items only, so a selective filter still returns up to N
+                source = "model"
+                filtered_items = list(zip(*ExactIndex(model.item_factors).search(product_idx, N, allowed)))
+            else:
+                source = "model"
+                similar_items, scores = model.similar_items(product_idx, N + 1)
+                filtered_items = [(idx, score) for idx, score in zip(similar_items, scores) if idx != product_idx][:N]
+        RECOMMENDATION_SOURCE.labels(function, source).inc()
+
+        with STAGE_SECONDS.labels(function, "enrich").time():
+            results = _to_results(
+                [idx for idx, _ in filtered_items], [score for _, score in filtered_items], product_reverse_map, catalog
+            )
+
+        return results or _fallback(function, "empty", fallback_list, N)
 
     except Exception as e:
         logger.error(f"Error in recommend_similar_products: {e}")
-        return _fallback_products(fallback_list, N)
+        return _fallback(function, "error", fallback_list, N)
 
 
 if __name__ == "__main__":
-    print("Sample user IDs:", user_encoder.classes_[:5])
-    print("Sample product IDs:", product_encoder.classes_[:5])
+    snap = default_snapshot()
+    print("Sample user IDs:", snap.user_encoder.classes_[:5])
+    print("Sample product IDs:", snap.product_encoder.classes_[:5])
 
-    test_user = user_encoder.classes_[0]
-    test_product = product_encoder.classes_[0]
+    test_user = snap.user_encoder.classes_[0]
+    test_product = snap.product_encoder.classes_[0]
 
     for rec in recommend_products_for_user(
         test_user,
-        als_model,
-        user_encoder,
-        product_reverse_map,
-        user_items_csr, 
-        ratings,
-        df_sale,
-        fallback_list=df_sale,
+        snap.model,
+        snap.user_encoder,
+        snap.product_reverse_map,
+        snap.user_items_csr, 
+        snap.ratings,
+        snap.catalog,
+        fallback_list=snap.fallback_list,
         N=5
     ):
         print(rec)
@@ -214,6 +508,7 @@ if __name__ == "__main__":
 
     print(f"\nSimilar products to '{test_product}':")
     for rec in recommend_similar_products(
-        test_product, als_model, product_encoder, product_reverse_map, df_sale=df_sale, fallback_list=df_sale, N=5
+        test_product, snap.model, snap.product_encoder, snap.product_reverse_map, catalog=snap.catalog,
+        fallback_list=snap.fallback_list, N=5
     ):
         print(rec)
@@ -0,0 +1,220 @@
+"""Fuzzy product-intent matching for the chatbot.
+
+The vocabulary is built from the product catalog: distinctive words from
+product names and Indonesian/English synonyms for each product category
+("pupuk", "herbisida", "gulma", ...). Products are put in a category when
+its terms show up in their name or description, so the chatbot answers
+"pupuk npk" with real NPK products from the catalog. The catalog's product
+types ("goods", "service", "digital") are not terms: they are ordinary
+words in support questions like "contact customer service".
+
+Misspelled words are looked up in a BK-tree over the vocabulary, which only
+visits the part of the tree within the allowed edit distance instead of
+comparing against every term.
+"""
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .catalog import ProductCatalog
+
+logger = logging.getLogger(__name__)
+
+# Category -> generic words that signal it, in English and Indonesian. Product
+# families ("npk", "urea", brand names) come from the catalog itself.
+CATEGORY_SYNONYMS: Dict[str, List[str]] = {
+    "fertilizer": [
+        "fertilizer", "fertiliser", "fertilizers", "pupuk", "rabuk", "nutrient", "nutrisi", "hara",
+        "compost", "kompos", "manure", "organik", "kapur", "lime", "phosphate", "fosfat",
+        "potassium", "kalium", "nitrogen", "magnesium", "boron",
+    ],
+    "pesticide": [
+        "pesticide", "pesticides", "pestisida", "herbicide", "herbicides", "herbisida", "weed", "weeds",
+        "gulma", "rumput", "insecticide", "insektisida", "fungicide", "fungisida", "hama", "pest", "pests",
+        "glyphosate", "glifosat", "paraquat",
+    ],
+    "seeds": ["seeds", "seed", "bibit", "benih", "kecambah", "germinated"],
+    "electricity token": ["token", "pln", "listrik", "electricity", "pulsa"],
+}
+
+# Words from product names that say nothing about what the farmer is after,
+# mostly because they come up in ordinary palm-oil questions too
+STOPWORDS: Set[str] = {
+    "sawit", "sawitpro", "palm", "oil", "plant", "plants", "leaf", "leaves", "daun", "green", "size",
+    "cap", "crown", "mahkota", "china", "canada", "egypt", "plus", "super", "core", "ready", "liter",
+    "liters", "package", "report", "shipping", "pak", "tani", "the", "and", "for", "with", "agricultural",
+    "unknown", "product",
+}
+
+_TOKEN = re.compile(r"[a-z][a-z0-9]*")
+
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    return _TOKEN.findall(text)
+
+
+def levenshtein(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def max_distance(word: str) -> int:
+    """Typos tolerated for a word of this length.
+
+    None up to five letters: one typo away, everyday words like "taken" and
+    "needs" would read as "token" and "seeds".
+    """
+    if len(word) <= 5:
+        return 0
+    if len(word) <= 7:
+        return 1
+    return 2
+
+
+class BKTree:
+    """Burkhard-Keller tree over edit distance."""
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.root: Optional[Tuple[str, Dict[int, tuple]]] = None
+        self.size = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str) -> None:
+        if self.root is None:
+            self.root = (word, {})
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            d = levenshtein(word, node[0])
+            if d == 0:
+                return
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = (word, {})
+                self.size += 1
+                return
+            node = child
+
+    def search(self, word: str, radius: int) -> List[Tuple[int, str]]:
+        """All (distance, term) within ``radius`` of ``word``, closest first."""
+        if self.root is None:
+            return []
+        found, stack = [], [self.root]
+        while stack:
+            term, children = stack.pop()
+            d = levenshtein(word, term)
+            if d <= radius:
+                found.append((d, term))
+            # Triangle inequality: only children at distance d +/- radius can match
+            for edge, child in children.items():
+                if d - radius <= edge <= d + radius:
+                    stack.append(child)
+        return sorted(found)
+
+
+@dataclass
+class IntentMatch:
+    category: Optional[str]
+    product_indices: List[int]
+    terms: List[str] = field(default_factory=list)
+
+
+class IntentMatcher:
+    def __init__(self, catalog: ProductCatalog, term_products: Dict[str, Set[int]],
+                 term_categories: Dict[str, str], category_products: Dict[str, List[int]]):
+        self.catalog = catalog
+        self.term_products = term_products
+        self.term_categories = term_categories
+        self.category_products = category_products
+        self.product_category = {idx: c for c, members in category_products.items() for idx in members}
+        self.tree = BKTree(sorted(set(term_products) | set(term_categories)))
+
+    def lookup(self, word: str) -> Optional[Tuple[int, str]]:
+        if len(word) < 3 or word in STOPWORDS:
+            return None
+        matches = self.tree.search(word, max_distance(word))
+        return matches[0] if matches else None
+
+    def match(self, message: str, N: int = 5) -> IntentMatch:
+        """Find the product category and products a chat message is asking about."""
+        category_votes: Dict[str, float] = defaultdict(float)
+        product_scores: Dict[int, float] = defaultdict(float)
+        terms = []
+        for word in tokenize(message):
+            hit = self.lookup(word)
+            if hit is None:
+                continue
+            distance, term = hit
+            weight = 1.0 / (1 + distance)
+            terms.append(term)
+            if term in self.term_categories:
+                category_votes[self.term_categories[term]] += weight
+            products = self.term_products.get(term, ())
+            # Words naming a handful of products (brands, "npk") are stronger evidence than broad ones
+            for idx in products:
+                product_scores[idx] += weight / len(products)
+
+        if not terms:
+            return IntentMatch(None, [], [])
+
+        for idx, score in product_scores.items():
+            if idx in self.product_category:
+                category_votes[self.product_category[idx]] += score
+        category = max(category_votes, key=category_votes.get) if category_votes else None
+
+        # Products named in the message first (even if their description didn't place them
+        # in a category), then the rest of the category in catalog order
+        candidates = list(dict.fromkeys(list(product_scores) + self.category_products.get(category, [])))
+        ranked = sorted(candidates, key=lambda idx: -product_scores.get(idx, 0.0))
+        return IntentMatch(category, ranked[:N], terms)
+
+    def recommend(self, message: str, N: int = 5) -> Tuple[Optional[str], List[Dict]]:
+        """The matched category and catalog info for the top N products."""
+        result = self.match(message, N)
+        return result.category, [self.catalog.info(idx) for idx in result.product_indices]
+
+
+def build_intent_matcher(catalog: ProductCatalog, descriptions: Optional[Dict[str, str]] = None) -> IntentMatcher:
+    """Build the matcher vocabulary from the catalog and, optionally, product descriptions."""
+    descriptions = descriptions or {}
+    term_categories = {word: category for category, words in CATEGORY_SYNONYMS.items() for word in words}
+    term_products: Dict[str, Set[int]] = defaultdict(set)
+    category_products: Dict[str, List[int]] = defaultdict(list)
+    type_words = {token for product_type in set(catalog.types) for token in tokenize(str(product_type))}
+
+    for idx in range(len(catalog)):
+        name_tokens = set(tokenize(str(catalog.names[idx])))
+        for token in name_tokens:
+            if (len(token) >= 3 and token not in STOPWORDS and token not in type_words
+                    and not any(c.isdigit() for c in token)):
+                term_products[token].add(idx)
+
+        text_tokens = name_tokens | set(tokenize(descriptions.get(catalog.product_ids[idx], "") or ""))
+        votes = defaultdict(int)
+        for token in text_tokens:
+            if token in term_categories:
+                votes[term_categories[token]] += 1
+        if votes:
+            category_products[max(votes, key=votes.get)].append(idx)
+
+    # "fertilizer" in a few product names must not favour those products over the other fertilizers
+    for word in term_categories:
+        term_products.pop(word, None)
+    logger.info(
+        f"Intent matcher: {len(term_products) + len(term_categories)} terms, "
+        + ", ".join(f"{len(v)} {k}" for k, v in category_products.items())
+    )
+    return IntentMatcher(catalog, dict(term_products), term_categories, dict(category_products))
@@ -0,0 +1,175 @@
+"""Non-blocking access to the chatbot LLM.
+
+``huggingface_hub.InferenceClient`` is synchronous, so every call runs on a
+small dedicated thread pool and an asyncio semaphore caps how many requests
+can be waiting on the LLM at once. The event loop itself never blocks on the
+network. Each call is bounded by ``timeout`` seconds, covering both the
+wait for a free slot and the LLM round trip.
+
+``LLM_BASE_URL`` points the client at any OpenAI-compatible chat completions
+server instead of the Hugging Face router, e.g. a local fake in tests.
+
+``HF_API_KEY`` has no default: without it the client is not ``configured``
+and the chatbot answers 503 instead of calling the LLM.
+
+``huggingface_hub`` takes about half a second to import, so ``from_env`` only
+records the settings and the ``InferenceClient`` is built on the first call.
+"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, Optional
+
+from .metrics import EXTERNAL_SECONDS
+
+if TYPE_CHECKING:
+    from huggingface_hub import InferenceClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "meta-llama/Llama-3.2-3B-Instruct"
+DEFAULT_PARAMS = {"temperature": 0.3, "max_tokens": 300, "top_p": 0.9}
+
+_DONE = object()
+
+
+class LLMTimeout(Exception):
+    pass
+
+
+class LLMClient:
+    def __init__(
+        self,
+        client: Optional["InferenceClient"] = None,
+        model: Optional[str] = DEFAULT_MODEL,
+        params: Optional[Dict] = None,
+        max_concurrency: int = 8,
+        timeout: float = 30.0,
+        client_factory: Optional[Callable[[], "InferenceClient"]] = None,
+        configured: bool = True,
+    ):
+        if client is None and client_factory is None:
+            raise ValueError("Pass an InferenceClient or a client_factory")
+        self._client = client
+        self._client_factory = client_factory
+        self._client_lock = threading.Lock()
+        self.configured = configured
+        self.model = model
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def from_env(cls) -> "LLMClient":
+        timeout = float(os.environ.get("LLM_TIMEOUT", 30))
+        base_url = os.environ.get("LLM_BASE_URL")
+        api_key = os.environ.get("HF_API_KEY")
+        if not api_key:
+            logger.warning("HF_API_KEY is not set, the chatbot cannot call the LLM")
+
+        def _client():
+            from huggingface_hub import InferenceClient
+
+            return InferenceClient(base_url=base_url, api_key=api_key, timeout=timeout)
+
+        return cls(
+            model=os.environ.get("LLM_MODEL", DEFAULT_MODEL),
+            max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", 8)),
+            timeout=timeout,
+            client_factory=_client,
+            configured=bool(api_key),
+        )
+
+    @property
+    def client(self) -> "InferenceClient":
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._client_factory()
+        return self._client
+
+    def _slots(self) -> asyncio.Semaphore:
+        # Created on first use so it belongs to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _messages(self, prompt: str):
+        return [{"role": "user", "content": prompt}]
+
+    def _complete_sync(self, prompt: str) -> str:
+        response = self.client.chat_completion(model=self.model, messages=self._messages(prompt), **self.params)
+        return response.choices[0].message["content"]
+
+    async def complete(self, prompt: str) -> str:
+        """The full reply to ``prompt``. Raises LLMTimeout after ``timeout`` seconds."""
+        loop = asyncio.get_running_loop()
+
+        async def _call():
+            async with self._slots():
+                return await loop.run_in_executor(self._executor, self._complete_sync, prompt)
+
+        start = loop.time()
+        outcome = "error"
+        try:
+            reply = await asyncio.wait_for(_call(), self.timeout)
+            outcome = "ok"
+            return reply
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise LLMTimeout(f"LLM did not answer within {self.timeout:g}s")
+        finally:
+            EXTERNAL_SECONDS.labels("llm", outcome).observe(loop.time() - start)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the reply to ``prompt`` token by token as the LLM produces them."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        deadline = loop.time() + self.timeout
+
+        def _produce():
+            try:
+                for chunk in self.client.chat_completion(
+                    model=self.model, messages=self._messages(prompt), stream=True, **self.params
+                ):
+                    token = chunk.choices[0].delta.content if chunk.choices else None
+                    if token:
+                        loop.call_soon_threadsafe(queue.put_nowait, token)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+        start = loop.time()
+        try:
+            await asyncio.wait_for(self._slots().acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            EXTERNAL_SECONDS.labels("llm", "timeout").observe(loop.time() - start)
+            raise LLMTimeout(f"No LLM slot free within {self.timeout:g}s")
+        outcome = "aborted"  # the caller stopped reading
+        try:
+            loop.run_in_executor(self._executor, _produce)
+            while True:
+                remaining = deadline - loop.time()
+                try:
+                    item = await asyncio.wait_for(queue.get(), max(remaining, 0))
+                except asyncio.TimeoutError:
+                    outcome = "timeout"
+                    raise LLMTimeout(f"LLM did not finish within {self.timeout:g}s")
+                if item is _DONE:
+                    outcome = "ok"
+                    return
+                if isinstance(item, Exception):
+                    outcome = "error"
+                    raise item
+                yield item
+        finally:
+            self._slots().release()
+            EXTERNAL_SECONDS.labels("llm", outcome).observe(loop.time() - start)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
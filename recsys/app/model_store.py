@@ -0,0 +1,193 @@
+"""Atomic, hot-swappable access to the loaded model.
+
+Everything a request needs from the model (factors, encoders, id maps,
+catalog, top-K tables, similarity index, chatbot intent matcher, search index) lives in one immutable
+``ModelSnapshot``. Handlers call ``model_store.current()`` once and use that
+snapshot for the whole request, so a reload can never hand them a mix of old
+encoders and new factors, and in-flight requests finish on the model they
+started with.
+
+The first model can be loaded in a background thread (``load_in_background``)
+so the API starts accepting connections right away; until it is in,
+``current()`` waits up to ``wait_timeout`` seconds and then raises
+``ModelNotReady``; async handlers call ``current(wait=False)``, which raises
+right away.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelSnapshot:
+    version: str
+    model: Any
+    user_encoder: Any
+    product_encoder: Any
+    product_reverse_map: Dict[int, str] = field(repr=False)
+    user_items_csr: Any = field(repr=False)
+    known_users: FrozenSet[str] = field(repr=False)
+    known_products: FrozenSet[str] = field(repr=False)
+    catalog: Any = field(repr=False)
+    ratings: Any = field(default=None, repr=False)
+    topk: Any = field(default=None, repr=False)
+    similarity_index: Any = field(default=None, repr=False)
+    intent_matcher: Any = field(default=None, repr=False)
+    search_index: Any = field(default=None, repr=False)
+    fallback_list: Any = field(default=None, repr=False)
+    fragments: Any = field(default=None, repr=False)
+    user_index: Dict[str, int] = field(default_factory=dict, repr=False)
+    path: Optional[str] = None
+
+
+class ModelNotReady(Exception):
+    pass
+
+
+class ModelStore:
+    """Holds the current ModelSnapshot and swaps it in one reference assignment.
+
+    Either pass the ``snapshot`` to serve, or a ``loader`` that produces the
+    first one on demand or in the background.
+    """
+
+    def __init__(
+        self,
+        snapshot: Optional[ModelSnapshot] = None,
+        loader: Optional[Callable[[], ModelSnapshot]] = None,
+        wait_timeout: float = 60.0,
+    ):
+        if snapshot is None and loader is None:
+            raise ValueError("Pass a snapshot or a loader")
+        self._snapshot = snapshot
+        self._loader = loader
+        self.wait_timeout = wait_timeout
+        self.load_error: Optional[Exception] = None
+        self._loaded = threading.Event()
+        if snapshot is not None:
+            self._loaded.set()
+        self._loading: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[ModelSnapshot], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    def current(self, wait: bool = True) -> ModelSnapshot:
+        """The snapshot to serve. Until the first model is loaded this waits up to
+        ``wait_timeout`` seconds, or with ``wait=False`` (in async code, which must not
+        block the event loop) raises ModelNotReady straight away.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        # Nothing loaded yet: start loading if nobody has, and wait for it
+        self.load_in_background()
+        if wait:
+            self._loaded.wait(self.wait_timeout)
+        if self._snapshot is None:
+            reason = f"failed to load: {self.load_error}" if self.load_error else "still loading"
+            raise ModelNotReady(f"Model {reason}")
+        return self._snapshot
+
+    def load(self) -> ModelSnapshot:
+        """Load the first model in the calling thread, e.g. before gunicorn forks its workers."""
+        self.load_in_background()
+        loading = self._loading
+        if loading is not None:
+            loading.join()
+        return self.current()
+
+    def load_in_background(self) -> None:
+        """Start loading the first model in a daemon thread, unless it is loaded or loading."""
+        with self._lock:
+            if self._snapshot is not None or (self._loading is not None and self._loading.is_alive()):
+                return
+            self._loaded.clear()
+            self._loading = threading.Thread(target=self._load, name="model-loader", daemon=True)
+            self._loading.start()
+
+    def _load(self) -> None:
+        start = time.perf_counter()
+        try:
+            snapshot = self._loader()
+        except Exception as e:
+            logger.error(f"Failed to load the model: {e}")
+            self.load_error = e
+        else:
+            self.load_error = None
+            self.swap(snapshot)
+            logger.info(f"Model {snapshot.version} ready after {time.perf_counter() - start:.2f}s")
+        finally:
+            self._loaded.set()
+
+    def on_swap(self, listener: Callable[[ModelSnapshot], None]) -> None:
+        """Register a callback run after every swap (e.g. to clear caches)."""
+        self._listeners.append(listener)
+
+    def swap(self, snapshot: ModelSnapshot) -> ModelSnapshot:
+        with self._lock:
+            previous = self._snapshot
+            self._snapshot = snapshot
+        if previous is not None:
+            logger.info(f"Swapped model {previous.version} -> {snapshot.version}")
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"Model swap listener failed: {e}")
+        return previous
+
+    def reload_if_changed(
+        self,
+        find_latest: Callable[[], Optional[str]],
+        load: Callable[[str], ModelSnapshot],
+    ) -> bool:
+        """Load and swap in the newest model if its path differs from the current one."""
+        if self._snapshot is None:
+            return False  # the first load is still running
+        path = find_latest()
+        if path is None or path == self._snapshot.path:
+            return False
+        try:
+            snapshot = load(path)
+        except Exception as e:
+            logger.error(f"Failed to load model from {path}, keeping {self._snapshot.version}: {e}")
+            return False
+        self.swap(snapshot)
+        return True
+
+    def start_watching(
+        self,
+        find_latest: Callable[[], Optional[str]],
+        load: Callable[[str], ModelSnapshot],
+        interval: float = 30.0,
+    ) -> None:
+        """Poll for new models every ``interval`` seconds in a daemon thread."""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+
+        def _watch():
+            while not self._stop.wait(interval):
+                try:
+                    self.reload_if_changed(find_latest, load)
+                except Exception as e:
+                    logger.error(f"Model watcher error: {e}")
+
+        self._watcher = threading.Thread(target=_watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+        logger.info(f"Watching for new models every {interval:g}s")
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
@@ -156,3 +156,81 @@ class ApiV1EcommerceRecommendationUserProductPost200Response(BaseModel):
 class ApiV1EcommerceRecommendationUserGet200Response(BaseModel):
     items: Optional[RecommendedProductList] = None
     
+
+
+class UserInteraction(BaseModel):
+    product_id: UUID = Field(
+        ...,
+        description="The ID of a product the user interacted with.",
+        example="123e4567-e89b-12d3-a456-426614174000",
+    )
+    quantity: float = Field(1.0, description="Interaction strength, e.g. the quantity bought.", gt=0, example=2)
+
+
+class ApiV1EcommerceRecommendationUserPostRequestBody(BaseModel):
+    interactions: List[UserInteraction] = Field(
+        ...,
+        description="The user's recent interactions, not yet seen by the model.",
+        min_length=1,
+        max_length=1000,
+    )
+    N: int = Field(10, description="Number of products to recommend.", ge=1, le=100)
+
+
+class ApiV1EcommerceRecommendationUserBatchPostRequestBody(BaseModel):
+    user_ids: List[UUID] = Field(
+        ...,
+        description="User IDs to recommend products for.",
+        example=["123e4567-e89b-12d3-a456-426614174000"],
+        max_length=10000,
+    )
+    N: int = Field(10, description="Number of products to recommend per user.", ge=1, le=100)
+
+
+class UserRecommendationList(BaseModel):
+    user_id: UUID = Field(
+        ...,
+        description="The ID of the user.",
+        example="123e4567-e89b-12d3-a456-426614174000",
+    )
+    items: Optional[RecommendedProductList] = Field(
+        None, description="Recommended products, or null if the user is unknown and has no feedback."
+    )
+
+
+class ApiV1EcommerceRecommendationUserBatchPost200Response(BaseModel):
+    results: List[UserRecommendationList] = Field(
+        ..., description="Recommendations per user, in request order."
+    )
+
+
+class ApiV1EcommerceRecommendationScorePostRequestBody(BaseModel):
+    user_ids: List[UUID] = Field(
+        ...,
+        description="User of each pair to score; same length as product_ids.",
+        example=["123e4567-e89b-12d3-a456-426614174000"],
+        max_length=100000,
+    )
+    product_ids: List[UUID] = Field(
+        ...,
+        description="Product of each pair to score.",
+        example=["123e4567-e89b-12d3-a456-426614174001"],
+        max_length=100000,
+    )
+
+
+class ApiV1EcommerceRecommendationScorePost200Response(BaseModel):
+    model_version: str = Field(..., description="Version of the model that produced the scores.")
+    scores: List[Optional[float]] = Field(
+        ..., description="Score of each pair in request order, or null if the user or product is unknown."
+    )
+
+
+class ProductSearchResultItem(RecommendedProductListItemSimple):
+    score: float = Field(..., description="BM25 relevance score of the product for the query.", example=7.5)
+
+
+class ApiV1EcommerceProductSearchGet200Response(BaseModel):
+    items: List[ProductSearchResultItem] = Field(
+        ..., description="Matching products, most relevant first."
+    )
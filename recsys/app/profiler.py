@@ -0,0 +1,322 @@
+"""Opt-in sampling profiler for single requests, with speedscope output.
+
+A request carrying ``X-Profile-Token: $PROFILE_TOKEN`` is profiled: while it
+runs, a background thread samples the Python stacks (``sys._current_frames``)
+every ``PROFILE_INTERVAL_MS`` milliseconds. Nothing is sampled for other
+requests, and with ``PROFILE_TOKEN`` unset the header is ignored. The
+profile keeps the event loop thread while it is busy and the worker thread
+running the request's endpoint, and is written as a speedscope file
+(https://www.speedscope.app) under ``$SHARED_DIR/profiles``. The response
+names the file in ``X-Profile-Id``.
+
+The same sampler profiles the recommendation functions offline against a
+model bundle; run from the recsys/ directory:
+
+    python -m app.profiler --bundle app/models/bundles/<version> --function user --calls 2000
+"""
+import argparse
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile-token"
+PROFILE_ID_HEADER = b"x-profile-id"
+MAX_DEPTH = 256
+
+Frame = Tuple[str, str, int]  # (qualified name, file, first line)
+
+# Leaf frames of threads that are only waiting: the event loop in select(), pool workers on their queues
+_IDLE = {("select", "selectors.py"), ("wait", "threading.py"), ("_worker", "thread.py")}
+
+
+def default_profile_dir(base_dir: str) -> str:
+    """``PROFILE_DIR``, then ``$SHARED_DIR/profiles``, then ``app/data/profiles``."""
+    if os.environ.get("PROFILE_DIR"):
+        return os.environ["PROFILE_DIR"]
+    if os.environ.get("SHARED_DIR"):
+        return os.path.join(os.environ["SHARED_DIR"], "profiles")
+    return os.path.join(base_dir, "data", "profiles")
+
+
+def _frame(code) -> Frame:
+    # co_qualname is new in Python 3.11; production runs 3.10 (runtime.txt)
+    return getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno
+
+
+def _stack(frame) -> Tuple[Frame, ...]:
+    stack = []
+    while frame is not None and len(stack) < MAX_DEPTH:
+        stack.append(_frame(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()  # root first, as speedscope wants
+    return tuple(stack)
+
+
+def is_idle(stack: Tuple[Frame, ...]) -> bool:
+    if not stack:
+        return True
+    name, filename, _ = stack[-1]
+    return (name.rsplit(".", 1)[-1], os.path.basename(filename)) in _IDLE
+
+
+class Sampler:
+    """Samples the stacks of ``thread_ids`` (default: every other thread) every ``interval`` seconds."""
+
+    def __init__(self, interval: float = 0.001, thread_ids: Optional[List[int]] = None):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        # (thread id, seconds since the previous sample, stack) per sample
+        self.samples: List[Tuple[int, float, Tuple[Frame, ...]]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    def __enter__(self) -> "Sampler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        last = self.started_at
+        while not self._stop.wait(self.interval):
+            # Weighted by the actual gap, which grows when the sampled code holds the GIL
+            now = time.perf_counter()
+            weight, last = now - last, now
+            frames = sys._current_frames()
+            for thread_id in self.thread_ids if self.thread_ids is not None else frames:
+                frame = frames.get(thread_id)
+                if frame is not None and thread_id != own:
+                    self.samples.append((thread_id, weight, _stack(frame)))
+
+
+def to_speedscope(
+    samples: List[Tuple[int, float, Tuple[Frame, ...]]],
+    name: str,
+    duration: float,
+    thread_names: Optional[Dict[int, str]] = None,
+) -> Dict:
+    """Samples as a speedscope "sampled" file, one profile per thread, weighted by seconds."""
+    frames: List[Dict] = []
+    frame_index: Dict[Frame, int] = {}
+    by_thread: Dict[int, Tuple[List[List[int]], List[float]]] = {}
+    for thread_id, weight, stack in samples:
+        indices = []
+        for frame in stack:
+            idx = frame_index.get(frame)
+            if idx is None:
+                idx = frame_index[frame] = len(frames)
+                frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+            indices.append(idx)
+        stacks, weights = by_thread.setdefault(thread_id, ([], []))
+        stacks.append(indices)
+        weights.append(weight)
+
+    thread_names = thread_names or {}
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "recsys app.profiler",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": thread_names.get(thread_id, f"thread {thread_id}"),
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": max(duration, sum(weights)),
+                "samples": stacks,
+                "weights": weights,
+            }
+            for thread_id, (stacks, weights) in by_thread.items()
+        ],
+    }
+
+
+def hottest(profile: Dict, n: int = 15) -> List[Tuple[str, float, float]]:
+    """(function, self seconds, total seconds) of the ``n`` functions with the most self time."""
+    frames = profile["shared"]["frames"]
+    own, total = Counter(), Counter()
+    for p in profile["profiles"]:
+        for stack, weight in zip(p["samples"], p["weights"]):
+            if stack:
+                own[stack[-1]] += weight
+            for idx in set(stack):
+                total[idx] += weight
+    return [
+        (f"{frames[idx]['name']} ({os.path.basename(frames[idx]['file'])}:{frames[idx]['line']})", seconds, total[idx])
+        for idx, seconds in own.most_common(n)
+    ]
+
+
+def write_profile(profile: Dict, out_dir: str, profile_id: str) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{profile_id}.speedscope.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(profile, f)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+class ProfilerMiddleware:
+    """ASGI middleware profiling requests that carry the profiling token.
+
+    Without a ``token`` it passes everything straight through.
+    """
+
+    def __init__(self, app, token: Optional[str] = None, out_dir: str = ".", interval: float = 0.001):
+        self.app = app
+        self.token = token.encode() if token else None
+        self.out_dir = out_dir
+        self.interval = interval
+
+    def _wants_profile(self, scope) -> bool:
+        if self.token is None or scope["type"] != "http":
+            return False
+        for key, value in scope.get("headers", ()):
+            if key == PROFILE_HEADER:
+                return hmac.compare_digest(value, self.token)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+        loop_thread = threading.get_ident()
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (PROFILE_ID_HEADER, profile_id.encode())]
+            await send(message)
+
+        sampler = Sampler(self.interval)
+        sampler.start()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            sampler.stop()
+            self._save(scope, sampler, loop_thread, profile_id)
+
+    def _save(self, scope, sampler: Sampler, loop_thread: int, profile_id: str) -> None:
+        # The router leaves the matched endpoint in the scope; its worker thread is the one running it
+        endpoint = scope.get("endpoint")
+        code = getattr(endpoint, "__code__", None)
+        marker = _frame(code) if code else None
+
+        def _keep(thread_id, stack):
+            if thread_id == loop_thread:
+                return not is_idle(stack)
+            return marker is not None and marker in stack
+
+        samples = [s for s in sampler.samples if _keep(s[0], s[2])]
+        names = {t.ident: t.name for t in threading.enumerate()}
+        names[loop_thread] = "event loop"
+        route = getattr(scope.get("route"), "path", scope["path"])
+        profile = to_speedscope(samples, f"{scope['method']} {route}", sampler.duration, names)
+        try:
+            path = write_profile(profile, self.out_dir, profile_id)
+            logger.info(f"Profiled {scope['method']} {scope['path']} ({sampler.duration * 1000:.1f} ms, "
+                        f"{len(samples)} samples) to {path}")
+        except OSError as e:
+            logger.error(f"Could not write profile {profile_id}: {e}")
+
+
+def profile_call(fn: Callable, interval: float = 0.001) -> Tuple[object, Dict]:
+    """Run ``fn()`` in this thread under the sampler; return (its result, the speedscope profile)."""
+    with Sampler(interval, thread_ids=[threading.get_ident()]) as sampler:
+        result = fn()
+    name = getattr(fn, "__name__", "profile")
+    return result, to_speedscope(sampler.samples, name, sampler.duration, {threading.get_ident(): "main"})
+
+
+def main():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Profile the recommendation functions against a model bundle.")
+    parser.add_argument("--bundle", default=None, help="bundle directory (default: the newest bundle, else the pickles)")
+    parser.add_argument("--function", choices=["user", "similar"], default="user")
+    parser.add_argument("--ids", nargs="*", default=None, help="user or product ids (default: random known ones)")
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("-N", type=int, default=10)
+    parser.add_argument("--interval-ms", type=float, default=1.0)
+    parser.add_argument("--no-topk", action="store_true", help="score with the model even if top-K tables exist")
+    parser.add_argument("--out", default=None, help=f"output file (default: under {default_profile_dir(base_dir)})")
+    args = parser.parse_args()
+
+    import numpy as np
+
+    from .inference import find_latest_bundle, load_snapshot, recommend_products_for_user, recommend_similar_products
+
+    snap = load_snapshot(args.bundle or find_latest_bundle())
+    topk = None if args.no_topk else snap.topk
+    rng = np.random.default_rng(0)
+    if args.function == "user":
+        ids = args.ids or list(snap.user_encoder.classes_)
+        picks = [ids[i] for i in rng.integers(len(ids), size=args.calls)]
+
+        def run():
+            for user_id in picks:
+                recommend_products_for_user(
+                    user_id, snap.model, snap.user_encoder, snap.product_reverse_map, snap.user_items_csr,
+                    snap.ratings, snap.catalog, fallback_list=snap.fallback_list, N=args.N, topk=topk,
+                )
+        run.__name__ = "recommend_products_for_user"
+    else:
+        ids = args.ids or list(snap.product_encoder.classes_)
+        picks = [ids[i] for i in rng.integers(len(ids), size=args.calls)]
+
+        def run():
+            for product_id in picks:
+                recommend_similar_products(
+                    product_id, snap.model, snap.product_encoder, snap.product_reverse_map, snap.catalog,
+                    fallback_list=snap.fallback_list, N=args.N, topk=topk, similarity_index=snap.similarity_index,
+                )
+        run.__name__ = "recommend_similar_products"
+
+    start = time.perf_counter()
+    _, profile = profile_call(run, args.interval_ms / 1000)
+    elapsed = time.perf_counter() - start
+    profile["name"] = f"{run.__name__} x{args.calls} on {snap.version}"
+
+    out = args.out or os.path.join(
+        default_profile_dir(base_dir), f"{run.__name__}-{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}.speedscope.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(profile, f)
+
+    print(f"{args.calls} calls of {run.__name__} on model {snap.version}: "
+          f"{elapsed / args.calls * 1e6:.0f} us per call")
+    print(f"{'self s':>8} {'total s':>8}  function")
+    for function, own, total in hottest(profile):
+        print(f"{own:>8.3f} {total:>8.3f}  {function}")
+    print(f"Wrote {out} (open it at https://www.speedscope.app)")
+
+
+if __name__ == "__main__":
+    main()
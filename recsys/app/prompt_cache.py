@@ -0,0 +1,143 @@
+"""On-disk cache of LLM answers, shared by the API and the Streamlit app.
+
+Entries live in a SQLite file and are keyed on the model, the temperature and
+the normalized prompt (case, surrounding whitespace and trailing punctuation
+don't matter), so "Kenapa daun sawit saya kuning?" and "kenapa daun sawit
+saya kuning" hit the same entry. Entries expire after ``ttl`` seconds and the
+least recently used ones are evicted beyond ``maxsize``. Hit/miss counts are
+stored per namespace in the same file, so the hit rate covers every process
+using it.
+
+Only depends on the standard library: the Streamlit app imports this file
+directly from recsys/app.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    text = unicodedata.normalize("NFKC", prompt).lower().strip()
+    text = _WHITESPACE.sub(" ", text)
+    return text.rstrip("?!. ")
+
+
+def default_cache_path(base_dir: str) -> str:
+    """``LLM_CACHE_PATH``, then ``$SHARED_DIR/llm_cache.sqlite3``, then ``app/data/llm_cache.sqlite3``."""
+    if os.environ.get("LLM_CACHE_PATH"):
+        return os.environ["LLM_CACHE_PATH"]
+    if os.environ.get("SHARED_DIR"):
+        return os.path.join(os.environ["SHARED_DIR"], "llm_cache.sqlite3")
+    return os.path.join(base_dir, "data", "llm_cache.sqlite3")
+
+
+class PromptCache:
+    def __init__(self, path: str, maxsize: int = 10_000, ttl: float = 7 * 24 * 3600, timer=time.time):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._local = threading.local()
+        if maxsize > 0:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            # Not kept: the cache is usually built at import, before gunicorn forks the workers
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS answers ("
+                    " key TEXT PRIMARY KEY, model TEXT, temperature REAL, prompt TEXT, answer TEXT,"
+                    " created_at REAL, used_at REAL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS answers_used_at ON answers (used_at)")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS stats (namespace TEXT PRIMARY KEY, hits INTEGER, misses INTEGER)"
+                )
+            finally:
+                conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread and process; WAL lets readers in other processes run
+        # alongside a writer. SQLite connections must not be used across a fork, so a
+        # forked child opens its own instead of touching the one it inherited.
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.conn = self._connect()
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    @staticmethod
+    def key(model: str, temperature: float, prompt: str) -> str:
+        raw = f"{model}\x00{float(temperature):.3f}\x00{normalize_prompt(prompt)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _count(self, conn, namespace: str, hit: bool) -> None:
+        column = "hits" if hit else "misses"
+        conn.execute(
+            f"INSERT INTO stats (namespace, hits, misses) VALUES (?, ?, ?) "
+            f"ON CONFLICT(namespace) DO UPDATE SET {column} = {column} + 1",
+            (namespace, int(hit), int(not hit)),
+        )
+
+    def get(self, model: str, temperature: float, prompt: str, namespace: str = "default") -> Optional[str]:
+        if self.maxsize <= 0:
+            return None
+        conn = self._conn()
+        key = self.key(model, temperature, prompt)
+        now = self._timer()
+        row = conn.execute("SELECT answer, created_at FROM answers WHERE key = ?", (key,)).fetchone()
+        if row is not None and row[1] + self.ttl <= now:
+            conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+            row = None
+        if row is not None:
+            conn.execute("UPDATE answers SET used_at = ? WHERE key = ?", (now, key))
+        self._count(conn, namespace, row is not None)
+        return row[0] if row is not None else None
+
+    def set(self, model: str, temperature: float, prompt: str, answer: str) -> None:
+        if self.maxsize <= 0:
+            return
+        conn = self._conn()
+        now = self._timer()
+        conn.execute(
+            "INSERT OR REPLACE INTO answers (key, model, temperature, prompt, answer, created_at, used_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self.key(model, temperature, prompt), model, float(temperature), normalize_prompt(prompt), answer, now, now),
+        )
+        conn.execute(
+            "DELETE FROM answers WHERE key IN ("
+            " SELECT key FROM answers ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,),
+        )
+
+    def clear(self) -> None:
+        if self.maxsize > 0:
+            conn = self._conn()
+            conn.execute("DELETE FROM answers")
+            conn.execute("DELETE FROM stats")
+
+    def stats(self) -> Dict:
+        if self.maxsize <= 0:
+            return {"size": 0, "maxsize": 0, "namespaces": {}}
+        conn = self._conn()
+        size = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        namespaces = {
+            namespace: {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else None,
+            }
+            for namespace, hits, misses in conn.execute("SELECT namespace, hits, misses FROM stats ORDER BY namespace")
+        }
+        return {"size": size, "maxsize": self.maxsize, "ttl_seconds": self.ttl, "namespaces": namespaces}
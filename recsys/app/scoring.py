@@ -0,0 +1,56 @@
+"""Vectorized scoring of arbitrary (user, product) pairs.
+
+The score of a pair is the dot product of its user and item factors. Factor
+rows are gathered chunk by chunk and multiplied with one ``einsum`` per chunk,
+so scoring a million pairs takes a few hundred NumPy calls instead of a million
+``.dot`` calls, and the gathered rows never take more than ``chunk_size`` rows
+of memory. Pairs with an index outside the factor matrices score 0 and are
+flagged in the returned mask.
+"""
+from typing import Tuple
+
+import numpy as np
+
+
+def valid_pairs(n_users: int, n_items: int, users: np.ndarray, items: np.ndarray) -> np.ndarray:
+    return (users >= 0) & (users < n_users) & (items >= 0) & (items < n_items)
+
+
+def score_pairs(
+    user_factors: np.ndarray,
+    item_factors: np.ndarray,
+    users,
+    items,
+    chunk_size: int = 16384,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (scores, valid) for the pairs ``(users[i], items[i])``.
+
+    ``scores[i]`` is ``user_factors[users[i]] . item_factors[items[i]]`` as
+    float32, or 0 where ``valid[i]`` is False because either index is out of range.
+    """
+    users = np.asarray(users, dtype=np.int64).ravel()
+    items = np.asarray(items, dtype=np.int64).ravel()
+    if users.shape != items.shape:
+        raise ValueError(f"Got {len(users)} users but {len(items)} items")
+
+    valid = valid_pairs(user_factors.shape[0], item_factors.shape[0], users, items)
+    if not valid.all():
+        rows = np.flatnonzero(valid)
+        users, items = users[rows], items[rows]
+
+    # np.take into reused buffers gathers rows several times faster than fancy indexing
+    size = min(chunk_size, len(users))
+    user_buf = np.empty((size, user_factors.shape[1]), dtype=user_factors.dtype)
+    item_buf = np.empty((size, item_factors.shape[1]), dtype=item_factors.dtype)
+    out = np.empty(len(users), dtype=np.float32)
+    for start in range(0, len(users), chunk_size):
+        n = min(chunk_size, len(users) - start)
+        np.take(user_factors, users[start:start + n], axis=0, out=user_buf[:n])
+        np.take(item_factors, items[start:start + n], axis=0, out=item_buf[:n])
+        out[start:start + n] = np.einsum("ij,ij->i", user_buf[:n], item_buf[:n])
+
+    if len(out) == len(valid):
+        return out, valid
+    scores = np.zeros(len(valid), dtype=np.float32)
+    scores[valid] = out
+    return scores, valid
@@ -0,0 +1,132 @@
+"""In-memory BM25 full-text search over the product catalog.
+
+The inverted index is a CSR-style layout of numpy arrays: for term ``t`` the
+postings are ``doc_ids[offsets[t]:offsets[t + 1]]`` with matching term
+frequencies, so a query touches only the postings of its own terms. Scores
+are accumulated into a dense array and the top N taken with argpartition.
+
+Product names are weighted ``name_boost`` times a description occurrence, so
+"npk" ranks the NPK products above ones that only mention NPK in passing.
+"""
+import logging
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .catalog import ProductCatalog
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    # English
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "i", "in", "is", "it", "its",
+    "of", "on", "or", "that", "the", "this", "to", "was", "what", "when", "which", "with", "my", "me",
+    "can", "do", "does", "need", "want", "you", "your",
+    # Indonesian
+    "ada", "apa", "buat", "dan", "dari", "di", "dengan", "ini", "itu", "ke", "saya", "untuk", "yang",
+    "bagaimana", "cara", "mau", "butuh", "beli",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    return [t for t in _TOKEN.findall(text) if t not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(
+        self,
+        vocabulary: Dict[str, int],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(doc_lengths)
+        df = np.diff(offsets).astype(np.float64)
+        self.idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avg_length = float(doc_lengths.mean()) if self.n_docs else 1.0
+        # Per-document part of the BM25 denominator, precomputed once
+        self._length_norm = (k1 * (1 - b + b * doc_lengths / max(avg_length, 1e-9))).astype(np.float32)
+
+    @classmethod
+    def build(cls, names: Iterable[str], descriptions: Iterable[str], name_boost: int = 3, **kwargs) -> "BM25Index":
+        vocabulary: Dict[str, int] = {}
+        term_ids, doc_ids, doc_lengths = [], [], []
+        for doc, (name, description) in enumerate(zip(names, descriptions)):
+            tokens = tokenize(name or "") * name_boost + tokenize(description or "")
+            doc_lengths.append(len(tokens))
+            for token in tokens:
+                term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                doc_ids.append(doc)
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        n_docs = len(doc_lengths)
+        # Count (term, doc) pairs, then lay the postings out term by term
+        pairs, tfs = np.unique(term_ids * max(n_docs, 1) + doc_ids, return_counts=True)
+        pair_terms = pairs // max(n_docs, 1)
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pair_terms, minlength=len(vocabulary)), out=offsets[1:])
+        return cls(
+            vocabulary,
+            offsets,
+            (pairs % max(n_docs, 1)).astype(np.int32),
+            tfs.astype(np.float32),
+            np.asarray(doc_lengths, dtype=np.float32),
+            **kwargs,
+        )
+
+    def search(self, query: str, N: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-N (doc ids, BM25 scores) for ``query``, best first."""
+        term_ids = {self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary}
+        if not term_ids or N <= 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for t in term_ids:
+            start, end = self.offsets[t], self.offsets[t + 1]
+            docs, tf = self.doc_ids[start:end], self.tfs[start:end]
+            # A document appears once per term's postings, so plain fancy-index += is safe
+            scores[docs] += self.idf[t] * tf * (self.k1 + 1) / (tf + self._length_norm[docs])
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > N:
+            candidates = candidates[np.argpartition(-scores[candidates], N - 1)[:N]]
+        order = np.argsort(-scores[candidates], kind="stable")
+        return candidates[order].astype(np.int32), scores[candidates[order]]
+
+
+class ProductSearch:
+    """BM25 index over a ProductCatalog; results come back as catalog info dicts."""
+
+    def __init__(self, catalog: ProductCatalog, descriptions: Optional[Dict[str, str]] = None, **kwargs):
+        descriptions = descriptions or {}
+        self.catalog = catalog
+        self.index = BM25Index.build(
+            (str(name) for name in catalog.names),
+            (descriptions.get(pid, "") for pid in catalog.product_ids),
+            **kwargs,
+        )
+        logger.info(f"Search index: {len(catalog)} products, {len(self.index.vocabulary)} terms")
+
+    def search(self, query: str, N: int = 10, min_score: float = 0.0) -> List[Dict]:
+        docs, scores = self.index.search(query, N)
+        return [
+            {**self.catalog.info(int(doc)), "score": float(score)}
+            for doc, score in zip(docs, scores)
+            if score >= min_score
+        ]
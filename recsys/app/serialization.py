@@ -0,0 +1,105 @@
+"""Fast JSON encoding of recommendation responses.
+
+The pydantic path builds a ``RecommendedProductListItem`` per item, wraps
+them in the response model, and FastAPI validates the result again against
+``response_model`` before encoding it. The fields describing a product
+(id, name, type, price) only change with the catalog, so ``ProductFragments``
+encodes them once per product when the model is loaded, and a response is
+joined from those fragments plus the two per-response fields,
+``recommendation_id`` and ``relevance_score``. The bytes are the same
+``model_dump_json`` would produce, and endpoints return them directly,
+which skips FastAPI's response validation (the schema still documents
+``response_model``).
+
+Products missing from the catalog (the popular-products fallback, unmapped
+items) are validated through the pydantic model as before.
+"""
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from .catalog import ProductCatalog
+from .models import RecommendedProductListItemSimple
+
+logger = logging.getLogger(__name__)
+
+# One encoded item, without its recommendation id: (b'{"product_id":...,"recommendation_id":"', b'","relevance_score":0.9}')
+Item = Tuple[bytes, bytes]
+
+_ID_KEY = b',"recommendation_id":"'
+
+
+def _prefix(product: Dict) -> bytes:
+    """The item's product fields as an open JSON object, up to the recommendation id's value."""
+    # The simple item has the same product fields, in the same order, as RecommendedProductListItem
+    encoded = RecommendedProductListItemSimple(**product).model_dump_json().encode()
+    return encoded[:-1] + _ID_KEY
+
+
+def _tail(score: Optional[float]) -> bytes:
+    return b'","relevance_score":' + orjson.dumps(None if score is None else float(score)) + b"}"
+
+
+class ProductFragments:
+    """Pre-encoded JSON of every catalog product's fields, keyed by product id."""
+
+    def __init__(self, catalog: ProductCatalog):
+        self._prefixes: Dict[str, bytes] = {}
+        for idx in range(len(catalog)):
+            product = catalog.info(idx)
+            try:
+                self._prefixes[product["product_id"]] = _prefix(product)
+            except Exception as e:
+                logger.warning(f"Product {product['product_id']} cannot be encoded: {e}")
+
+    def __len__(self) -> int:
+        return len(self._prefixes)
+
+    def encode_items(self, recs: Iterable[Dict]) -> List[Item]:
+        """Encode recommendations from app.inference, dropping the ones that do not validate."""
+        items = []
+        for rec in recs:
+            prefix = self._prefixes.get(rec["product_id"])
+            try:
+                if prefix is None:
+                    prefix = _prefix(rec)
+                items.append((prefix, _tail(rec.get("relevance_score"))))
+            except Exception as e:
+                logger.error(f"Failed to parse recommended product item: {e}")
+        return items
+
+
+def fresh_ids(n: int) -> List[bytes]:
+    """``n`` random version 4 UUIDs, encoded, from one ``os.urandom`` call.
+
+    ``uuid.uuid4()`` reads the OS random source once per id and takes a few
+    microseconds, more than encoding the rest of an item.
+    """
+    raw = bytearray(os.urandom(16 * n))
+    raw[6::16] = bytes([(b & 0x0F) | 0x40 for b in raw[6::16]])  # version 4
+    raw[8::16] = bytes([(b & 0x3F) | 0x80 for b in raw[8::16]])  # RFC 4122 variant
+    h = raw.hex()
+    return [
+        f"{h[i:i + 8]}-{h[i + 8:i + 12]}-{h[i + 12:i + 16]}-{h[i + 16:i + 20]}-{h[i + 20:i + 32]}".encode()
+        for i in range(0, 32 * n, 32)
+    ]
+
+
+def items_json(items: List[Item]) -> bytes:
+    """A JSON array of the items, each with a fresh recommendation id."""
+    ids = fresh_ids(len(items))
+    return b"[" + b",".join(prefix + rid + tail for (prefix, tail), rid in zip(items, ids)) + b"]"
+
+
+def recommendations_json(items: List[Item]) -> bytes:
+    """The body of a user or similar-products response: ``{"items": [...]}``."""
+    return b'{"items":' + items_json(items) + b"}"
+
+
+def user_recommendations_json(user_id: str, items: Optional[List[Item]]) -> bytes:
+    """One ``UserRecommendationList``; ``items`` is None for unknown users."""
+    return b'{"user_id":' + orjson.dumps(user_id) + b',"items":' + (
+        b"null" if items is None else items_json(items)
+    ) + b"}"
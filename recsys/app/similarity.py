@@ -0,0 +1,151 @@
+"""Similarity indexes over item factors for the similar-products endpoint.
+
+``ExactIndex`` scores the query against every item and is the reference
+mode. ``IVFIndex`` clusters the (normalized) item factors with spherical
+k-means and only scores the items in the ``n_probe`` clusters closest to the
+query, which keeps queries fast once the catalog reaches hundreds of
+thousands of products.
+
+Pick one with the ``SIMILARITY_INDEX`` environment variable (``exact`` or
+``ivf``); ``IVF_N_LISTS`` and ``IVF_N_PROBE`` tune the IVF index.
+"""
+import logging
+import math
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(factors: np.ndarray) -> np.ndarray:
+    factors = np.asarray(factors, dtype=np.float32)
+    norms = np.linalg.norm(factors, axis=1)
+    norms[norms == 0] = 1e-10
+    return factors / norms[:, None]
+
+
+def _top_n(candidates: np.ndarray, scores: np.ndarray, N: int) -> Tuple[np.ndarray, np.ndarray]:
+    if N < len(scores):
+        part = np.argpartition(-scores, N - 1)[:N]
+    else:
+        part = np.arange(len(scores))
+    order = part[np.argsort(-scores[part], kind="stable")]
+    return candidates[order], scores[order]
+
+
+class ExactIndex:
+    """Brute-force cosine similarity over every item."""
+
+    kind = "exact"
+
+    def __init__(self, item_factors: np.ndarray):
+        self.normed = _normalize(item_factors)
+        self._all = np.arange(self.normed.shape[0])
+
+    def __len__(self) -> int:
+        return self.normed.shape[0]
+
+    def search(self, item_idx: int, N: int, allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-N most similar items to ``item_idx``, excluding the item itself and items not ``allowed``."""
+        scores = self.normed @ self.normed[item_idx]
+        scores[item_idx] = -np.inf
+        if allowed is None:
+            return _top_n(self._all, scores, min(N, len(self) - 1))
+        scores[~allowed] = -np.inf
+        return _top_n(self._all, scores, min(N, int(np.count_nonzero(scores > -np.inf))))
+
+
+class IVFIndex:
+    """Inverted-file index: spherical k-means lists, probed at query time."""
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        item_factors: np.ndarray,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        n_iter: int = 10,
+        sample_size: int = 50_000,
+        seed: int = 0,
+    ):
+        self.normed = _normalize(item_factors)
+        n_items = self.normed.shape[0]
+        self.n_lists = max(1, min(n_lists or int(math.sqrt(n_items)), n_items))
+        self.n_probe = max(1, min(n_probe, self.n_lists))
+
+        self.centroids = self._train_centroids(n_iter, sample_size, seed)
+        assignment = self._assign(self.normed)
+        self.list_items = np.argsort(assignment, kind="stable").astype(np.int64)
+        counts = np.bincount(assignment, minlength=self.n_lists)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def __len__(self) -> int:
+        return self.normed.shape[0]
+
+    def _assign(self, vectors: np.ndarray, block_size: int = 8192) -> np.ndarray:
+        out = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], block_size):
+            out[start:start + block_size] = np.argmax(vectors[start:start + block_size] @ self.centroids.T, axis=1)
+        return out
+
+    def _train_centroids(self, n_iter: int, sample_size: int, seed: int) -> np.ndarray:
+        rng = np.random.default_rng(seed)
+        n_items = self.normed.shape[0]
+        sample = self.normed
+        if n_items > sample_size:
+            sample = self.normed[rng.choice(n_items, size=sample_size, replace=False)]
+
+        self.centroids = sample[rng.choice(sample.shape[0], size=self.n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignment = self._assign(sample)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assignment, sample)
+            empty = np.bincount(assignment, minlength=self.n_lists) == 0
+            # re-seed empty lists with random points so every list stays in use
+            sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()))]
+            self.centroids = _normalize(sums)
+        return self.centroids
+
+    def search(self, item_idx: int, N: int, allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-N most similar items to ``item_idx``, excluding the item itself and items not ``allowed``.
+
+        When the probed lists hold fewer than N allowed items, every allowed item is scored.
+        """
+        query = self.normed[item_idx]
+        centroid_scores = self.centroids @ query
+        if self.n_probe < self.n_lists:
+            probe = np.argpartition(-centroid_scores, self.n_probe - 1)[:self.n_probe]
+        else:
+            probe = np.arange(self.n_lists)
+
+        candidates = np.concatenate(
+            [self.list_items[self.list_offsets[p]:self.list_offsets[p + 1]] for p in probe]
+        )
+        candidates = candidates[candidates != item_idx]
+        if allowed is not None:
+            candidates = candidates[allowed[candidates]]
+            if len(candidates) < N:
+                candidates = np.flatnonzero(allowed)
+                candidates = candidates[candidates != item_idx]
+        scores = self.normed[candidates] @ query
+        return _top_n(candidates, scores, min(N, len(candidates)))
+
+
+def build_similarity_index(item_factors: np.ndarray, kind: Optional[str] = None):
+    """Build the similarity index selected by ``kind`` or ``SIMILARITY_INDEX``."""
+    kind = (kind or os.environ.get("SIMILARITY_INDEX", "exact")).lower()
+    if kind == "exact":
+        return ExactIndex(item_factors)
+    if kind == "ivf":
+        n_lists = os.environ.get("IVF_N_LISTS")
+        index = IVFIndex(
+            item_factors,
+            n_lists=int(n_lists) if n_lists else None,
+            n_probe=int(os.environ.get("IVF_N_PROBE", 8)),
+        )
+        logger.info(f"Built IVF similarity index with {index.n_lists} lists, probing {index.n_probe}")
+        return index
+    raise ValueError(f"Unknown similarity index '{kind}', expected 'exact' or 'ivf'")
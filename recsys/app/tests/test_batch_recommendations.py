@@ -0,0 +1,79 @@
+import json
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.inference import recommend_products_for_user, recommend_products_for_users, recommend_similar_products
+
+client = TestClient(main.app)
+URL = "/api/v1/ecommerce/recommendation/users"
+
+
+def test_batch_matches_single_user_endpoint():
+    user_ids = list(main.model_store.current().user_encoder.classes_[:5])
+    response = client.post(URL, json={"user_ids": user_ids, "N": 5})
+    assert response.status_code == 200
+
+    results = response.json()["results"]
+    assert [r["user_id"] for r in results] == user_ids
+    for result in results:
+        single = client.get(f"/api/v1/ecommerce/recommendation/user/{result['user_id']}?N=5").json()
+        assert [i["product_id"] for i in result["items"]] == [i["product_id"] for i in single["items"]]
+        assert len(result["items"]) <= 5
+
+
+def test_batch_unknown_user_has_null_items():
+    unknown = str(uuid.uuid4())
+    known = main.model_store.current().user_encoder.classes_[0]
+    response = client.post(URL, json={"user_ids": [unknown, known], "N": 3})
+
+    results = response.json()["results"]
+    assert results[0] == {"user_id": unknown, "items": None}
+    assert results[1]["user_id"] == known
+    assert results[1]["items"]
+
+
+def test_batch_stream_is_ndjson_in_request_order():
+    user_ids = list(main.model_store.current().user_encoder.classes_) * 30  # spans several scoring chunks
+    response = client.post(f"{URL}?stream=true", json={"user_ids": user_ids, "N": 2})
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["user_id"] for line in lines] == user_ids
+
+
+def test_batch_looks_users_up_in_the_given_index():
+    snap = main.model_store.current()
+    user_ids = list(snap.user_encoder.classes_[:2])
+
+    results = dict(recommend_products_for_users(
+        user_ids, snap.model, snap.user_encoder, snap.product_reverse_map, snap.user_items_csr, snap.catalog, N=3,
+        user_index={user_ids[1]: snap.user_index[user_ids[1]]},
+    ))
+
+    assert results[user_ids[0]] is None and results[user_ids[1]]
+
+
+class _UnscannableEncoder:
+    @property
+    def classes_(self):
+        raise AssertionError("classes_ scanned on the request path")
+
+    def transform(self, ids):
+        raise AssertionError("classes_ scanned on the request path")
+
+
+def test_single_lookups_use_the_prebuilt_indexes():
+    snap = main.model_store.current()
+    encoder = _UnscannableEncoder()
+
+    recs = recommend_products_for_user(
+        snap.user_encoder.classes_[0], snap.model, encoder, snap.product_reverse_map, snap.user_items_csr, None,
+        snap.catalog, N=3, user_index=snap.user_index,
+    )
+    similar = recommend_similar_products(
+        snap.product_encoder.classes_[0], snap.model, encoder, snap.product_reverse_map, snap.catalog, N=3,
+    )
+
+    assert len(recs) == 3 and len(similar) == 3
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pytest
+
+from app import inference
+from app.bundle import MANIFEST, IdEncoder, convert_pickles, latest_bundle, load_bundle, orient_model, write_bundle
+
+MODELS_DIR = os.path.join(inference.BASE_DIR, "models")
+
+
+def test_converted_bundle_recommends_like_the_pickles(tmp_path):
+    path = convert_pickles(MODELS_DIR, str(tmp_path), version="v1")
+    bundle = load_bundle(path)
+
+    assert isinstance(bundle.model.user_factors, np.memmap)
+    assert list(bundle.user_encoder.classes_) == list(inference.user_encoder.classes_)
+    assert bundle.product_reverse_map == {int(k): v for k, v in inference.product_reverse_map.items()}
+    assert (bundle.user_items_csr != inference.user_items_csr).nnz == 0
+
+    for user_idx in range(0, bundle.user_items_csr.shape[0], 10):
+        items, scores = bundle.model.recommend(user_idx, bundle.user_items_csr[user_idx], 5)
+        live_items, live_scores = inference.als_model.recommend(user_idx, inference.user_items_csr[user_idx], 5)
+        assert list(items) == list(live_items)
+        np.testing.assert_allclose(scores, live_scores, rtol=1e-5)
+
+    assert bundle.user_encoder.transform([inference.user_encoder.classes_[3]])[0] == 3
+
+
+def test_latest_bundle_skips_incomplete_versions(tmp_path):
+    assert latest_bundle(str(tmp_path)) is None
+    convert_pickles(MODELS_DIR, str(tmp_path), version="20250101T000000")
+    convert_pickles(MODELS_DIR, str(tmp_path), version="20250201T000000")
+    os.makedirs(tmp_path / "20250301T000000")  # still being written, no manifest yet
+
+    assert latest_bundle(str(tmp_path)) == str(tmp_path / "20250201T000000")
+    assert os.path.isfile(tmp_path / "20250201T000000" / MANIFEST)
+
+
+def test_write_bundle_rejects_mismatched_shapes(tmp_path):
+    with pytest.raises(ValueError):
+        write_bundle(str(tmp_path), np.zeros((2, 4)), np.zeros((3, 4)), np.zeros((2, 2)), ["u1", "u2"], ["p1", "p2"])
+
+
+def test_id_encoder_matches_label_encoder():
+    from sklearn.preprocessing import LabelEncoder
+
+    ids = ["c", "a", "b", "a"]
+    sk = LabelEncoder().fit(ids)
+    ours = IdEncoder(sk.classes_)
+
+    assert ours.transform(["b", "c", "a"]).tolist() == sk.transform(["b", "c", "a"]).tolist()
+    assert ours.inverse_transform([2, 0]).tolist() == ["c", "a"]
+    for unknown in (["d"], ["0"], ["a", "zz"]):
+        with pytest.raises(ValueError):
+            ours.transform(unknown)
+
+
+def test_orient_model_drops_gramians_cached_before_the_swap():
+    from implicit.cpu.als import AlternatingLeastSquares
+
+    rng = np.random.default_rng(0)
+    model = AlternatingLeastSquares(factors=4)
+    model.user_factors = rng.normal(size=(5, 4)).astype(np.float32)  # fitted on item x user: 5 items
+    model.item_factors = rng.normal(size=(3, 4)).astype(np.float32)  # and 3 users
+    model.YtY, model.XtX  # cached in the old orientation
+
+    orient_model(model, n_users=3, n_items=5)
+
+    np.testing.assert_allclose(model.YtY, model.item_factors.T @ model.item_factors, rtol=1e-5)
+    np.testing.assert_allclose(model.XtX, model.user_factors.T @ model.user_factors, rtol=1e-5)
@@ -0,0 +1,61 @@
+from fastapi.testclient import TestClient
+
+from app import main
+from app.cache import TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_counters():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (2, 1, 1, 2)
+
+
+def test_entries_expire_after_ttl():
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=10, ttl=5, timer=timer)
+    cache.set("a", 1)
+    timer.now = 4.9
+    assert cache.get("a") == 1
+    timer.now = 5.0
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_zero_size_disables_cache():
+    cache = TTLCache(maxsize=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_cached_responses_get_fresh_recommendation_ids():
+    client = TestClient(main.app)
+    main.response_cache.clear()
+    user_id = main.model_store.current().user_encoder.classes_[0]
+    url = f"/api/v1/ecommerce/recommendation/user/{user_id}?N=4"
+
+    hits_before = main.response_cache.hits
+    first = client.get(url).json()["items"]
+    second = client.get(url).json()["items"]
+
+    assert main.response_cache.hits == hits_before + 1
+    assert [i["product_id"] for i in first] == [i["product_id"] for i in second]
+    assert not {i["recommendation_id"] for i in first} & {i["recommendation_id"] for i in second}
+
+    stats = client.get("/api/v1/ecommerce/recommendation/cache").json()
+    assert stats["model_version"] == main.model_store.current().version
+    assert stats["size"] >= 1
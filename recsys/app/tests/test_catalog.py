@@ -0,0 +1,46 @@
+import pandas as pd
+
+from app.catalog import ProductCatalog, build_product_catalog
+
+
+def _sales():
+    return pd.DataFrame([
+        {"product_id": "p2", "product_name_en": "Fertilizer B", "product_type": "GOODS", "price": 90.0, "product_price": 100.0},
+        {"product_id": "p1", "product_name_en": "Fertilizer A", "product_type": "GOODS", "price": 45.0, "product_price": 50.0},
+        {"product_id": "p2", "product_name_en": "Fertilizer B", "product_type": "GOODS", "price": 80.0, "product_price": 100.0},
+        {"product_id": "p9", "product_name_en": "Topup", "product_type": "DIGITAL", "price": 10.0, "product_price": 10.0},
+    ])
+
+
+def test_catalog_is_keyed_by_encoded_index():
+    catalog = build_product_catalog(_sales(), ["p1", "p2", "p3"])
+
+    assert catalog.n_encoded == 3
+    assert catalog.info(0)["product_id"] == "p1"
+    assert catalog.info(1)["product_name_en"] == "Fertilizer B"
+    # unseen encoded product falls back to defaults
+    assert catalog.info(2) == {
+        "product_id": "p3",
+        "product_name_en": "Unknown Product",
+        "price": None,
+        "product_type": "Unknown",
+    }
+    # products only present in the sales data are appended after encoded ones
+    assert catalog.index["p9"] == 3
+    assert len(catalog) == 4
+
+
+def test_catalog_prefers_list_price_over_sale_price():
+    catalog = build_product_catalog(_sales(), ["p1", "p2"])
+    assert catalog.info_for_id("p2")["price"] == 100.0
+
+    only_sale_price = _sales().drop(columns=["product_price"])
+    catalog = build_product_catalog(only_sale_price, ["p1", "p2"])
+    assert catalog.info_for_id("p2")["price"] == 90.0
+
+
+def test_catalog_without_sales_data():
+    catalog = build_product_catalog(pd.DataFrame(), ["p1"])
+    assert catalog.info(0)["product_name_en"] == "Unknown Product"
+    assert catalog.info_for_id("missing") is None
+    assert isinstance(catalog, ProductCatalog)
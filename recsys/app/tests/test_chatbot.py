@@ -0,0 +1,138 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from huggingface_hub import InferenceClient
+
+from app import main
+from app.llm import LLMClient
+from app.prompt_cache import PromptCache
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible /v1/chat/completions server."""
+
+    delay = 0.0
+    calls = 0
+    tokens = ["Oil palm ", "needs ", "potassium."]
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakeLLMHandler.calls += 1
+        time.sleep(self.delay)
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for token in self.tokens:
+                chunk = {"id": "1", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                         "choices": [{"index": 0, "delta": {"role": "assistant", "content": token}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+        out = json.dumps({
+            "id": "1", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(self.tokens)},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 3, "total_tokens": 4},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch, tmp_path):
+    FakeLLMHandler.delay = 0.0
+    FakeLLMHandler.calls = 0
+    monkeypatch.setattr(main, "prompt_cache", PromptCache(str(tmp_path / "llm_cache.sqlite3")))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeLLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = LLMClient(InferenceClient(base_url=f"http://127.0.0.1:{server.server_port}", api_key="test"),
+                       max_concurrency=2, timeout=2.0)
+    monkeypatch.setattr(main, "llm_client", client)
+    yield client
+    server.shutdown()
+    client.close()
+
+
+def _body(message):
+    return {"user_id": str(main.model_store.current().user_encoder.classes_[0]), "message": message}
+
+
+def test_chatbot_reply_from_llm(fake_llm):
+    response = TestClient(main.app).post("/api/v1/messaging/chatbot", json=_body("how much to water?"))
+    assert response.status_code == 200
+    assert response.json()["message"] == "Oil palm needs potassium."
+
+
+def test_chatbot_streams_tokens_as_sse(fake_llm):
+    response = TestClient(main.app).post("/api/v1/messaging/chatbot?stream=true", json=_body("how much to water?"))
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    names = [lines[0].removeprefix("event: ") for lines in events]
+    assert names == ["token", "token", "token", "done"]
+    assert json.loads(events[-1][1].removeprefix("data: "))["message"] == "Oil palm needs potassium."
+
+
+def test_chatbot_times_out(fake_llm):
+    FakeLLMHandler.delay = 1.0
+    fake_llm.timeout = 0.2
+    response = TestClient(main.app).post("/api/v1/messaging/chatbot", json=_body("how much to water?"))
+    assert response.status_code == 504
+
+
+def test_chatbot_answers_503_without_an_api_key(monkeypatch):
+    monkeypatch.delenv("HF_API_KEY", raising=False)
+    client = LLMClient.from_env()
+    monkeypatch.setattr(main, "llm_client", client)
+    try:
+        for stream in ("false", "true"):
+            response = TestClient(main.app).post(f"/api/v1/messaging/chatbot?stream={stream}",
+                                                 json=_body("how much to water?"))
+            assert response.status_code == 503
+    finally:
+        client.close()
+
+
+def test_slow_llm_does_not_block_other_endpoints(fake_llm):
+    FakeLLMHandler.delay = 0.5
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            chat = asyncio.create_task(client.post("/api/v1/messaging/chatbot", json=_body("hello")))
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            ping = await client.get("/ping")
+            ping_s = time.perf_counter() - start
+            assert (await chat).status_code == 200
+            return ping, ping_s
+
+    ping, ping_s = asyncio.run(run())
+    assert ping.status_code == 200
+    assert ping_s < 0.3
+
+
+def test_repeated_questions_are_answered_from_cache(fake_llm):
+    client = TestClient(main.app)
+    first = client.post("/api/v1/messaging/chatbot", json=_body("Kenapa daun sawit saya kuning?"))
+    again = client.post("/api/v1/messaging/chatbot", json=_body("  kenapa daun sawit saya KUNING "))
+    streamed = client.post("/api/v1/messaging/chatbot?stream=true", json=_body("Kenapa daun sawit saya kuning?"))
+
+    assert first.json() == again.json()
+    assert "Oil palm needs potassium." in streamed.text
+    assert FakeLLMHandler.calls == 1
+    stats = client.get("/api/v1/messaging/chatbot/cache").json()
+    assert stats["namespaces"]["chatbot"] == {"hits": 2, "misses": 1, "hit_rate": 2 / 3}
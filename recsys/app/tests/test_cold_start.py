@@ -0,0 +1,146 @@
+import os
+import uuid
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import event_log, main
+from app.bundle import convert_pickles, load_bundle
+from app.cache import TTLCache
+from app.cold_start import ColdStartUsers, interaction_row, rank_items, solve_user_factor
+from app.event_log import EventLog
+from app.models import Action
+
+USER_URL = "/api/v1/ecommerce/recommendation/user/{}"
+FEEDBACK_URL = "/api/v1/ecommerce/recommendations/feedback"
+BATCH_URL = "/api/v1/ecommerce/recommendation/users"
+MODELS_DIR = os.path.join(os.path.dirname(main.__file__), "models")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    log = EventLog(str(tmp_path / "feedback"), fsync=False)
+    users = ColdStartUsers(TTLCache(maxsize=100), log_dir=log.directory)
+    monkeypatch.setattr(main, "feedback_log", log)
+    monkeypatch.setattr(main, "cold_start_users", users)
+    yield TestClient(main.app)
+    log.close()
+
+
+def _product_ids(response):
+    assert response.status_code == 200, response.text
+    return [item["product_id"] for item in response.json()["items"]]
+
+
+def test_solved_factor_matches_the_als_user_solve():
+    snap = main.model_store.current()
+    user_idx = 5
+    row = snap.user_items_csr[user_idx]
+    factor = solve_user_factor(snap.model, interaction_row(dict(zip(row.indices, row.data)), row.shape[1]))
+
+    np.testing.assert_allclose(factor, snap.model.recalculate_user(user_idx, row), rtol=1e-4, atol=1e-5)
+    items, scores = rank_items(snap.model.item_factors, factor, row.indices, 5)
+    assert not set(items) & set(row.indices)
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_solves_against_read_only_bundle_factors(tmp_path):
+    snap = main.model_store.current()
+    bundle = load_bundle(convert_pickles(MODELS_DIR, str(tmp_path), version="v1"))
+    assert not bundle.model.item_factors.flags.writeable
+    row = interaction_row({3: 2.0, 7: 1.0}, bundle.user_items_csr.shape[1])
+
+    np.testing.assert_allclose(
+        solve_user_factor(bundle.model, row), solve_user_factor(snap.model, row), rtol=1e-4, atol=1e-5
+    )
+
+
+def test_unknown_user_without_history_gets_popular_products(client):
+    snap = main.model_store.current()
+    popular = list(snap.fallback_list["product_id"][:5])
+    assert _product_ids(client.get(USER_URL.format(uuid.uuid4()), params={"N": 5})) == popular
+
+
+def test_unknown_user_is_scored_from_feedback_log(client):
+    snap = main.model_store.current()
+    user_id = str(uuid.uuid4())
+    clicked = str(snap.product_encoder.classes_[3])
+    assert _product_ids(client.get(USER_URL.format(user_id))) == list(snap.fallback_list["product_id"][:10])
+
+    feedback = {"user_id": user_id, "product_id": clicked, "action": "purchased"}
+    assert client.post(FEEDBACK_URL, json=feedback).status_code == 200
+
+    recs = _product_ids(client.get(USER_URL.format(user_id)))
+    assert recs and clicked not in recs
+    assert main.cold_start_users.cached(user_id).source == "feedback_log"
+    assert recs == _product_ids(client.get(USER_URL.format(user_id)))
+    assert main.cold_start_users.solves == 1
+
+
+def test_unknown_users_are_not_response_cached(client):
+    size = len(main.response_cache)
+    for _ in range(3):
+        _product_ids(client.get(USER_URL.format(uuid.uuid4())))
+    assert len(main.response_cache) == size
+
+
+def test_batch_scores_users_with_feedback_like_the_single_user_endpoint(client):
+    snap = main.model_store.current()
+    with_feedback, without = str(uuid.uuid4()), str(uuid.uuid4())
+    feedback = {"user_id": with_feedback, "product_id": str(snap.product_encoder.classes_[3]), "action": "purchased"}
+    assert client.post(FEEDBACK_URL, json=feedback).status_code == 200
+
+    results = client.post(BATCH_URL, json={"user_ids": [with_feedback, without], "N": 5}).json()["results"]
+
+    assert [i["product_id"] for i in results[0]["items"]] == _product_ids(
+        client.get(USER_URL.format(with_feedback), params={"N": 5}))
+    # No history at all: null, where the single-user endpoint serves the popular products
+    assert results[1]["items"] is None
+
+
+def test_feedback_logged_by_another_worker_reaches_this_one(tmp_path, monkeypatch):
+    snap = main.model_store.current()
+    users = ColdStartUsers(TTLCache(maxsize=100), log_dir=str(tmp_path), refresh_interval=0)
+    user_id = str(uuid.uuid4())
+    assert users.lookup(snap, user_id) is None
+
+    # Another worker writes its own stream; nothing calls invalidate in this one
+    monkeypatch.setattr(event_log.socket, "gethostname", lambda: "other-worker")
+    other = EventLog(str(tmp_path), fsync=False)
+    other.append(uuid.UUID(user_id), uuid.UUID(snap.product_encoder.classes_[3]), None, Action.purchased)
+    other.close()
+
+    assert users.lookup(snap, user_id).source == "feedback_log"
+
+    # Lookups with nothing new logged do not reopen the log
+    opened = []
+    monkeypatch.setattr(event_log, "_open_records", lambda p, f=event_log._open_records: opened.append(p) or f(p))
+    assert users.lookup(snap, str(uuid.uuid4())) is None
+    assert opened == []
+
+
+def test_posted_interactions_are_cached_for_later_requests(client):
+    snap = main.model_store.current()
+    user_id = str(uuid.uuid4())
+    bought = [str(snap.product_encoder.classes_[i]) for i in (1, 2)]
+    body = {"interactions": [{"product_id": p, "quantity": 2} for p in bought], "N": 5}
+
+    recs = _product_ids(client.post(USER_URL.format(user_id), json=body))
+    assert len(recs) == 5 and not set(recs) & set(bought)
+    assert _product_ids(client.get(USER_URL.format(user_id), params={"N": 5})) == recs
+
+
+def test_posted_interactions_with_only_unknown_products_are_rejected(client):
+    body = {"interactions": [{"product_id": str(uuid.uuid4())}]}
+    assert client.post(USER_URL.format(uuid.uuid4()), json=body).status_code == 404
+
+
+def test_cache_evicts_least_recently_used_users():
+    snap = main.model_store.current()
+    users = ColdStartUsers(TTLCache(maxsize=2))
+    product = str(snap.product_encoder.classes_[0])
+    for user_id in ("a", "b", "c"):
+        users.from_interactions(snap, user_id, {product: 1.0})
+    assert users.cached("a") is None and users.cached("c") is not None
+    assert users.stats()["evictions"] == 1
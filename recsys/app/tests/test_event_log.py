@@ -0,0 +1,157 @@
+import threading
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app import event_log
+from app.event_log import RECORD_DTYPE, EventLog, LogTail, list_segments, list_streams, read_batches, read_events
+from app.models import Action
+
+
+def _append(log, n, **kwargs):
+    events = []
+    for i in range(n):
+        event = (uuid.uuid4(), uuid.uuid4(), uuid.uuid4() if i % 2 else None, list(Action)[i % len(Action)])
+        log.append(*event, **kwargs)
+        events.append(event)
+    return events
+
+
+def test_round_trip_and_compact_records(tmp_path):
+    log = EventLog(str(tmp_path), fsync=False)
+    written = _append(log, 10)
+    log.close()
+
+    assert RECORD_DTYPE.itemsize == 57
+    events = list(read_events(str(tmp_path)))
+    assert [(e.user_id, e.product_id, e.recommendation_id, e.action) for e in events] == written
+    assert all(e.timestamp.tzinfo is timezone.utc for e in events)
+
+
+def test_segments_rotate_and_reader_skips_by_time(tmp_path, monkeypatch):
+    clock = iter(range(1_000_000, 10**12, 1_000_000))  # one second per event, in ns // 1000 = us
+    monkeypatch.setattr(event_log.time, "time_ns", lambda: next(clock) * 1000)
+
+    log = EventLog(str(tmp_path), segment_bytes=8 + 57 * 4, fsync=False)
+    _append(log, 12)  # every append commits on its own, 4 records per segment
+    log.close()
+
+    [stream] = list_streams(str(tmp_path))
+    assert len(list_segments(stream)) == 3
+
+    # events are at t = 1..12 s
+    events = list(read_events(str(tmp_path), start=5.0, end=9.0))
+    assert [e.timestamp.timestamp() for e in events] == [5.0, 6.0, 7.0, 8.0]
+
+    opened = []
+    monkeypatch.setattr(event_log, "_open_records", lambda p, f=event_log._open_records: opened.append(p) or f(p))
+    batches = list(read_batches(str(tmp_path), start=datetime.fromtimestamp(10, tz=timezone.utc)))
+    assert len(opened) == 1
+    assert np.concatenate(batches)["ts_us"].tolist() == [10_000_000, 11_000_000, 12_000_000]
+
+
+def test_group_commit_covers_concurrent_appends(tmp_path):
+    log = EventLog(str(tmp_path), fsync=True)
+    threads = [threading.Thread(target=_append, args=(log, 50)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert log.stats()["committed"] == 400
+    assert log.commits <= 400
+    assert len(list(read_events(str(tmp_path)))) == 400
+
+
+def test_failed_commit_is_not_reported_durable(tmp_path, monkeypatch):
+    log = EventLog(str(tmp_path), fsync=True)
+    written = _append(log, 2)
+
+    def broken_fsync(fd):
+        raise OSError("disk full")
+
+    lost = (uuid.uuid4(), uuid.uuid4(), None, Action.clicked)
+    monkeypatch.setattr(event_log.os, "fsync", broken_fsync)
+    with pytest.raises(OSError):
+        log.append(*lost)
+    assert log.stats()["committed"] == 2
+
+    # The batch was put back and the partial write dropped, so the retry writes it exactly once
+    monkeypatch.undo()
+    log.close()
+    assert log.stats()["committed"] == 3
+    events = list(read_events(str(tmp_path)))
+    assert [(e.user_id, e.product_id, e.recommendation_id, e.action) for e in events] == written + [lost]
+
+
+def test_tail_reads_only_new_records(tmp_path):
+    log = EventLog(str(tmp_path), segment_bytes=8 + 57 * 4, fsync=False)
+    tail = LogTail(str(tmp_path))
+    _append(log, 3)
+    assert sum(len(r) for r in tail.read_new()) == 3
+    _append(log, 6)  # fills the segment and starts two more
+    assert sum(len(r) for r in tail.read_new()) == 6
+    assert list(tail.read_new()) == []
+    log.close()
+
+
+def test_reopen_drops_torn_record(tmp_path):
+    log = EventLog(str(tmp_path), fsync=False)
+    _append(log, 3)
+    path = log.segment_path
+    log.close()
+    with open(path, "ab") as f:
+        f.write(b"\x01" * 20)  # half a record from a crash mid-write
+
+    assert len(list(read_events(str(tmp_path)))) == 3
+    log = EventLog(str(tmp_path), fsync=False)
+    _append(log, 1)
+    log.close()
+    assert len(list(read_events(str(tmp_path)))) == 4
+
+
+def test_rejects_foreign_segment(tmp_path):
+    stream = tmp_path / "host-1"
+    stream.mkdir()
+    (stream / f"{0:020d}-{0:08d}.seg").write_bytes(b"x" * 200)
+    with pytest.raises(ValueError):
+        list(read_events(str(tmp_path)))
+
+
+def test_copy_to_postgres_writes_tab_separated_rows(tmp_path):
+    log = EventLog(str(tmp_path), fsync=False)
+    written = _append(log, 3)
+    log.close()
+
+    class Cursor:
+        def __init__(self):
+            self.copies = []
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def copy_expert(self, sql, buf):
+            self.copies.append((sql, buf.read()))
+
+    class Conn:
+        cursor_ = Cursor()
+        committed = False
+
+        def cursor(self):
+            return self.cursor_
+
+        def commit(self):
+            self.committed = True
+
+    conn = Conn()
+    assert event_log.copy_to_postgres(conn, str(tmp_path), batch_size=2) == 3
+    assert conn.committed
+    assert len(conn.cursor_.copies) == 2
+    rows = "".join(data for _, data in conn.cursor_.copies).splitlines()
+    assert rows[0].split("\t")[1:] == [str(written[0][0]), str(written[0][1]), r"\N", "clicked"]
+    assert "np2504_recommendation_feedback" in conn.cursor_.copies[0][0]
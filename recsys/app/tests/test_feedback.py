@@ -0,0 +1,137 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.feedback import FeedbackForwarder, GA4Sink, MemorySink, TransientSendError
+
+
+class FlakySink(MemorySink):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def send(self, client_id, events):
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("analytics unavailable")
+        super().send(client_id, events)
+
+
+def test_batches_per_client_and_caps_batch_size():
+    sink = MemorySink()
+    forwarder = FeedbackForwarder(sink, batch_size=25)
+    for i in range(30):
+        forwarder.submit("a", {"name": "recommendation_feedback", "params": {"i": i}})
+    forwarder.submit("b", {"name": "recommendation_feedback", "params": {"i": 0}})
+    forwarder.flush()
+
+    assert [(client, len(events)) for client, events in sink.batches] == [("a", 25), ("a", 5), ("b", 1)]
+    assert [e["params"]["i"] for e in sink.events[:30]] == list(range(30))
+    assert forwarder.stats()["sent"] == 31
+
+
+def test_drops_when_queue_is_full():
+    forwarder = FeedbackForwarder(MemorySink(), maxsize=2)
+    assert forwarder.submit("a", {"name": "x"})
+    assert forwarder.submit("a", {"name": "x"})
+    assert not forwarder.submit("a", {"name": "x"})
+    stats = forwarder.stats()
+    assert stats["enqueued"] == 2
+    assert stats["dropped"] == 1
+
+
+def test_retries_with_backoff_then_gives_up():
+    sink = FlakySink(failures=2)
+    forwarder = FeedbackForwarder(sink, max_retries=2, backoff=0)
+    forwarder.submit("a", {"name": "x"})
+    forwarder.flush()
+    assert len(sink.events) == 1
+    assert forwarder.stats()["retries"] == 2
+
+    sink.failures = 10
+    forwarder.submit("a", {"name": "y"})
+    forwarder.flush()
+    assert forwarder.stats()["failed"] == 1
+
+
+def test_permanent_failures_are_not_retried():
+    class RejectingSink(MemorySink):
+        def send(self, client_id, events):
+            raise ValueError("400 Bad Request")
+
+    forwarder = FeedbackForwarder(RejectingSink(), max_retries=3, backoff=0)
+    forwarder.submit("a", {"name": "x"})
+    forwarder.flush()
+    assert forwarder.stats()["retries"] == 0
+    assert forwarder.stats()["failed"] == 1
+
+
+def test_ga4_sink_marks_only_transient_failures():
+    import requests
+
+    def respond(status):
+        response = requests.models.Response()
+        response.status_code, response.url = status, "https://www.google-analytics.com/mp/collect"
+        return response
+
+    sink = GA4Sink("G-TEST", "secret")
+    for status, error in ((503, TransientSendError), (429, TransientSendError), (400, requests.HTTPError)):
+        sink.session = SimpleNamespace(post=lambda *args, status=status, **kwargs: respond(status))
+        with pytest.raises(error):
+            sink.send("a", [{"name": "x"}])
+
+    def unreachable(*args, **kwargs):
+        raise requests.ConnectionError("connection refused")
+
+    sink.session = SimpleNamespace(post=unreachable)
+    with pytest.raises(TransientSendError):
+        sink.send("a", [{"name": "x"}])
+
+
+def test_memory_sink_keeps_only_recent_batches():
+    sink = MemorySink(max_batches=2)
+    for client_id in "abc":
+        sink.send(client_id, [{"name": "x"}])
+    assert [client for client, _ in sink.batches] == ["b", "c"]
+
+
+def test_background_sender_drains_queue_on_stop():
+    sink = MemorySink()
+    forwarder = FeedbackForwarder(sink, flush_interval=0.05)
+    forwarder.start()
+    for i in range(100):
+        forwarder.submit(str(i % 3), {"name": "x"})
+    forwarder.stop()
+    assert len(sink.events) == 100
+    assert forwarder.stats()["queued"] == 0
+
+
+def test_feedback_endpoint_does_not_wait_for_analytics(monkeypatch):
+    release = threading.Event()
+
+    class BlockingSink(MemorySink):
+        def send(self, client_id, events):
+            release.wait(5)
+            super().send(client_id, events)
+
+    sink = BlockingSink()
+    forwarder = FeedbackForwarder(sink, flush_interval=0.05)
+    monkeypatch.setattr(main, "feedback_forwarder", forwarder)
+    forwarder.start()
+    try:
+        snap = main.model_store.current()
+        body = {
+            "user_id": str(snap.user_encoder.classes_[0]),
+            "product_id": str(snap.product_encoder.classes_[0]),
+            "action": "clicked",
+        }
+        response = TestClient(main.app).post("/api/v1/ecommerce/recommendations/feedback", json=body)
+        assert response.status_code == 200
+        assert sink.events == []
+    finally:
+        release.set()
+        forwarder.stop()
+    assert sink.events[0]["params"]["action"] == "clicked"
@@ -0,0 +1,139 @@
+import uuid
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app import inference, main
+from app.catalog import ProductCatalog
+from app.cold_start import rank_items
+from app.filters import ItemFilter
+from app.similarity import ExactIndex, IVFIndex
+
+client = TestClient(main.app)
+USER_URL = "/api/v1/ecommerce/recommendation/user/{}"
+SIMILAR_URL = "/api/v1/ecommerce/recommendations/products/{}"
+
+
+def test_mask_combines_type_price_and_exclusions():
+    catalog = ProductCatalog(
+        ["a", "b", "c", "d", "e"],
+        ["A", "B", "C", "D", "E"],
+        ["GOODS", "goods ", "DIGITAL", "GOODS", "SERVICE"],
+        [100.0, 250.0, 150.0, None, 300.0],
+        n_encoded=4,
+    )
+
+    assert ItemFilter().mask(catalog, 4) is None
+    assert ItemFilter(product_types=("Goods",)).mask(catalog, 4).tolist() == [True, True, False, True]
+    assert ItemFilter(product_types=("toys",)).mask(catalog, 4).tolist() == [False] * 4
+    # Unknown prices never match a price range
+    assert ItemFilter(min_price=120, max_price=250).mask(catalog, 4).tolist() == [False, True, True, False]
+    assert ItemFilter(product_types=("goods", "digital"), max_price=200, exclude=("c", "zzz")).mask(
+        catalog, 4).tolist() == [True, False, False, False]
+
+
+def test_masked_ranking_fills_n_from_allowed_items():
+    rng = np.random.default_rng(0)
+    item_factors = rng.normal(size=(200, 8)).astype(np.float32)
+    factor = rng.normal(size=8).astype(np.float32)
+    allowed = rng.random(200) < 0.1
+    seen = np.flatnonzero(allowed)[:3]
+
+    items, scores = rank_items(item_factors, factor, seen, 10, allowed)
+
+    candidates = np.setdiff1d(np.flatnonzero(allowed), seen)
+    expected = candidates[np.argsort(-(item_factors[candidates] @ factor), kind="stable")][:10]
+    assert items.tolist() == expected.tolist()
+    assert len(rank_items(item_factors, factor, seen, 1000, allowed)[0]) == len(candidates)
+
+    exact, ivf = ExactIndex(item_factors), IVFIndex(item_factors, n_lists=20, n_probe=1)
+    for index in (exact, ivf):
+        similar, _ = index.search(0, 10, allowed)
+        assert len(similar) == min(10, np.count_nonzero(allowed) - allowed[0])
+        assert allowed[similar].all() and 0 not in similar
+    np.testing.assert_array_equal(ivf.search(0, 10, allowed)[0], exact.search(0, 10, allowed)[0])
+
+
+def _allowed_ids(snap, **query):
+    allowed = main.item_filter(
+        query.get("product_type"), query.get("min_price"), query.get("max_price"), query.get("exclude"),
+    ).mask(snap.catalog, snap.model.item_factors.shape[0])
+    return {snap.catalog.product_ids[i] for i in np.flatnonzero(allowed)}
+
+
+def test_user_endpoint_returns_up_to_n_allowed_products():
+    snap = main.model_store.current()
+    user_id = snap.user_encoder.classes_[0]
+    allowed = _allowed_ids(snap, product_type=["goods"], max_price=500000)
+    seen = {snap.catalog.product_ids[i] for i in snap.user_items_csr[snap.user_index[user_id]].indices}
+
+    params = {"product_type": "goods", "max_price": 500000}
+
+    items = client.get(USER_URL.format(user_id), params={**params, "N": 5}).json()["items"]
+    assert len(items) == 5
+    assert all(item["product_type"] == "GOODS" and item["price"] <= 500000 for item in items)
+
+    everything = client.get(USER_URL.format(user_id), params={**params, "N": 100}).json()["items"]
+    assert {item["product_id"] for item in everything} == allowed - seen
+
+
+def test_unknown_users_get_popular_products_that_pass_the_filters():
+    snap = main.model_store.current()
+    params = {"product_type": "GOODS", "min_price": 100000, "N": 10}
+
+    items = client.get(USER_URL.format(uuid.uuid4()), params=params).json()["items"]
+
+    assert items and len(items) <= 10
+    assert {item["product_id"] for item in items} <= _allowed_ids(snap, product_type=["GOODS"], min_price=100000)
+
+
+def test_similar_products_honour_exclusions_and_price():
+    snap = main.model_store.current()
+    product_id = snap.product_encoder.classes_[0]
+    unfiltered = [i["product_id"] for i in client.get(SIMILAR_URL.format(product_id), params={"N": 3}).json()["items"]]
+
+    params = {"exclude": unfiltered, "min_price": 50000, "N": 3}
+    items = client.get(SIMILAR_URL.format(product_id), params=params).json()["items"]
+
+    assert len(items) == 3
+    assert not {item["product_id"] for item in items} & set(unfiltered)
+    assert all(item["price"] >= 50000 for item in items)
+
+
+def test_similar_products_from_the_model_fill_n_under_a_selective_filter():
+    snap = main.model_store.current()
+    n_items = snap.model.item_factors.shape[0]
+    allowed = np.zeros(n_items, dtype=bool)
+    allowed[np.argsort(snap.model.item_factors @ snap.model.item_factors[0])[:6]] = True  # the least similar
+
+    recs = inference.recommend_similar_products(
+        snap.product_encoder.classes_[0], snap.model, snap.product_encoder, snap.product_reverse_map,
+        snap.catalog, N=4, allowed=allowed,
+    )
+
+    assert len(recs) == 4
+    assert {r["product_id"] for r in recs} <= {snap.product_reverse_map[i] for i in np.flatnonzero(allowed)}
+
+
+def test_product_types_are_normalized_before_caching():
+    assert main.item_filter(["Goods", " GOODS"], None, None, None) == main.item_filter(["goods"], None, None, None)
+
+
+def test_batch_filters_match_the_single_user_endpoint():
+    user_ids = list(main.model_store.current().user_encoder.classes_[:5])
+    params = {"product_type": "GOODS", "max_price": 700000}
+
+    results = client.post("/api/v1/ecommerce/recommendation/users", params=params,
+                          json={"user_ids": user_ids, "N": 4}).json()["results"]
+
+    for result in results:
+        single = client.get(USER_URL.format(result["user_id"]), params={**params, "N": 4}).json()["items"]
+        assert [i["product_id"] for i in result["items"]] == [i["product_id"] for i in single]
+
+
+def test_inverted_price_range_is_rejected():
+    user_id = main.model_store.current().user_encoder.classes_[0]
+
+    response = client.get(USER_URL.format(user_id), params={"min_price": 10, "max_price": 5})
+
+    assert response.status_code == 400
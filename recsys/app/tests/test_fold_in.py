@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from implicit.cpu.als import AlternatingLeastSquares
+
+from app import inference
+from app.bundle import convert_pickles, load_bundle
+from app.fold_in import fold_in
+
+MODELS_DIR = os.path.join(inference.BASE_DIR, "models")
+
+
+def _fitted_model(n_users=60, n_items=40, seed=0):
+    rng = np.random.default_rng(seed)
+    user_items = sp.random(n_users, n_items, density=0.15, format="csr", random_state=seed, dtype=np.float32)
+    user_items.data[:] = rng.integers(1, 5, size=user_items.nnz)
+    model = AlternatingLeastSquares(factors=8, regularization=0.1, iterations=10, random_state=seed)
+    model.fit(user_items, show_progress=False)
+    return model, user_items
+
+
+def _delta(shape, entries):
+    rows, cols = zip(*entries)
+    return sp.csr_matrix((np.full(len(entries), 3.0, dtype=np.float32), (rows, cols)), shape=shape)
+
+
+def test_fold_in_updates_only_the_touched_rows():
+    model, user_items = _fitted_model()
+    users_before, items_before = model.user_factors.copy(), model.item_factors.copy()
+    delta = _delta(user_items.shape, [(2, 5), (2, 7), (10, 5)])
+
+    result = fold_in(model, user_items, delta)
+
+    assert list(result.users) == [2, 10] and list(result.items) == [5, 7]
+    assert result.user_items[2, 5] == user_items[2, 5] + 3
+    untouched_users = np.setdiff1d(np.arange(user_items.shape[0]), result.users)
+    untouched_items = np.setdiff1d(np.arange(user_items.shape[1]), result.items)
+    np.testing.assert_array_equal(model.user_factors[untouched_users], users_before[untouched_users])
+    np.testing.assert_array_equal(model.item_factors[untouched_items], items_before[untouched_items])
+    assert not np.allclose(model.user_factors[2], users_before[2])
+
+
+def test_fold_in_rows_are_the_exact_als_solution():
+    model, user_items = _fitted_model()
+    delta = _delta(user_items.shape, [(4, 1), (4, 9)])
+    # Users are solved against the item factors as they were before the fold-in
+    expected_user = model.recalculate_user(4, (user_items + delta)[4])
+    result = fold_in(model, user_items, delta)
+
+    np.testing.assert_allclose(model.user_factors[4], expected_user, rtol=1e-3, atol=1e-4)
+    expected = model.recalculate_item(9, result.user_items.T.tocsr()[9])
+    np.testing.assert_allclose(model.item_factors[9], expected, rtol=1e-3, atol=1e-4)
+
+
+def test_fold_in_moves_scores_towards_new_interactions():
+    model, user_items = _fitted_model()
+    user, item = 7, int(np.flatnonzero(user_items[7].toarray()[0] == 0)[0])
+    before = model.user_factors[user] @ model.item_factors[item]
+    fold_in(model, user_items, _delta(user_items.shape, [(user, item)]))
+    assert model.user_factors[user] @ model.item_factors[item] > before
+
+
+def test_fold_in_copies_memory_mapped_bundle_factors(tmp_path):
+    bundle = load_bundle(convert_pickles(MODELS_DIR, str(tmp_path), version="v1"))
+    assert bundle.model.regularization == pytest.approx(inference.als_model.regularization)
+    on_disk = np.array(bundle.model.user_factors)
+
+    fold_in(bundle.model, bundle.user_items_csr, _delta(bundle.user_items_csr.shape, [(0, 0)]))
+
+    assert not isinstance(bundle.model.user_factors, np.memmap)
+    np.testing.assert_array_equal(np.load(tmp_path / "v1" / "user_factors.npy"), on_disk)
+
+
+def test_fold_in_rejects_mismatched_delta():
+    model, user_items = _fitted_model()
+    with pytest.raises(ValueError):
+        fold_in(model, user_items, sp.csr_matrix((3, 3)))
@@ -0,0 +1,82 @@
+import random
+import string
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.catalog import ProductCatalog
+from app.intent import BKTree, build_intent_matcher, levenshtein
+
+
+def _catalog():
+    return ProductCatalog(
+        ["p-npk", "p-urea", "p-herb", "p-token", "p-shirt"],
+        ["NPK Mahkota 12-12-17 50kg", "Urea Nitrea 46% N 50kg", "Bablass 490 SL - 1 liter",
+         "Token PLN 100,000", "T-shirt Sawitpro Size XL"],
+        ["GOODS", "GOODS", "GOODS", "DIGITAL", "GOODS"],
+        [400000, 300000, 90000, 100000, 50000],
+    )
+
+
+DESCRIPTIONS = {
+    "p-npk": "Compound fertilizer for oil palm",
+    "p-herb": "Systemic herbicide to control weeds",
+    "p-token": "Topup PLN",
+}
+
+
+def test_bktree_matches_linear_scan():
+    rng = random.Random(0)
+    words = ["".join(rng.choices(string.ascii_lowercase[:6], k=rng.randint(3, 8))) for _ in range(500)]
+    tree = BKTree(words)
+    for query in words[:50] + ["abcde", "fff"]:
+        expected = sorted({(levenshtein(query, w), w) for w in words if levenshtein(query, w) <= 2})
+        assert tree.search(query, 2) == expected
+
+
+def test_synonyms_and_typos_map_to_catalog_products():
+    matcher = build_intent_matcher(_catalog(), DESCRIPTIONS)
+
+    category, products = matcher.recommend("butuh pupuk")
+    assert category == "fertilizer"
+    assert [p["product_id"] for p in products] == ["p-npk"]
+
+    # "urea" itself ranks the urea product first even though its description names no category
+    assert matcher.match("pupuk urea").product_indices[0] == 1
+
+    category, products = matcher.recommend("herbisda untuk gulma")
+    assert category == "pesticide"
+    assert products[0]["product_id"] == "p-herb"
+
+    assert matcher.recommend("beli token listrik")[0] == "electricity token"
+    assert matcher.recommend("bablas")[1][0]["product_name_en"] == "Bablass 490 SL - 1 liter"
+
+
+def test_general_questions_do_not_match():
+    matcher = build_intent_matcher(_catalog(), DESCRIPTIONS)
+    for message in [
+        "Kenapa daun sawit saya kuning?", "Why are my palm leaves yellow?", "I need help",
+        # the catalog's product types are ordinary words in support questions
+        "How do I contact customer service?", "Where are my goods?", "tell me about digital payment",
+    ]:
+        assert matcher.match(message).category is None
+        assert matcher.match(message).product_indices == []
+
+
+def test_everyday_words_one_typo_from_a_term_do_not_match():
+    # "taken" is one edit from "token" and "needs" from "seeds"
+    matcher = main.model_store.current().intent_matcher
+    assert matcher.recommend("I have taken your advice, thanks") == (None, [])
+    assert matcher.recommend("What does my palm tree needs to grow?") == (None, [])
+
+
+def test_chatbot_recommends_real_catalog_products():
+    snap = main.model_store.current()
+    body = {"user_id": str(snap.user_encoder.classes_[0]), "message": "ada pestisida buat gulma?"}
+    response = TestClient(main.app).post("/api/v1/messaging/chatbot", json=body)
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["message"] == "Here are some pesticide products I recommend:"
+    assert payload["recommended_products"]
+    for product in payload["recommended_products"]:
+        assert snap.catalog.info_for_id(product["product_id"])["product_name_en"] == product["product_name_en"]
@@ -0,0 +1,79 @@
+import re
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.metrics import Registry
+
+
+def _sample(text, name, **labels):
+    """Value of the sample ``name{labels}`` in a /metrics response, or None."""
+    wanted = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    for line in text.splitlines():
+        match = re.fullmatch(rf"{re.escape(name)}(\{{.*\}})? (\S+)", line)
+        if match and all(pair in (match.group(1) or "") for pair in wanted.split(",") if pair):
+            return float(match.group(2))
+    return None
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", ["path"])
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    registry.callback("queue_size", "Queued.", "gauge", [], lambda: {(): 3})
+
+    requests.labels('a "quoted"\npath').inc()
+    requests.labels('a "quoted"\npath').inc(2)
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{path="a \\"quoted\\"\\npath"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text and "latency_seconds_sum 5.55" in text
+    assert "queue_size 3" in text
+
+
+def test_metrics_label_routes_by_template_and_count_fallbacks():
+    client = TestClient(main.app)
+    snap = main.model_store.current()
+    user_id = snap.user_encoder.classes_[0]
+    before = client.get("/metrics").text
+    route = "/api/v1/ecommerce/recommendation/user/{user_id}"
+
+    assert client.get(f"/api/v1/ecommerce/recommendation/user/{user_id}?N=3").status_code == 200
+    assert client.get("/api/v1/ecommerce/recommendation/user/00000000-0000-4000-8000-000000000000").status_code == 200
+    assert client.get("/no/such/path").status_code == 404
+    response = client.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert user_id not in text  # ids never become labels
+
+    def delta(name, **labels):
+        return (_sample(text, name, **labels) or 0) - (_sample(before, name, **labels) or 0)
+
+    assert delta("http_request_duration_seconds_count", method="GET", route=route, status="200") == 2
+    assert delta("http_request_duration_seconds_count", route="unmatched", status="404") == 1
+    assert _sample(text, "http_requests_in_progress", method="GET", route=route) == 0
+    assert delta("recommendation_fallback_total", function="recommend_products_for_user", reason="unknown_user") == 1
+    assert _sample(text, "model_info", version=snap.version) == 1
+    assert _sample(text, "cache_misses_total", cache="response") is not None
+
+
+def test_stage_timers_cover_the_similar_products_path():
+    client = TestClient(main.app)
+    product_id = main.model_store.current().product_encoder.classes_[0]
+    main.response_cache.clear()
+
+    before = client.get("/metrics").text
+    client.get(f"/api/v1/ecommerce/recommendations/products/{product_id}")
+    text = client.get("/metrics").text
+
+    for stage in ("lookup", "score", "enrich"):
+        labels = {"function": "recommend_similar_products", "stage": stage}
+        count = _sample(text, "recommendation_stage_seconds_count", **labels)
+        assert count == (_sample(before, "recommendation_stage_seconds_count", **labels) or 0) + 1
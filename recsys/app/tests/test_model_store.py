@@ -0,0 +1,110 @@
+import os
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import inference, main
+from app.model_store import ModelNotReady, ModelStore
+from app.bundle import convert_pickles
+
+MODELS_DIR = os.path.join(inference.BASE_DIR, "models")
+
+
+def test_reload_swaps_snapshot_and_clears_cache(tmp_path):
+    store = main.model_store
+    original = store.current()
+    client = TestClient(main.app)
+    user_id = original.user_encoder.classes_[0]
+    url = f"/api/v1/ecommerce/recommendation/user/{user_id}?N=3"
+
+    client.get(url)
+    assert len(main.response_cache) > 0
+
+    path = convert_pickles(MODELS_DIR, str(tmp_path), version="20990101T000000")
+    try:
+        assert store.reload_if_changed(lambda: path, inference.load_snapshot)
+        new = store.current()
+        assert new.version == "20990101T000000"
+        assert new.path == path
+        assert len(main.response_cache) == 0
+
+        # a request that grabbed the old snapshot keeps a consistent view of it
+        assert original.model is not new.model
+        assert original.user_encoder.classes_[0] == user_id
+
+        assert client.get(url).status_code == 200
+        stats = client.get("/api/v1/ecommerce/recommendation/cache").json()
+        assert stats["model_version"] == "20990101T000000"
+
+        # same path again is a no-op
+        assert not store.reload_if_changed(lambda: path, inference.load_snapshot)
+    finally:
+        store.swap(original)
+
+
+def test_failed_reload_keeps_current_model(tmp_path):
+    store = main.model_store
+    before = store.current()
+
+    def _broken(path):
+        raise IOError("half-written bundle")
+
+    assert not store.reload_if_changed(lambda: str(tmp_path), _broken)
+    assert store.current() is before
+
+
+def test_first_model_loads_in_the_background():
+    release = threading.Event()
+    snapshot = main.model_store.current()
+
+    def _slow_loader():
+        release.wait(5)
+        return snapshot
+
+    store = ModelStore(loader=_slow_loader, wait_timeout=0.05)
+    store.load_in_background()
+    assert not store.ready
+    with pytest.raises(ModelNotReady, match="still loading"):
+        store.current()
+
+    release.set()
+    assert store.load() is snapshot
+    assert store.ready and store.current() is snapshot
+
+
+def test_failed_first_load_is_reported():
+    def _broken():
+        raise IOError("no bundle")
+
+    store = ModelStore(loader=_broken, wait_timeout=1)
+    with pytest.raises(ModelNotReady, match="no bundle"):
+        store.current()
+    assert not store.ready and isinstance(store.load_error, IOError)
+    assert not store.reload_if_changed(lambda: "/elsewhere", inference.load_snapshot)
+
+
+def test_ready_endpoint_reports_the_loaded_model():
+    client = TestClient(main.app)
+    main.model_store.current()
+
+    response = client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready", "model_version": main.model_store.current().version}
+
+
+def test_chatbot_does_not_block_the_event_loop_while_the_model_loads(monkeypatch):
+    release = threading.Event()
+    snapshot = main.model_store.current()
+    store = ModelStore(loader=lambda: release.wait(5) and snapshot, wait_timeout=30)
+    monkeypatch.setattr(main, "model_store", store)
+    client = TestClient(main.app)
+    try:
+        body = {"user_id": "123e4567-e89b-12d3-a456-426614174000", "message": "pupuk npk"}
+        response = client.post("/api/v1/messaging/chatbot", json=body)
+
+        assert response.status_code == 503 and response.headers["retry-after"] == "5"
+        assert "still loading" in response.json()["detail"]
+    finally:
+        release.set()
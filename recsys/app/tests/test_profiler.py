@@ -0,0 +1,74 @@
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.profiler import ProfilerMiddleware, _stack, hottest, profile_call
+
+
+def busy_loop(seconds=0.05):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+def test_profile_call_attributes_time_to_the_busy_function():
+    result, profile = profile_call(lambda: busy_loop(0.1), interval=0.001)
+
+    assert result > 0
+    (thread,) = profile["profiles"]
+    assert thread["type"] == "sampled" and len(thread["samples"]) == len(thread["weights"]) > 10
+    assert 0.05 < sum(thread["weights"]) <= thread["endValue"] + 1e-9
+    names = [frame["name"] for frame in profile["shared"]["frames"]]
+    assert "busy_loop" in names
+    assert hottest(profile, 1)[0][0].startswith("busy_loop")
+
+
+def _profiled_client(tmp_path):
+    app = ProfilerMiddleware(main.app, token="s3cret", out_dir=str(tmp_path), interval=0.0005)
+    return TestClient(app)
+
+
+def test_request_with_the_token_is_profiled_to_speedscope(tmp_path):
+    client = _profiled_client(tmp_path)
+    user_ids = list(main.model_store.current().user_encoder.classes_)
+    # A cached response can finish before the first sample
+    main.response_cache.clear()
+
+    response = client.post("/api/v1/ecommerce/recommendation/users", json={"user_ids": user_ids, "N": 50},
+                           headers={"X-Profile-Token": "s3cret"})
+
+    assert response.status_code == 200
+    with open(tmp_path / f"{response.headers['x-profile-id']}.speedscope.json") as f:
+        profile = json.load(f)
+    assert profile["name"] == "POST /api/v1/ecommerce/recommendation/users"
+    assert profile["$schema"].startswith("https://www.speedscope.app/")
+    # Only the event loop and the thread running this endpoint, not idle pool threads
+    assert 1 <= len(profile["profiles"]) <= 2
+    for thread in profile["profiles"]:
+        assert all(0 <= i < len(profile["shared"]["frames"]) for stack in thread["samples"] for i in stack)
+
+
+def test_requests_without_the_right_token_are_not_profiled(tmp_path):
+    client = _profiled_client(tmp_path)
+
+    assert "x-profile-id" not in client.get("/ping", headers={"X-Profile-Token": "guess"}).headers
+    assert "x-profile-id" not in client.get("/ping").headers
+    assert "x-profile-id" not in TestClient(ProfilerMiddleware(main.app, token=None, out_dir=str(tmp_path))).get(
+        "/ping", headers={"X-Profile-Token": ""}
+    ).headers
+    assert os.listdir(tmp_path) == []
+
+
+def test_stacks_fall_back_to_co_name_without_co_qualname():
+    # Code objects on Python 3.10 have no co_qualname
+    def frame(name, back=None):
+        code = SimpleNamespace(co_name=name, co_filename="app/x.py", co_firstlineno=1)
+        return SimpleNamespace(f_code=code, f_back=back)
+
+    assert _stack(frame("leaf", frame("root"))) == (("root", "app/x.py", 1), ("leaf", "app/x.py", 1))
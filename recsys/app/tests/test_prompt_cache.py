@@ -0,0 +1,68 @@
+from app.prompt_cache import PromptCache, normalize_prompt
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_prompt():
+    assert normalize_prompt("  Kenapa daun   sawit saya KUNING?? ") == "kenapa daun sawit saya kuning"
+
+
+def test_keyed_on_model_temperature_and_prompt(tmp_path):
+    cache = PromptCache(str(tmp_path / "c.sqlite3"))
+    cache.set("llama", 0.3, "Why are my palm leaves yellow?", "Nitrogen.")
+    assert cache.get("llama", 0.3, "why are my palm leaves yellow") == "Nitrogen."
+    assert cache.get("llama", 0.7, "why are my palm leaves yellow") is None
+    assert cache.get("mistral", 0.3, "why are my palm leaves yellow") is None
+
+
+def test_ttl_and_lru_eviction(tmp_path):
+    clock = Clock()
+    cache = PromptCache(str(tmp_path / "c.sqlite3"), maxsize=2, ttl=60, timer=clock)
+    cache.set("m", 0.3, "a", "A")
+    clock.now += 1
+    cache.set("m", 0.3, "b", "B")
+    clock.now += 1
+    assert cache.get("m", 0.3, "a") == "A"  # "b" is now least recently used
+    clock.now += 1
+    cache.set("m", 0.3, "c", "C")
+    assert cache.get("m", 0.3, "b") is None
+    assert cache.get("m", 0.3, "a") == "A"
+
+    clock.now += 120
+    assert cache.get("m", 0.3, "c") is None
+    assert cache.stats()["size"] == 1
+
+
+def test_shared_between_instances_with_hit_rates(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    api, streamlit = PromptCache(path), PromptCache(path)
+    api.set("m", 0.3, "pupuk", "NPK")
+    assert streamlit.get("m", 0.3, "Pupuk", namespace="translate") == "NPK"
+    assert streamlit.get("m", 0.3, "hama", namespace="translate") is None
+    assert api.stats()["namespaces"]["translate"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_disabled_cache_never_hits(tmp_path):
+    cache = PromptCache(str(tmp_path / "c.sqlite3"), maxsize=0)
+    cache.set("m", 0.3, "a", "A")
+    assert cache.get("m", 0.3, "a") is None
+    assert not (tmp_path / "c.sqlite3").exists()
+
+
+def test_forked_workers_open_their_own_connection(tmp_path, monkeypatch):
+    from app import prompt_cache
+
+    cache = PromptCache(str(tmp_path / "c.sqlite3"))
+    assert getattr(cache._local, "conn", None) is None  # schema connection is closed after init
+
+    cache.set("m", 0.3, "a", "A")
+    parent = cache._local.conn
+    monkeypatch.setattr(prompt_cache.os, "getpid", lambda: -1)  # as seen from a forked worker
+    assert cache.get("m", 0.3, "a") == "A"
+    assert cache._local.conn is not parent
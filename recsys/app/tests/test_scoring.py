@@ -0,0 +1,61 @@
+import uuid
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.scoring import score_pairs
+
+SCORE_URL = "/api/v1/ecommerce/recommendation/score"
+
+
+def test_scores_match_per_pair_dot_products():
+    rng = np.random.default_rng(0)
+    user_factors = rng.normal(size=(50, 8)).astype(np.float32)
+    item_factors = rng.normal(size=(30, 8)).astype(np.float32)
+    users, items = rng.integers(0, 50, 1000), rng.integers(0, 30, 1000)
+
+    scores, valid = score_pairs(user_factors, item_factors, users, items, chunk_size=128)
+
+    expected = [user_factors[u].dot(item_factors[i]) for u, i in zip(users, items)]
+    np.testing.assert_allclose(scores, expected, rtol=1e-5, atol=1e-6)
+    assert valid.all()
+
+
+def test_out_of_range_pairs_score_zero():
+    user_factors = np.ones((3, 2), dtype=np.float32)
+    item_factors = np.ones((2, 2), dtype=np.float32)
+
+    scores, valid = score_pairs(user_factors, item_factors, [0, 3, -1, 2, 1], [1, 0, 0, 2, 0])
+
+    assert list(valid) == [True, False, False, False, True]
+    assert list(scores) == [2.0, 0.0, 0.0, 0.0, 2.0]
+
+
+def test_rejects_mismatched_lengths():
+    with pytest.raises(ValueError):
+        score_pairs(np.ones((2, 2)), np.ones((2, 2)), [0, 1], [0])
+
+
+def test_score_endpoint_returns_model_scores_and_nulls_for_unknown_ids():
+    snap = main.model_store.current()
+    user, product = snap.user_encoder.classes_[4], snap.product_encoder.classes_[7]
+    body = {
+        "user_ids": [user, user, str(uuid.uuid4())],
+        "product_ids": [product, str(uuid.uuid4()), product],
+    }
+
+    response = TestClient(main.app).post(SCORE_URL, json=body)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["model_version"] == snap.version
+    expected = float(snap.model.user_factors[4] @ snap.model.item_factors[7])
+    assert data["scores"][0] == pytest.approx(expected, rel=1e-4, abs=1e-6)
+    assert data["scores"][1:] == [None, None]
+
+
+def test_score_endpoint_rejects_mismatched_lengths():
+    body = {"user_ids": [str(uuid.uuid4())], "product_ids": []}
+    assert TestClient(main.app).post(SCORE_URL, json=body).status_code == 400
@@ -0,0 +1,64 @@
+import math
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app import main
+from app.search import BM25Index, tokenize
+
+
+NAMES = ["NPK Mahkota 13-8-27 50kg", "Urea Nitrea 46% N", "Bablass 490 SL herbicide", "Token PLN 100,000"]
+DESCRIPTIONS = [
+    "Compound NPK fertilizer with potassium for oil palm",
+    "High nitrogen fertilizer",
+    "Systemic herbicide to control weeds in oil palm",
+    "Electricity top up",
+]
+
+
+def _brute_force_bm25(query, k1=1.2, b=0.75, name_boost=3):
+    docs = [tokenize(n) * name_boost + tokenize(d) for n, d in zip(NAMES, DESCRIPTIONS)]
+    avg = sum(map(len, docs)) / len(docs)
+    scores = np.zeros(len(docs))
+    for term in set(tokenize(query)):
+        df = sum(term in d for d in docs)
+        if not df:
+            continue
+        idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+        for i, d in enumerate(docs):
+            tf = d.count(term)
+            scores[i] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(d) / avg))
+    return scores
+
+
+def test_scores_match_reference_bm25():
+    index = BM25Index.build(NAMES, DESCRIPTIONS)
+    for query in ["npk fertilizer", "herbicide weeds palm", "oil", "token listrik"]:
+        expected = _brute_force_bm25(query)
+        docs, scores = index.search(query, N=10)
+        assert set(docs.tolist()) == set(np.flatnonzero(expected).tolist())
+        np.testing.assert_allclose(scores, expected[docs], rtol=1e-5)
+        assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_top_n_and_unknown_terms():
+    index = BM25Index.build(NAMES, DESCRIPTIONS)
+    docs, _ = index.search("fertilizer oil palm", N=1)
+    assert len(docs) == 1
+    assert index.search("durian", N=5)[0].size == 0
+    assert index.search("the and untuk", N=5)[0].size == 0  # stop words only
+
+
+def test_search_endpoint_returns_catalog_products():
+    client = TestClient(main.app)
+    response = client.get("/api/v1/ecommerce/products/search", params={"q": "herbicide weeds", "N": 3})
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert 0 < len(items) <= 3
+    catalog = main.model_store.current().catalog
+    assert all(catalog.info_for_id(item["product_id"])["product_name_en"] == item["product_name_en"] for item in items)
+    assert all(item["score"] > 0 for item in items)
+    assert [i["score"] for i in items] == sorted((i["score"] for i in items), reverse=True)
+
+    assert client.get("/api/v1/ecommerce/products/search", params={"q": "  "}).status_code == 400
+    assert client.get("/api/v1/ecommerce/products/search", params={"q": "npk", "N": 0}).status_code == 422
@@ -0,0 +1,91 @@
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.models import ApiV1EcommerceRecommendationUserGet200Response
+from app.serialization import ProductFragments, recommendations_json
+
+client = TestClient(main.app)
+
+
+def _without_ids(body):
+    """The response with every recommendation_id replaced, after checking it is a fresh UUID."""
+    if isinstance(body, dict):
+        out = {}
+        for key, value in body.items():
+            if key == "recommendation_id":
+                assert uuid.UUID(value).version == 4
+                value = "<id>"
+            out[key] = _without_ids(value)
+        return out
+    if isinstance(body, list):
+        return [_without_ids(v) for v in body]
+    return body
+
+
+def _both_modes(monkeypatch, send):
+    responses = []
+    for fast in (False, True):
+        monkeypatch.setattr(main, "FAST_RESPONSES", fast)
+        main.response_cache.clear()
+        response = send()
+        assert response.status_code == 200
+        responses.append(response)
+    return responses
+
+
+@pytest.mark.parametrize("kind", ["user", "unknown_user", "similar", "interactions"])
+def test_fast_responses_match_the_pydantic_responses(monkeypatch, kind):
+    snap = main.model_store.current()
+    user_id = snap.user_encoder.classes_[0]
+    product_id = snap.product_encoder.classes_[0]
+    new_user = str(uuid.uuid4())
+    send = {
+        "user": lambda: client.get(f"/api/v1/ecommerce/recommendation/user/{user_id}?N=5"),
+        "unknown_user": lambda: client.get(f"/api/v1/ecommerce/recommendation/user/{uuid.uuid4()}?N=5"),
+        "similar": lambda: client.get(f"/api/v1/ecommerce/recommendations/products/{product_id}?N=5"),
+        "interactions": lambda: client.post(
+            f"/api/v1/ecommerce/recommendation/user/{new_user}",
+            json={"interactions": [{"product_id": product_id, "quantity": 2}], "N": 5},
+        ),
+    }[kind]
+
+    slow, fast = _both_modes(monkeypatch, send)
+
+    assert fast.headers["content-type"] == "application/json"
+    assert fast.json()["items"]
+    assert _without_ids(fast.json()) == _without_ids(slow.json())
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_fast_batch_responses_match_the_pydantic_responses(monkeypatch, stream):
+    user_ids = [*main.model_store.current().user_encoder.classes_[:3], str(uuid.uuid4())]
+    url = f"/api/v1/ecommerce/recommendation/users?stream={str(stream).lower()}"
+
+    slow, fast = _both_modes(monkeypatch, lambda: client.post(url, json={"user_ids": user_ids, "N": 4}))
+
+    if stream:
+        assert [_without_ids(json.loads(l)) for l in fast.text.splitlines()] == \
+               [_without_ids(json.loads(l)) for l in slow.text.splitlines()]
+    else:
+        assert _without_ids(fast.json()) == _without_ids(slow.json())
+
+
+def test_fragments_encode_like_the_response_model():
+    snap = main.model_store.current()
+    fragments = ProductFragments(snap.catalog)
+    recs = [{**snap.catalog.info(i), "relevance_score": 0.1 * i} for i in range(3)]
+    recs.append({"product_id": str(uuid.uuid4()), "product_name_en": "Not in the catalog", "price": None,
+                 "product_type": None, "relevance_score": None})
+    recs.append({"product_id": "not-a-uuid", "product_name_en": "Invalid", "relevance_score": 1.0})
+
+    body = json.loads(recommendations_json(fragments.encode_items(recs)))
+
+    expected = ApiV1EcommerceRecommendationUserGet200Response(items=recs[:4]).model_dump(mode="json")
+    assert len(body["items"]) == 4  # the invalid product is dropped, as the pydantic path does
+    assert _without_ids(body) == {
+        "items": [{**item, "recommendation_id": "<id>"} for item in expected["items"]]
+    }
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from app import inference
+from app.similarity import ExactIndex, IVFIndex, build_similarity_index
+
+
+def _clustered_factors(n_items=3000, factors=16, clusters=30, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, factors))
+    labels = rng.integers(0, clusters, size=n_items)
+    return (centers[labels] + rng.normal(scale=0.3, size=(n_items, factors))).astype(np.float32)
+
+
+def test_exact_index_matches_model_similar_items():
+    model = inference.als_model
+    index = ExactIndex(model.item_factors)
+    for item_idx in range(len(index)):
+        items, scores = index.search(item_idx, 5)
+        live_items, live_scores = model.similar_items(item_idx, 6)
+        live = [(i, s) for i, s in zip(live_items, live_scores) if i != item_idx][:5]
+        assert item_idx not in items
+        np.testing.assert_allclose(scores, [s for _, s in live], rtol=1e-4, atol=1e-5)
+
+
+def test_ivf_recall_against_exact():
+    factors = _clustered_factors()
+    exact = ExactIndex(factors)
+    ivf = IVFIndex(factors, n_lists=50, n_probe=8)
+
+    queries = np.random.default_rng(1).integers(0, len(exact), size=100)
+    recall = np.mean([
+        len(set(ivf.search(q, 10)[0]) & set(exact.search(q, 10)[0])) / 10 for q in queries
+    ])
+    assert recall >= 0.9
+
+
+def test_ivf_probing_every_list_is_exact():
+    factors = _clustered_factors(n_items=500)
+    exact = ExactIndex(factors)
+    ivf = IVFIndex(factors, n_lists=10, n_probe=10)
+    for q in range(0, 500, 50):
+        np.testing.assert_allclose(ivf.search(q, 10)[1], exact.search(q, 10)[1], rtol=1e-5)
+
+
+def test_build_similarity_index_rejects_unknown_kind():
+    assert build_similarity_index(np.eye(3), kind="exact").kind == "exact"
+    with pytest.raises(ValueError):
+        build_similarity_index(np.eye(3), kind="hnsw")
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+
+from app import inference, topk
+from app.bundle import convert_pickles, load_bundle
+from app.topk import build_topk_tables, load_topk_store
+
+model = inference.als_model
+user_items_csr = inference.user_items_csr
+MODELS_DIR = os.path.join(os.path.dirname(inference.__file__), "models")
+
+
+def _store(tmp_path, k=10, block_size=7):
+    build_topk_tables(
+        str(tmp_path), model.user_factors, model.item_factors, user_items_csr, k=k, block_size=block_size
+    )
+    return load_topk_store(str(tmp_path), model)
+
+
+def test_user_tables_match_live_scoring(tmp_path):
+    store = _store(tmp_path)
+    for user_idx in range(user_items_csr.shape[0]):
+        live_items, live_scores = model.recommend(user_idx, user_items_csr[user_idx], 5)
+        items, scores = store.user_topk(user_idx, 5)
+        np.testing.assert_allclose(scores, live_scores, rtol=1e-4, atol=1e-6)
+        assert list(items) == list(live_items)
+
+
+def test_item_tables_exclude_the_item_itself(tmp_path):
+    store = _store(tmp_path)
+    for item_idx in range(model.item_factors.shape[0]):
+        items, scores = store.item_topk(item_idx, 5)
+        assert item_idx not in items
+        live_items, live_scores = model.similar_items(item_idx, 6)
+        live_scores = [s for i, s in zip(live_items, live_scores) if i != item_idx][:5]
+        np.testing.assert_allclose(scores, live_scores, rtol=1e-4, atol=1e-5)
+
+
+def test_store_misses_fall_back_to_live_scoring(tmp_path):
+    store = _store(tmp_path, k=3)
+    assert store.user_topk(0, 4) is None
+    assert store.item_topk(model.item_factors.shape[0], 2) is None
+
+    user_id = inference.user_encoder.classes_[0]
+    kwargs = dict(
+        user_id=user_id,
+        model=model,
+        user_encoder=inference.user_encoder,
+        product_reverse_map=inference.product_reverse_map,
+        user_items_csr=user_items_csr,
+        ratings=None,
+        catalog=inference.product_catalog,
+    )
+    live = inference.recommend_products_for_user(N=5, **kwargs)
+    served = inference.recommend_products_for_user(N=5, topk=store, **kwargs)
+    assert [r["product_id"] for r in served] == [r["product_id"] for r in live]
+
+
+def test_tables_from_another_model_are_ignored(tmp_path):
+    build_topk_tables(str(tmp_path), model.user_factors * 2, model.item_factors, user_items_csr, k=5)
+    assert load_topk_store(str(tmp_path), model) is None
+
+
+def test_bundle_fingerprint_skips_hashing_the_factors(tmp_path, monkeypatch):
+    bundle = load_bundle(convert_pickles(MODELS_DIR, str(tmp_path / "bundles")))
+    fingerprint = bundle.manifest["model_fingerprint"]
+    build_topk_tables(str(tmp_path / "topk"), bundle.model.user_factors, bundle.model.item_factors, k=5)
+
+    def no_hashing(*args):
+        raise AssertionError("factors were hashed")
+
+    monkeypatch.setattr(topk, "model_fingerprint", no_hashing)
+    assert load_topk_store(str(tmp_path / "topk"), bundle.model, fingerprint) is not None
+    assert load_topk_store(str(tmp_path / "topk"), bundle.model, "another-model") is None
@@ -0,0 +1,98 @@
+import csv
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.bundle import load_bundle
+from app.train import (
+    PARAMS,
+    aggregate,
+    evaluate,
+    export_winner,
+    fit_model,
+    grid,
+    load_sales_csv,
+    random_configs,
+    run_search,
+    time_split,
+    write_leaderboard,
+)
+
+SPACE = {"factors": [4, 8], "regularization": [0.1], "iterations": [5], "alpha": [1.0], "confidence": ["lines", "log_quantity"]}
+
+
+def synthetic_sales(n_users=40, n_products=25, lines=600, seed=0):
+    rng = np.random.default_rng(seed)
+    # Two groups of users buying from two halves of the catalog, so there is something to learn
+    users = rng.integers(0, n_users, lines)
+    products = (users % 2) * (n_products // 2) + rng.integers(0, n_products // 2, lines)
+    return pd.DataFrame({
+        "user_id": [f"u{u:03d}" for u in users],
+        "product_id": [f"p{p:03d}" for p in products],
+        "quantity": rng.integers(1, 50, lines).astype(float),
+        "time_of_sale": np.sort(rng.integers(1_700_000_000_000, 1_710_000_000_000, lines)),
+    })
+
+
+def test_time_split_holds_out_only_later_new_purchases():
+    sales = synthetic_sales()
+    split = time_split(sales, holdout=0.25)
+
+    train_sales = sales[sales["time_of_sale"] < split.split_ms]
+    assert split.train.lines.sum() == len(train_sales)
+    assert list(split.train.user_ids) == sorted(train_sales["user_id"].unique())
+    assert split.test.nnz > 0
+    # Nothing in the holdout was bought by the same user during training
+    assert split.test.multiply(split.train.lines).nnz == 0
+
+
+def test_aggregate_counts_lines_and_sums_quantity():
+    sales = pd.DataFrame({"user_id": ["a", "a", "b"], "product_id": ["x", "x", "y"], "quantity": [2.0, 3.0, 1.0]})
+    interactions = aggregate(sales)
+    np.testing.assert_array_equal(interactions.lines.toarray(), [[2, 0], [0, 1]])
+    np.testing.assert_array_equal(interactions.quantity.toarray(), [[5, 0], [0, 1]])
+
+
+def test_search_ranks_configs_and_exports_a_loadable_winner(tmp_path):
+    sales_path = tmp_path / "sales.csv"
+    synthetic_sales().to_csv(sales_path, index=False)
+    sales = load_sales_csv(str(sales_path))
+    split = time_split(sales, holdout=0.25)
+
+    results = run_search(split, grid(SPACE), workers=2, blas_threads=1, N=5)
+
+    assert len(results) == 4 and [r["rank"] for r in results] == [1, 2, 3, 4]
+    assert [r["ndcg"] for r in results] == sorted((r["ndcg"] for r in results), reverse=True)
+    assert all(r["train_seconds"] > 0 and r["model_bytes"] > 0 for r in results)
+    assert results[0]["ndcg"] > 0
+
+    csv_path, json_path = write_leaderboard(str(tmp_path / "search"), results, {"N": 5})
+    with open(csv_path) as f:
+        assert [row["rank"] for row in csv.DictReader(f)] == ["1", "2", "3", "4"]
+    with open(json_path) as f:
+        assert json.load(f)["N"] == 5
+
+    best = {p: results[0][p] for p in PARAMS}
+    everything = aggregate(sales)
+    bundle = load_bundle(export_winner(str(tmp_path / "bundles"), everything, best, results[0], version="v1"))
+    assert bundle.model.factors == best["factors"]
+    assert bundle.model.regularization == best["regularization"]
+    assert list(bundle.user_encoder.classes_) == list(everything.user_ids)
+    items, _ = bundle.model.recommend(0, bundle.user_items_csr[0], 3)
+    assert len(items) == 3
+
+
+def test_evaluate_scores_a_model_that_learned_the_groups():
+    split = time_split(synthetic_sales(), holdout=0.25)
+    config = {"factors": 8, "regularization": 0.1, "iterations": 10, "alpha": 1.0, "confidence": "lines"}
+    metrics = evaluate(fit_model(split.train, config), split.train.lines, split.test, N=5)
+    assert metrics["users"] > 0
+    assert 0 < metrics["recall"] <= 1 and 0 < metrics["ndcg"] <= 1
+
+
+def test_random_search_samples_distinct_configs():
+    configs = random_configs(SPACE, trials=3, seed=1)
+    assert len(configs) == 3
+    assert len({tuple(c.values()) for c in configs}) == 3
+    assert random_configs(SPACE, trials=10) == random_configs(SPACE, trials=10)
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import inference
+from app.training_data import (
+    CSRBuilder,
+    build_from_postgres,
+    interactions_sql,
+    load_interactions,
+    save_interactions,
+)
+
+
+def _aggregated_sales():
+    # What INTERACTIONS_SQL returns for the exported sales
+    counts = inference.df_sale.groupby(["user_id", "product_id"]).size().reset_index(name="value")
+    return list(counts.sort_values(["user_id", "product_id"]).itertuples(index=False, name=None))
+
+
+class FakeCursor:
+    def __init__(self, conn, name=None):
+        self.conn = conn
+        self.name = name
+        self.rows = []
+        self.itersize = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def execute(self, sql):
+        self.conn.statements.append((self.name, sql))
+        if "DISTINCT" in sql:
+            self.rows = [(p,) for p in sorted({p for _, p, _ in self.conn.rows})]
+        else:
+            self.rows = list(self.conn.rows)
+
+    def fetchmany(self, n):
+        chunk, self.rows = self.rows[:n], self.rows[n:]
+        self.conn.fetches += 1
+        return chunk
+
+    def copy_expert(self, sql, file):
+        self.conn.statements.append((self.name, sql))
+        text = "".join(f"{u}\t{p}\t{v}\n" for u, p, v in self.conn.rows).encode()
+        for i in range(0, len(text), 37):  # split records across writes
+            file.write(text[i:i + 37])
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+        self.fetches = 0
+
+    def cursor(self, name=None):
+        return FakeCursor(self, name)
+
+
+@pytest.mark.parametrize("method", ["cursor", "copy"])
+def test_streamed_matrix_matches_the_trained_interactions(method):
+    conn = FakeConnection(_aggregated_sales())
+
+    user_items, user_ids, product_ids = build_from_postgres(conn, method=method, chunk_size=7)
+
+    assert list(user_ids) == list(inference.user_encoder.classes_)
+    assert list(product_ids) == list(inference.product_encoder.classes_)
+    assert (user_items != inference.user_items_csr).nnz == 0
+    if method == "cursor":
+        assert conn.statements[1][0] is not None  # named, i.e. server-side, cursor
+        assert conn.fetches > len(conn.rows) // 7
+    else:
+        assert conn.statements[1][1].startswith("COPY (")
+
+
+def test_users_split_across_chunks_keep_one_row():
+    builder = CSRBuilder(["p1", "p2", "p3"])
+    builder.add(["a", "b"], ["p1", "p1"], [1, 2])
+    builder.add(["b", "b"], ["p2", "p3"], [3, 4])
+    builder.add(["c"], ["p3"], [5])
+
+    matrix, user_ids, _ = builder.build()
+
+    assert list(user_ids) == ["a", "b", "c"]
+    np.testing.assert_array_equal(matrix.toarray(), [[1, 0, 0], [2, 3, 4], [0, 0, 5]])
+
+
+def test_rejects_unsorted_users_and_skips_unknown_products():
+    builder = CSRBuilder(["p1", "p2"])
+    builder.add(["b"], ["p9"], [1])
+    assert builder.skipped == 1 and builder.user_ids == []
+    builder.add(["b"], ["p1"], [1])
+    with pytest.raises(ValueError):
+        builder.add(["a"], ["p1"], [1])
+
+
+def test_time_window_goes_into_the_query():
+    sql = interactions_sql("quantity", since_ms=1000, until_ms=2000)
+    assert "so.created_at_utc0 >= 1000 AND so.created_at_utc0 < 2000" in sql
+    assert "SUM(soi.quantity)" in sql
+
+
+def test_saved_interactions_round_trip(tmp_path):
+    builder = CSRBuilder(["p1", "p2"])
+    builder.add(["a", "b"], ["p2", "p1"], [1, 2])
+    save_interactions(str(tmp_path), *builder.build())
+
+    matrix, user_ids, product_ids = load_interactions(str(tmp_path))
+    assert list(user_ids) == ["a", "b"] and list(product_ids) == ["p1", "p2"]
+    np.testing.assert_array_equal(matrix.toarray(), [[0, 1], [2, 0]])
@@ -0,0 +1,222 @@
+"""Materialized top-K recommendation tables.
+
+The offline job scores every user against every item (and every item against
+every other item) in blocks of rows, keeps the best ``k`` per row and writes
+the results as plain ``.npy`` arrays plus a ``manifest.json``. The API opens
+them with ``mmap_mode="r"`` and serves lookups straight from the page cache,
+falling back to live scoring when a request is not covered by the tables.
+
+The tables only depend on the model artifacts, so they are rebuilt whenever
+those change (render.yaml runs this as part of every build):
+
+    python -m app.topk -k 50
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .bundle import model_fingerprint
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+TABLES = ("user_items", "user_scores", "item_items", "item_scores")
+
+
+def select_topk(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise top-k of a dense score block, best first."""
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def _empty_table(n_rows: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    return np.full((n_rows, k), -1, dtype=np.int32), np.full((n_rows, k), -np.inf, dtype=np.float32)
+
+
+def build_user_topk(
+    user_factors: np.ndarray,
+    item_factors: np.ndarray,
+    user_items_csr=None,
+    k: int = 50,
+    block_size: int = 1024,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k items per user, skipping items the user already interacted with."""
+    n_users, n_items = user_factors.shape[0], item_factors.shape[0]
+    k_eff = min(k, n_items)
+    items_out, scores_out = _empty_table(n_users, k)
+    item_factors_t = np.ascontiguousarray(item_factors, dtype=np.float32).T
+
+    for start in range(0, n_users, block_size):
+        stop = min(start + block_size, n_users)
+        scores = np.asarray(user_factors[start:stop], dtype=np.float32) @ item_factors_t
+
+        if user_items_csr is not None:
+            liked = user_items_csr[start:stop]
+            rows = np.repeat(np.arange(stop - start), np.diff(liked.indptr))
+            scores[rows, liked.indices] = -np.inf
+
+        top_items, top_scores = select_topk(scores, k_eff)
+        top_items[np.isneginf(top_scores)] = -1
+        items_out[start:stop, :k_eff] = top_items
+        scores_out[start:stop, :k_eff] = top_scores
+
+    return items_out, scores_out
+
+
+def build_item_topk(
+    item_factors: np.ndarray,
+    k: int = 50,
+    block_size: int = 1024,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k most similar items per item by cosine similarity, excluding the item itself."""
+    n_items = item_factors.shape[0]
+    k_eff = min(k, max(n_items - 1, 0))
+    items_out, scores_out = _empty_table(n_items, k)
+
+    factors = np.asarray(item_factors, dtype=np.float32)
+    norms = np.linalg.norm(factors, axis=1)
+    norms[norms == 0] = 1e-10
+    normed = factors / norms[:, None]
+    normed_t = np.ascontiguousarray(normed.T)
+
+    for start in range(0, n_items, block_size):
+        stop = min(start + block_size, n_items)
+        scores = normed[start:stop] @ normed_t
+        scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+
+        if k_eff:
+            top_items, top_scores = select_topk(scores, k_eff)
+            items_out[start:stop, :k_eff] = top_items
+            scores_out[start:stop, :k_eff] = top_scores
+
+    return items_out, scores_out
+
+
+def build_topk_tables(
+    out_dir: str,
+    user_factors: np.ndarray,
+    item_factors: np.ndarray,
+    user_items_csr=None,
+    k: int = 50,
+    block_size: int = 1024,
+) -> Dict:
+    """Build both tables and write them to ``out_dir``. Returns the manifest."""
+    start = time.perf_counter()
+    user_items, user_scores = build_user_topk(user_factors, item_factors, user_items_csr, k, block_size)
+    item_items, item_scores = build_item_topk(item_factors, k, block_size)
+    build_seconds = time.perf_counter() - start
+
+    os.makedirs(out_dir, exist_ok=True)
+    arrays = {
+        "user_items": user_items,
+        "user_scores": user_scores,
+        "item_items": item_items,
+        "item_scores": item_scores,
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), array)
+
+    manifest = {
+        "k": k,
+        "n_users": int(user_factors.shape[0]),
+        "n_items": int(item_factors.shape[0]),
+        "model_fingerprint": model_fingerprint(user_factors, item_factors),
+        "built_at": int(time.time()),
+        "build_seconds": round(build_seconds, 3),
+    }
+    # Write the manifest last so a half-written directory is never picked up
+    manifest_tmp = os.path.join(out_dir, MANIFEST + ".tmp")
+    with open(manifest_tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_tmp, os.path.join(out_dir, MANIFEST))
+    return manifest
+
+
+class TopKStore:
+    """Read-only, memory-mapped view over tables written by build_topk_tables."""
+
+    def __init__(self, path: str, manifest: Dict, arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self.manifest = manifest
+        self.k = manifest["k"]
+        self.user_items = arrays["user_items"]
+        self.user_scores = arrays["user_scores"]
+        self.item_items = arrays["item_items"]
+        self.item_scores = arrays["item_scores"]
+
+    @classmethod
+    def open(cls, path: str) -> "TopKStore":
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in TABLES}
+        return cls(path, manifest, arrays)
+
+    def user_topk(self, user_idx: int, N: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Top-N (items, scores) for a user, or None if the table cannot answer."""
+        if N > self.k or not 0 <= user_idx < self.user_items.shape[0]:
+            return None
+        return self.user_items[user_idx, :N], self.user_scores[user_idx, :N]
+
+    def item_topk(self, item_idx: int, N: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Top-N similar (items, scores) for an item, or None if the table cannot answer."""
+        if N > self.k or not 0 <= item_idx < self.item_items.shape[0]:
+            return None
+        return self.item_items[item_idx, :N], self.item_scores[item_idx, :N]
+
+
+def load_topk_store(path: str, model, fingerprint: Optional[str] = None) -> Optional[TopKStore]:
+    """Open the tables at ``path`` if they exist and were built from ``model``.
+
+    ``fingerprint`` is the model's, from its bundle manifest. Without one it is
+    hashed from the factors, which reads every page of them.
+    """
+    if not os.path.isfile(os.path.join(path, MANIFEST)):
+        logger.info(f"No top-K tables at {path}, serving live scores only")
+        return None
+    try:
+        store = TopKStore.open(path)
+    except Exception as e:
+        logger.error(f"Failed to open top-K tables at {path}: {e}")
+        return None
+
+    if fingerprint is None:
+        fingerprint = model_fingerprint(model.user_factors, model.item_factors)
+    if store.manifest.get("model_fingerprint") != fingerprint:
+        logger.warning(f"Top-K tables at {path} were built from a different model, ignoring them")
+        return None
+    logger.info(f"Serving top-{store.k} tables from {path}")
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute top-K recommendation tables.")
+    parser.add_argument("--out", default=None, help="output directory (default: next to the loaded model)")
+    parser.add_argument("-k", type=int, default=50)
+    parser.add_argument("--block-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    from .inference import als_model, topk_dir, user_items_csr
+
+    out_dir = args.out or topk_dir
+    manifest = build_topk_tables(
+        out_dir, als_model.user_factors, als_model.item_factors, user_items_csr, k=args.k, block_size=args.block_size
+    )
+    size = sum(os.path.getsize(os.path.join(out_dir, f"{name}.npy")) for name in TABLES)
+    print(
+        f"Built top-{args.k} tables for {manifest['n_users']} users and {manifest['n_items']} items "
+        f"in {manifest['build_seconds']:.2f}s ({size / 1e6:.2f} MB) -> {out_dir}"
+    )
+
+
+if __name__ == "__main__":
+    main()
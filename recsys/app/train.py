@@ -0,0 +1,357 @@
+"""Reproducible ALS training with a parallel hyperparameter search.
+
+Sales are split by time: everything before the split trains, and the products
+users bought after it (and hadn't bought before) are the holdout the API would
+have to predict. Every configuration of factors, regularization, iterations,
+alpha and confidence scaling is fitted on the training window and scored
+with recall/precision/NDCG@N on the holdout, across a pool of worker
+processes. Each worker's BLAS and OpenMP pools are capped at
+``--blas-threads`` so the workers don't oversubscribe the CPU.
+
+The leaderboard goes to ``<out>/leaderboard.csv`` and ``.json``. With
+``--export`` the winner is refit on all sales and written as a model bundle
+(see app.bundle) that the API picks up on its next reload.
+
+Run from the recsys/ directory:
+
+    python -m app.train --csv app/data/df_sale.csv --factors 16 32 --regularization 0.01 0.1 \\
+        --alpha 1 10 --confidence lines log_quantity --workers 4 --export
+"""
+import argparse
+import contextlib
+import csv
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from implicit.cpu.als import AlternatingLeastSquares
+from scipy.sparse import csr_matrix
+
+from .bundle import bundle_root, write_bundle
+
+logger = logging.getLogger(__name__)
+
+BLAS_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+METRICS = ("recall", "precision", "ndcg")
+PARAMS = ("factors", "regularization", "iterations", "alpha", "confidence")
+CONFIDENCE = ("lines", "quantity", "log_quantity")
+
+
+@dataclass
+class Interactions:
+    user_ids: np.ndarray  # sorted, i.e. LabelEncoder order
+    product_ids: np.ndarray
+    lines: csr_matrix  # order lines per (user, product)
+    quantity: csr_matrix  # total quantity per (user, product), same sparsity as ``lines``
+
+
+@dataclass
+class Split:
+    train: Interactions
+    test: csr_matrix  # holdout purchases of products new to the user, in train's index space
+    split_ms: int
+
+
+def confidence_matrix(interactions: Interactions, kind: str) -> csr_matrix:
+    """Cell values the model is fitted on: order lines, quantity, or log1p(quantity)."""
+    if kind == "lines":
+        return interactions.lines
+    if kind == "quantity":
+        return interactions.quantity
+    if kind == "log_quantity":
+        matrix = interactions.quantity.copy()
+        matrix.data = np.log1p(matrix.data)
+        return matrix
+    raise ValueError(f"Unknown confidence scaling {kind!r}")
+
+
+def load_sales_csv(path: str) -> pd.DataFrame:
+    """The order lines of a df_sale.csv export: user_id, product_id, quantity, time_of_sale (ms)."""
+    sales = pd.read_csv(path, usecols=["user_id", "product_id", "quantity", "time_of_sale"])
+    return sales.dropna(subset=["user_id", "product_id", "time_of_sale"])
+
+
+def aggregate(sales: pd.DataFrame, user_ids=None, product_ids=None) -> Interactions:
+    """Sum order lines into user x product matrices; ids default to the sorted ids in ``sales``."""
+    user_ids = np.unique(sales["user_id"].astype(str)) if user_ids is None else user_ids
+    product_ids = np.unique(sales["product_id"].astype(str)) if product_ids is None else product_ids
+    rows = np.searchsorted(user_ids, sales["user_id"].astype(str).to_numpy())
+    cols = np.searchsorted(product_ids, sales["product_id"].astype(str).to_numpy())
+    rows[rows == len(user_ids)] = 0
+    cols[cols == len(product_ids)] = 0
+    known = (user_ids[rows] == sales["user_id"].astype(str).to_numpy()) & (
+        product_ids[cols] == sales["product_id"].astype(str).to_numpy()
+    )
+    rows, cols = rows[known], cols[known]
+    shape = (len(user_ids), len(product_ids))
+    quantity = sales["quantity"].fillna(1).to_numpy(dtype=np.float32)[known]
+    return Interactions(
+        user_ids,
+        product_ids,
+        csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape),
+        csr_matrix((quantity, (rows, cols)), shape=shape),
+    )
+
+
+def time_split(sales: pd.DataFrame, holdout: float = 0.2, split_ms: Optional[int] = None) -> Split:
+    """Train on sales before ``split_ms`` (default: the ``1 - holdout`` time quantile), test on the rest."""
+    ts = sales["time_of_sale"].to_numpy(dtype=np.int64)
+    if split_ms is None:
+        split_ms = int(np.quantile(ts, 1 - holdout))
+    train = aggregate(sales[ts < split_ms])
+    test = aggregate(sales[ts >= split_ms], train.user_ids, train.product_ids).lines
+    return Split(train, _new_purchases(test, train.lines), split_ms)
+
+
+def _reindex(matrix: csr_matrix, user_ids, product_ids, to_users, to_products) -> csr_matrix:
+    """``matrix`` (rows ``user_ids``, columns ``product_ids``) in another pair of sorted id tables."""
+    coo = matrix.tocoo()
+    rows = np.searchsorted(to_users, user_ids[coo.row]).clip(max=max(len(to_users) - 1, 0))
+    cols = np.searchsorted(to_products, product_ids[coo.col]).clip(max=max(len(to_products) - 1, 0))
+    known = (to_users[rows] == user_ids[coo.row]) & (to_products[cols] == product_ids[coo.col])
+    return csr_matrix((coo.data[known], (rows[known], cols[known])), shape=(len(to_users), len(to_products)))
+
+
+def load_postgres(conn, since_ms: Optional[int] = None, until_ms: Optional[int] = None) -> Interactions:
+    """Interactions from Postgres, streamed into CSR by app.training_data."""
+    from .training_data import build_from_postgres
+
+    lines, user_ids, product_ids = build_from_postgres(conn, "lines", since_ms, until_ms)
+    quantity, q_users, q_products = build_from_postgres(conn, "quantity", since_ms, until_ms)
+    quantity = _reindex(quantity, q_users, q_products, user_ids, product_ids)
+    return Interactions(user_ids, product_ids, lines, quantity)
+
+
+def postgres_split(conn, split_ms: int) -> Split:
+    train = load_postgres(conn, until_ms=split_ms)
+    holdout = load_postgres(conn, since_ms=split_ms)
+    test = _reindex(holdout.lines, holdout.user_ids, holdout.product_ids, train.user_ids, train.product_ids)
+    return Split(train, _new_purchases(test, train.lines), split_ms)
+
+
+def _new_purchases(test: csr_matrix, train: csr_matrix) -> csr_matrix:
+    # Already-bought products are filtered out of recommendations, so they can't count as hits
+    test = test - test.multiply(train > 0)
+    test.eliminate_zeros()
+    return test.tocsr()
+
+
+def evaluate(model, train: csr_matrix, test: csr_matrix, N: int = 10) -> Dict[str, float]:
+    """Mean recall@N, precision@N and NDCG@N over users with both history and holdout purchases."""
+    users = np.flatnonzero((np.diff(test.indptr) > 0) & (np.diff(train.indptr) > 0))
+    if not len(users):
+        return {**{m: 0.0 for m in METRICS}, "users": 0}
+    ids, _ = model.recommend(users, train[users], N=N, filter_already_liked_items=True)
+    discounts = 1.0 / np.log2(np.arange(2, N + 2))
+    recall, precision, ndcg = [], [], []
+    for user, recs in zip(users, ids):
+        truth = test.indices[test.indptr[user]:test.indptr[user + 1]]
+        hits = np.isin(recs, truth)
+        recall.append(hits.sum() / len(truth))
+        precision.append(hits.sum() / N)
+        ndcg.append((hits * discounts[:len(hits)]).sum() / discounts[:min(N, len(truth))].sum())
+    return {"recall": float(np.mean(recall)), "precision": float(np.mean(precision)),
+            "ndcg": float(np.mean(ndcg)), "users": len(users)}
+
+
+def fit_model(interactions: Interactions, config: Dict, num_threads: int = 0, seed: int = 0):
+    model = AlternatingLeastSquares(
+        factors=int(config["factors"]),
+        regularization=float(config["regularization"]),
+        iterations=int(config["iterations"]),
+        alpha=float(config["alpha"]),
+        num_threads=num_threads,
+        random_state=seed,
+    )
+    model.fit(confidence_matrix(interactions, config["confidence"]), show_progress=False)
+    return model
+
+
+def grid(space: Dict[str, list]) -> List[Dict]:
+    return [dict(zip(PARAMS, values)) for values in itertools.product(*(space[p] for p in PARAMS))]
+
+
+def random_configs(space: Dict[str, list], trials: int, seed: int = 0) -> List[Dict]:
+    """``trials`` distinct configurations drawn from the grid."""
+    configs = grid(space)
+    return random.Random(seed).sample(configs, min(trials, len(configs)))
+
+
+_worker: Dict = {}
+
+
+def _init_worker(split: Split, blas_threads: int, N: int, seed: int) -> None:
+    from threadpoolctl import threadpool_limits  # installed with scikit-learn
+
+    # The env vars cover pools created from here on; this covers ones already running
+    threadpool_limits(limits=blas_threads)
+    _worker.update(split=split, threads=blas_threads, N=N, seed=seed)
+
+
+def _run_trial(config: Dict) -> Dict:
+    split = _worker["split"]
+    start = time.perf_counter()
+    model = fit_model(split.train, config, num_threads=_worker["threads"], seed=_worker["seed"])
+    train_seconds = time.perf_counter() - start
+    metrics = evaluate(model, confidence_matrix(split.train, config["confidence"]), split.test, _worker["N"])
+    return {
+        **config,
+        **metrics,
+        "train_seconds": train_seconds,
+        "model_bytes": int(model.user_factors.nbytes + model.item_factors.nbytes),
+    }
+
+
+def run_search(split: Split, configs: List[Dict], workers: int = 1, blas_threads: int = 1,
+               N: int = 10, seed: int = 0, metric: str = "ndcg") -> List[Dict]:
+    """Evaluate ``configs`` on ``split`` in ``workers`` processes; returns the leaderboard, best first."""
+    saved = {var: os.environ.get(var) for var in BLAS_ENV_VARS}
+    os.environ.update({var: str(blas_threads) for var in BLAS_ENV_VARS})
+    try:
+        # spawn: workers import numpy fresh, after the thread limits are in their environment
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(split, blas_threads, N, seed),
+        ) as pool:
+            results = []
+            for result in pool.map(_run_trial, configs):
+                logger.info(", ".join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}" for k, v in result.items()))
+                results.append(result)
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+    results.sort(key=lambda r: (-r[metric], r["train_seconds"]))
+    for rank, result in enumerate(results, 1):
+        result["rank"] = rank
+    return results
+
+
+def write_leaderboard(out_dir: str, results: List[Dict], meta: Dict) -> Tuple[str, str]:
+    os.makedirs(out_dir, exist_ok=True)
+    csv_path = os.path.join(out_dir, "leaderboard.csv")
+    json_path = os.path.join(out_dir, "leaderboard.json")
+    columns = ["rank", *PARAMS, *METRICS, "users", "train_seconds", "model_bytes"]
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows({c: r[c] for c in columns} for r in results)
+    with open(json_path, "w") as f:
+        json.dump({**meta, "results": results}, f, indent=2)
+    return csv_path, json_path
+
+
+def export_winner(root: str, interactions: Interactions, config: Dict, metrics: Dict,
+                  seed: int = 0, version: Optional[str] = None) -> str:
+    """Refit ``config`` on ``interactions`` and write it as a model bundle under ``root``."""
+    model = fit_model(interactions, config, seed=seed)
+    return write_bundle(
+        root,
+        model.user_factors,
+        model.item_factors,
+        confidence_matrix(interactions, config["confidence"]),
+        interactions.user_ids,
+        interactions.product_ids,
+        version=version,
+        extra={
+            "source": "train",
+            "regularization": float(config["regularization"]),
+            "alpha": float(config["alpha"]),
+            "iterations": int(config["iterations"]),
+            "confidence": config["confidence"],
+            "holdout_metrics": {k: metrics[k] for k in (*METRICS, "users")},
+        },
+    )
+
+
+def _search(args, base_dir: str, split_ms: Optional[int], conn=None) -> None:
+    """Run the search ``main`` parsed the arguments for, on Postgres sales when ``conn`` is given."""
+    if conn is not None:
+        split = postgres_split(conn, split_ms)
+    else:
+        sales = load_sales_csv(args.csv)
+        split = time_split(sales, args.holdout, split_ms)
+    logger.info(
+        f"Train: {split.train.lines.nnz} interactions of {len(split.train.user_ids)} users before "
+        f"{pd.Timestamp(split.split_ms, unit='ms', tz='UTC')}; holdout: {split.test.nnz} new purchases"
+    )
+
+    space = {p: getattr(args, p) for p in PARAMS}
+    configs = grid(space) if args.search == "grid" else random_configs(space, args.trials, args.seed)
+    logger.info(f"Evaluating {len(configs)} configurations on {args.workers} workers x {args.blas_threads} threads")
+    results = run_search(split, configs, args.workers, args.blas_threads, args.N, args.seed, args.metric)
+
+    meta = {"source": "postgres" if conn is not None else args.csv, "split_ms": split.split_ms, "N": args.N, "metric": args.metric, "seed": args.seed}
+    csv_path, _ = write_leaderboard(args.out, results, meta)
+    print(f"{'rank':>4} {'factors':>7} {'reg':>6} {'iters':>5} {'alpha':>6} {'confidence':>12} "
+          f"{'recall':>7} {'prec':>6} {'ndcg':>6} {'train s':>8} {'KB':>7}")
+    for r in results[:10]:
+        print(f"{r['rank']:>4} {r['factors']:>7} {r['regularization']:>6g} {r['iterations']:>5} {r['alpha']:>6g} "
+              f"{r['confidence']:>12} {r['recall']:>7.3f} {r['precision']:>6.3f} {r['ndcg']:>6.3f} "
+              f"{r['train_seconds']:>8.2f} {r['model_bytes'] / 1024:>7.1f}")
+    print(f"Leaderboard: {csv_path}")
+
+    if args.export:
+        best = results[0]
+        everything = load_postgres(conn) if conn is not None else aggregate(sales)
+        path = export_winner(args.bundle_root or bundle_root(base_dir), everything,
+                             {p: best[p] for p in PARAMS}, best, seed=args.seed)
+        print(f"Exported the winner to {path}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Hyperparameter search and training for the ALS model.")
+    parser.add_argument("--csv", default=os.path.join(base_dir, "data", "df_sale.csv"), help="sales export")
+    parser.add_argument("--dsn", default=None, help="read sales from Postgres instead (needs --split-date)")
+    parser.add_argument("--holdout", type=float, default=0.2, help="fraction of the sales period held out")
+    parser.add_argument("--split-date", default=None, help="ISO date (UTC) where the holdout starts")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--trials", type=int, default=20, help="configurations for --search random")
+    parser.add_argument("--factors", type=int, nargs="+", default=[16, 32, 64])
+    parser.add_argument("--regularization", type=float, nargs="+", default=[0.01, 0.1])
+    parser.add_argument("--iterations", type=int, nargs="+", default=[15])
+    parser.add_argument("--alpha", type=float, nargs="+", default=[1.0, 10.0])
+    parser.add_argument("--confidence", choices=CONFIDENCE, nargs="+", default=["lines", "log_quantity"])
+    parser.add_argument("--metric", choices=METRICS, default="ndcg", help="leaderboard ranking")
+    parser.add_argument("-N", type=int, default=10, help="cutoff for the metrics")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--blas-threads", type=int, default=1, help="BLAS/OpenMP threads per worker")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=os.path.join(base_dir, "data", "search"))
+    parser.add_argument("--export", action="store_true", help="refit the winner on all sales and write a bundle")
+    parser.add_argument("--bundle-root", default=None, help="default: see app.bundle.bundle_root()")
+    args = parser.parse_args()
+
+    split_ms = None
+    if args.split_date:
+        split_ms = int(pd.Timestamp(args.split_date, tz="UTC").timestamp() * 1000)
+    if args.dsn:
+        if split_ms is None:
+            parser.exit(1, "--dsn needs --split-date\n")
+        import psycopg2
+
+        # --export reads from the same connection; closed even when the search fails
+        with contextlib.closing(psycopg2.connect(args.dsn)) as conn:
+            _search(args, base_dir, split_ms, conn)
+    else:
+        _search(args, base_dir, split_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Build the user-item training matrix straight from Postgres.
+
+Postgres aggregates ``sale_order`` x ``sale_order_item`` per (user, product),
+sorted by user then product, and the rows are streamed out either through a
+server-side cursor or ``COPY (...) TO STDOUT``. The CSR matrix is built
+chunk by chunk as rows arrive: because rows come sorted by user, each user's
+row is complete once the next user shows up, so only the growing index and
+data arrays are kept, never a DataFrame of the order history.
+
+Users and products are numbered in sorted id order, like the LabelEncoders the
+model was trained with, and each cell counts the user's order lines for the
+product (``--value quantity`` sums quantities instead).
+
+Run from the recsys/ directory:
+
+    python -m app.training_data --out app/data/training --since 2025-01-01
+"""
+import argparse
+import io
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix, load_npz, save_npz
+
+logger = logging.getLogger(__name__)
+
+VALUES = {"lines": "COUNT(*)", "quantity": "SUM(soi.quantity)"}
+
+# COLLATE "C" sorts ids by bytes, the same order as Python/np.unique, whatever the database locale
+PRODUCTS_SQL = """
+SELECT DISTINCT soi.product_id COLLATE "C" AS product_id
+FROM sale_order_item soi JOIN sale_order so ON so.id = soi.sale_order_id
+{where}
+ORDER BY 1
+"""
+
+INTERACTIONS_SQL = """
+SELECT so.user_id COLLATE "C" AS user_id, soi.product_id COLLATE "C" AS product_id, {value} AS value
+FROM sale_order so JOIN sale_order_item soi ON soi.sale_order_id = so.id
+{where}
+GROUP BY 1, 2
+ORDER BY 1, 2
+"""
+
+INTERACTION_MATRIX = "interaction_matrix.npz"
+USER_IDS = "user_ids.npy"
+PRODUCT_IDS = "product_ids.npy"
+
+
+def _where(since_ms: Optional[int], until_ms: Optional[int]) -> str:
+    # Plain integers, so they can be inlined into COPY, which takes no parameters
+    clauses = []
+    if since_ms is not None:
+        clauses.append(f"so.created_at_utc0 >= {int(since_ms)}")
+    if until_ms is not None:
+        clauses.append(f"so.created_at_utc0 < {int(until_ms)}")
+    return "WHERE " + " AND ".join(clauses) if clauses else ""
+
+
+def interactions_sql(value: str = "lines", since_ms: Optional[int] = None, until_ms: Optional[int] = None) -> str:
+    return INTERACTIONS_SQL.format(value=VALUES[value], where=_where(since_ms, until_ms))
+
+
+def products_sql(since_ms: Optional[int] = None, until_ms: Optional[int] = None) -> str:
+    return PRODUCTS_SQL.format(where=_where(since_ms, until_ms))
+
+
+class CSRBuilder:
+    """Accumulates (user, product, value) chunks sorted by user into a CSR matrix."""
+
+    def __init__(self, product_ids: Sequence[str]):
+        self.product_ids = np.asarray(product_ids, dtype=str)
+        if len(self.product_ids) > 1 and not (self.product_ids[1:] > self.product_ids[:-1]).all():
+            raise ValueError("product_ids must be sorted and unique")
+        self.user_ids: List[str] = []
+        self._row_starts: List[np.ndarray] = []
+        self._indices: List[np.ndarray] = []
+        self._data: List[np.ndarray] = []
+        self.nnz = 0
+        self.skipped = 0
+
+    def add(self, users: Sequence[str], products: Sequence[str], values: Sequence[float]) -> None:
+        if not len(users):
+            return
+        users = np.asarray(users, dtype=str)
+        products = np.asarray(products, dtype=str)
+        values = np.asarray(values, dtype=np.float32)
+        cols = np.searchsorted(self.product_ids, products)
+        cols[cols == len(self.product_ids)] = 0
+        known = self.product_ids[cols] == products if len(self.product_ids) else np.zeros(len(cols), dtype=bool)
+        if not known.all():
+            # Only possible if sales were added between the two queries
+            self.skipped += int((~known).sum())
+            users, cols, values = users[known], cols[known], values[known]
+            if not len(users):
+                return
+
+        if (len(users) > 1 and (users[1:] < users[:-1]).any()) or (self.user_ids and users[0] < self.user_ids[-1]):
+            raise ValueError("Rows must be sorted by user")
+        # A chunk may carry on with the previous chunk's last user
+        new_user = np.r_[True, users[1:] != users[:-1]]
+        if self.user_ids and users[0] == self.user_ids[-1]:
+            new_user[0] = False
+        starts = np.flatnonzero(new_user)
+        self.user_ids.extend(users[starts].tolist())
+        self._row_starts.append(self.nnz + starts)
+        self._indices.append(cols.astype(np.int32))
+        self._data.append(values)
+        self.nnz += len(users)
+
+    def build(self) -> Tuple[csr_matrix, np.ndarray, np.ndarray]:
+        """Return (user_items_csr, user_ids, product_ids)."""
+        indptr = np.concatenate([*self._row_starts, [self.nnz]]).astype(np.int64 if self.nnz >= 2**31 else np.int32)
+        indices = np.concatenate(self._indices) if self._indices else np.zeros(0, dtype=np.int32)
+        data = np.concatenate(self._data) if self._data else np.zeros(0, dtype=np.float32)
+        matrix = csr_matrix((data, indices, indptr), shape=(len(self.user_ids), len(self.product_ids)))
+        matrix.has_sorted_indices = True
+        return matrix, np.asarray(self.user_ids, dtype=str), self.product_ids
+
+
+def cursor_chunks(conn, sql: str, chunk_size: int = 100_000) -> Iterator[List[tuple]]:
+    """Rows of ``sql`` through a server-side (named) cursor, ``chunk_size`` at a time."""
+    with conn.cursor(name="training_data") as cur:
+        cur.itersize = chunk_size
+        cur.execute(sql)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+
+
+class _CopyReader(io.RawIOBase):
+    """File-like sink for ``copy_expert`` that hands complete lines to a callback in chunks."""
+
+    def __init__(self, on_rows, chunk_size: int):
+        self.on_rows = on_rows
+        self.chunk_size = chunk_size
+        self._partial = b""
+        self._rows: List[List[str]] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._rows.append(line.decode("utf-8").split("\t"))
+            if len(self._rows) >= self.chunk_size:
+                self.flush_rows()
+        return len(data)
+
+    def flush_rows(self) -> None:
+        if self._rows:
+            rows, self._rows = self._rows, []
+            self.on_rows(rows)
+
+
+def copy_chunks(conn, sql: str, chunk_size: int = 100_000, on_rows=None) -> None:
+    """Stream ``COPY (sql) TO STDOUT``, calling ``on_rows`` with each chunk of parsed rows."""
+    reader = _CopyReader(on_rows, chunk_size)
+    with conn.cursor() as cur:
+        cur.copy_expert(f"COPY ({sql}) TO STDOUT", reader)
+    reader.flush_rows()
+
+
+def _add_rows(builder: CSRBuilder, rows: Iterable[Sequence]) -> None:
+    users, products, values = zip(*rows)
+    builder.add(users, products, [float(v) for v in values])
+
+
+def build_from_postgres(
+    conn,
+    value: str = "lines",
+    since_ms: Optional[int] = None,
+    until_ms: Optional[int] = None,
+    method: str = "cursor",
+    chunk_size: int = 100_000,
+) -> Tuple[csr_matrix, np.ndarray, np.ndarray]:
+    """Stream the user-product aggregation from ``conn`` into (user_items_csr, user_ids, product_ids)."""
+    with conn.cursor() as cur:
+        cur.execute(products_sql(since_ms, until_ms))
+        builder = CSRBuilder([row[0] for row in cur])
+
+    sql = interactions_sql(value, since_ms, until_ms)
+    if method == "copy":
+        copy_chunks(conn, sql, chunk_size, on_rows=lambda rows: _add_rows(builder, rows))
+    else:
+        for rows in cursor_chunks(conn, sql, chunk_size):
+            _add_rows(builder, rows)
+    if builder.skipped:
+        logger.warning(f"Skipped {builder.skipped} rows for products missing from the product list")
+    return builder.build()
+
+
+def save_interactions(out_dir: str, user_items: csr_matrix, user_ids: np.ndarray, product_ids: np.ndarray) -> None:
+    os.makedirs(out_dir, exist_ok=True)
+    save_npz(os.path.join(out_dir, INTERACTION_MATRIX), user_items)
+    np.save(os.path.join(out_dir, USER_IDS), user_ids)
+    np.save(os.path.join(out_dir, PRODUCT_IDS), product_ids)
+
+
+def load_interactions(out_dir: str) -> Tuple[csr_matrix, np.ndarray, np.ndarray]:
+    return (
+        load_npz(os.path.join(out_dir, INTERACTION_MATRIX)).tocsr(),
+        np.load(os.path.join(out_dir, USER_IDS)),
+        np.load(os.path.join(out_dir, PRODUCT_IDS)),
+    )
+
+
+def _epoch_ms(value: str) -> int:
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build the user-item training matrix from Postgres.")
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--out", required=True, help="directory for interaction_matrix.npz, user_ids.npy, product_ids.npy")
+    parser.add_argument("--value", choices=sorted(VALUES), default="lines",
+                        help="cell value: number of order lines (what the model was trained on) or total quantity")
+    parser.add_argument("--since", type=_epoch_ms, default=None, help="only orders at or after this ISO date (UTC)")
+    parser.add_argument("--until", type=_epoch_ms, default=None, help="only orders before this ISO date (UTC)")
+    parser.add_argument("--method", choices=["cursor", "copy"], default="cursor")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.exit(1, "Set DATABASE_URL or pass --dsn\n")
+    import psycopg2
+
+    start = time.perf_counter()
+    with psycopg2.connect(args.dsn) as conn:
+        user_items, user_ids, product_ids = build_from_postgres(
+            conn, args.value, args.since, args.until, args.method, args.chunk_size
+        )
+    save_interactions(args.out, user_items, user_ids, product_ids)
+    logger.info(
+        f"Wrote {user_items.shape[0]} users x {user_items.shape[1]} products, {user_items.nnz} interactions "
+        f"to {args.out} in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
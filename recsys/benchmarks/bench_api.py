@@ -0,0 +1,314 @@
+"""Latency and throughput of every API endpoint against synthetic model bundles.
+
+Writes a bundle of random factors and interactions for each ``--size``
+(users x products; the products from the sales export come first so the
+catalog and search index have real names), then drives app.main with a
+fixed number of requests per endpoint:
+
+- ``inprocess``: through an ASGI client in this process, no network or server;
+- ``server``: against ``uvicorn app.main:app`` started locally on a free port.
+
+The response cache is disabled so every request is scored. Results (p50, p95,
+p99, mean latency and requests/s per endpoint) are printed and saved as JSON;
+``--compare`` prints the change against an earlier results file, e.g. one
+saved on another commit.
+
+Run from the recsys/ directory:
+
+    python -m benchmarks.bench_api --sizes 1000x200 20000x2000 --mode inprocess server
+    python -m benchmarks.bench_api --compare benchmarks/results/api_<commit>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from app.bundle import write_bundle
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BASE_DIR, "benchmarks", "results")
+
+Request = Tuple[str, str, Optional[dict]]
+
+
+def _uuids(rng: np.random.Generator, n: int) -> List[str]:
+    return [str(uuid.UUID(bytes=rng.bytes(16), version=4)) for _ in range(n)]
+
+
+def _sales_products() -> List[str]:
+    from app.inference import df_sale
+
+    return sorted(df_sale["product_id"].astype(str).unique()) if "product_id" in df_sale else []
+
+
+def synthetic_bundle(
+    root: str,
+    n_users: int,
+    n_items: int,
+    factors: int = 20,
+    per_user: int = 20,
+    seed: int = 0,
+) -> str:
+    """Write a bundle with random factors and popularity-skewed interactions; return its path."""
+    rng = np.random.default_rng(seed)
+    user_ids = sorted(_uuids(rng, n_users))
+    real = _sales_products()[:n_items]
+    product_ids = sorted(real + _uuids(rng, n_items - len(real)))
+
+    per_user = min(per_user, n_items)
+    # Zipf-like popularity, so a few products dominate as in real sales
+    popularity = 1.0 / np.arange(1, n_items + 1)
+    popularity /= popularity.sum()
+    rows = [np.sort(rng.choice(n_items, per_user, replace=False, p=popularity)) for _ in range(n_users)]
+    indices = np.concatenate(rows).astype(np.int32)
+    indptr = np.arange(0, n_users * per_user + 1, per_user)
+    data = rng.integers(1, 5, len(indices)).astype(np.float32)
+    user_items = csr_matrix((data, indices, indptr), shape=(n_users, n_items))
+
+    return write_bundle(
+        root,
+        (rng.normal(size=(n_users, factors)) * 0.1).astype(np.float32),
+        (rng.normal(size=(n_items, factors)) * 0.1).astype(np.float32),
+        user_items,
+        user_ids,
+        product_ids,
+        version=f"synthetic-{n_users}x{n_items}",
+        extra={"source": "bench_api", "regularization": 0.1, "alpha": 1.0},
+    )
+
+
+def scenarios(user_ids: List[str], product_ids: List[str], words: List[str], N: int) -> Dict[str, Callable]:
+    """Endpoint name -> function(rng) returning (method, url, json body)."""
+    api = "/api/v1/ecommerce"
+
+    def pick(rng, ids, n=None):
+        return ids[rng.integers(len(ids))] if n is None else [ids[i] for i in rng.integers(len(ids), size=n)]
+
+    return {
+        "ping": lambda rng: ("GET", "/ping", None),
+        "user": lambda rng: ("GET", f"{api}/recommendation/user/{pick(rng, user_ids)}?N={N}", None),
+        "user_cold_start": lambda rng: ("GET", f"{api}/recommendation/user/{_uuids(rng, 1)[0]}?N={N}", None),
+        "user_interactions": lambda rng: (
+            "POST",
+            f"{api}/recommendation/user/{_uuids(rng, 1)[0]}",
+            {"interactions": [{"product_id": p, "quantity": 1} for p in pick(rng, product_ids, 5)], "N": N},
+        ),
+        "users_batch_100": lambda rng: ("POST", f"{api}/recommendation/users", {"user_ids": pick(rng, user_ids, 100), "N": N}),
+        "score_1000": lambda rng: (
+            "POST",
+            f"{api}/recommendation/score",
+            {"user_ids": pick(rng, user_ids, 1000), "product_ids": pick(rng, product_ids, 1000)},
+        ),
+        "similar_products": lambda rng: ("GET", f"{api}/recommendations/products/{pick(rng, product_ids)}?N={N}", None),
+        "search": lambda rng: ("GET", f"{api}/products/search?q={' '.join(pick(rng, words, 2))}&N={N}", None),
+    }
+
+
+async def drive(client: httpx.AsyncClient, make: Callable, requests: int, concurrency: int, seed: int = 0) -> Dict:
+    """Send ``requests`` requests from ``concurrency`` concurrent tasks; return latency stats."""
+    rng = np.random.default_rng(seed)
+    planned = [make(rng) for _ in range(requests)]
+    latencies = np.zeros(requests)
+    errors = 0
+    next_request = iter(range(requests))
+
+    async def _worker():
+        nonlocal errors
+        for i in next_request:
+            method, url, body = planned[i]
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies[i] = time.perf_counter() - start
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ms = latencies * 1000
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "rps": requests / elapsed,
+    }
+
+
+async def run_endpoints(client, cases: Dict[str, Callable], args) -> Dict[str, Dict]:
+    results = {}
+    for name, make in cases.items():
+        if args.endpoints and name not in args.endpoints:
+            continue
+        await drive(client, make, args.warmup, args.concurrency, seed=1)
+        results[name] = await drive(client, make, args.requests, args.concurrency)
+    return results
+
+
+def run_inprocess(bundle_path: str, args) -> Dict[str, Dict]:
+    from app import main as api
+    from app.inference import load_snapshot
+
+    previous = api.model_store.current()
+    cache_size = api.response_cache.maxsize
+    snap = load_snapshot(bundle_path)
+    api.model_store.swap(snap)
+    api.response_cache.maxsize = 0
+    try:
+        cases = scenarios(*_ids(snap), args.N)
+
+        async def _run():
+            transport = httpx.ASGITransport(app=api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                return await run_endpoints(client, cases, args)
+
+        return asyncio.run(_run())
+    finally:
+        api.response_cache.maxsize = cache_size
+        api.model_store.swap(previous)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(bundle_root: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, MODEL_BUNDLE_DIR=bundle_root, RESPONSE_CACHE_SIZE="0", MODEL_RELOAD_INTERVAL="0")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning",
+         "--no-access-log"],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready", timeout=1).is_success:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+        if proc.poll() is not None:
+            break
+    proc.kill()
+    raise RuntimeError(f"uvicorn did not come up on port {port}")
+
+
+def run_server(bundle_path: str, args) -> Dict[str, Dict]:
+    from app.inference import load_snapshot
+
+    cases = scenarios(*_ids(load_snapshot(bundle_path)), args.N)
+    port = _free_port()
+    proc = start_server(os.path.dirname(bundle_path), port)
+    try:
+        async def _run():
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+                return await run_endpoints(client, cases, args)
+
+        return asyncio.run(_run())
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def _ids(snap) -> Tuple[List[str], List[str], List[str]]:
+    names = [n for n in snap.catalog.names if isinstance(n, str)]
+    words = sorted({w.lower() for n in names for w in n.split() if w.isalpha()}) or ["fertilizer"]
+    return list(snap.user_encoder.classes_), list(snap.product_encoder.classes_), words
+
+
+def _size(value: str) -> Tuple[int, int]:
+    users, items = value.lower().split("x")
+    return int(users), int(items)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = {(r["mode"], r["size"], r["endpoint"]): r for r in json.load(f)["results"]}
+    print(f"\nvs {baseline_path}")
+    print(f"{'mode':<10} {'size':<12} {'endpoint':<18} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8}")
+    for r in results:
+        old = baseline.get((r["mode"], r["size"], r["endpoint"]))
+        if old is None:
+            continue
+        change = [f"{(r[k] / old[k] - 1) * 100:>+7.0f}%" if old[k] else f"{'n/a':>8}"
+                  for k in ("p50_ms", "p95_ms", "p99_ms", "rps")]
+        print(f"{r['mode']:<10} {r['size']:<12} {r['endpoint']:<18} {' '.join(change)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=_size, nargs="+", default=[(1000, 200), (20000, 2000)],
+                        help="synthetic bundle sizes as USERSxPRODUCTS")
+    parser.add_argument("--factors", type=int, default=20)
+    parser.add_argument("--per-user", type=int, default=20, help="interactions per synthetic user")
+    parser.add_argument("--mode", choices=["inprocess", "server"], nargs="+", default=["inprocess"])
+    parser.add_argument("--endpoints", nargs="+", default=None, help="subset of endpoints to run (default: all)")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("-N", type=int, default=10)
+    parser.add_argument("--out", default=None, help="results JSON (default: benchmarks/results/api_<commit>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    commit = _git_commit()
+    out = args.out or os.path.join(RESULTS_DIR, f"api_{commit or 'unknown'}.json")
+    runners = {"inprocess": run_inprocess, "server": run_server}
+
+    results = []
+    print(f"{'mode':<10} {'size':<12} {'endpoint':<18} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'errors':>6}")
+    with tempfile.TemporaryDirectory() as root:
+        for n_users, n_items in args.sizes:
+            size = f"{n_users}x{n_items}"
+            # One bundle root per size, so the server loads exactly this bundle
+            bundle_path = synthetic_bundle(os.path.join(root, size), n_users, n_items, args.factors, args.per_user)
+            for mode in args.mode:
+                endpoint_results = runners[mode](bundle_path, args)
+                for endpoint, stats in endpoint_results.items():
+                    results.append({"mode": mode, "size": size, "endpoint": endpoint, **stats})
+                    print(f"{mode:<10} {size:<12} {endpoint:<18} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+                          f"{stats['p99_ms']:>8.2f} {stats['rps']:>8.0f} {stats['errors']:>6}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({
+            "commit": commit,
+            "created_at": int(time.time()),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+            "results": results,
+        }, f, indent=2)
+    print(f"\nSaved {out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Per-request enrichment latency: DataFrame scans vs. the product catalog.
+
+Run from the recsys/ directory:
+
+    python -m benchmarks.bench_catalog --rows 1000 10000 100000 1000000
+"""
+import argparse
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from app.catalog import build_product_catalog
+
+
+def make_sales(n_rows: int, n_products: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    product_ids = np.array([str(uuid.UUID(int=i + 1)) for i in range(n_products)], dtype=object)
+    idx = rng.integers(0, n_products, size=n_rows)
+    prices = rng.uniform(10_000, 500_000, size=n_products).round()
+    return pd.DataFrame({
+        "product_id": product_ids[idx],
+        "product_name_en": [f"Product {i}" for i in idx],
+        "product_type": np.where(idx % 3 == 0, "DIGITAL", "GOODS"),
+        "price": prices[idx] * 0.9,
+        "product_price": prices[idx],
+    })
+
+
+def enrich_scan(df_sale: pd.DataFrame, pids) -> list:
+    # What recommend_products_for_user used to do for every recommended item
+    out = []
+    for pid in pids:
+        row = df_sale[df_sale["product_id"] == pid]
+        if not row.empty:
+            first = row.iloc[0]
+            out.append((first.get("product_name_en"), first.get("product_price"), first.get("product_type")))
+    return out
+
+
+def enrich_catalog(catalog, item_idxs) -> list:
+    return [catalog.info(i) for i in item_idxs]
+
+
+def _time_per_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--products", type=int, default=2_000)
+    parser.add_argument("-N", type=int, default=10, help="recommended items per request")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>10} {'build ms':>10} {'scan ms/req':>12} {'catalog ms/req':>15} {'speedup':>9}")
+    for n_rows in args.rows:
+        df_sale = make_sales(n_rows, args.products)
+        product_ids = sorted(df_sale["product_id"].unique())
+
+        start = time.perf_counter()
+        catalog = build_product_catalog(df_sale, product_ids)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        item_idxs = rng.integers(0, len(product_ids), size=args.N)
+        pids = [product_ids[i] for i in item_idxs]
+
+        scan = _time_per_call(lambda: enrich_scan(df_sale, pids), args.repeat)
+        indexed = _time_per_call(lambda: enrich_catalog(catalog, item_idxs), args.repeat * 100)
+        print(f"{n_rows:>10} {build_ms:>10.1f} {scan * 1000:>12.3f} {indexed * 1000:>15.4f} {scan / indexed:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Filtered recommendations: masked argpartition vs. over-fetching and filtering in Python.
+
+For each catalog size and filter, times one filtered recommendation for a
+random user factor:
+
+- ``overfetch``: rank the top ``--overfetch`` x N items, then walk them in
+  Python checking each product's type and price (what callers had to do);
+  counts how often that leaves fewer than N items;
+- ``mask``: app.filters builds the allowed mask from the catalog arrays and
+  app.cold_start.rank_items masks the full score vector before
+  argpartition, so it always returns min(N, allowed) items.
+
+Run from the recsys/ directory:
+
+    python -m benchmarks.bench_filters --items 10000 100000 1000000 -N 10
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.catalog import ProductCatalog
+from app.cold_start import rank_items
+from app.filters import ItemFilter
+
+FILTERS = {
+    "type=DIGITAL": ItemFilter(product_types=("DIGITAL",)),
+    "price<=20000": ItemFilter(max_price=20_000),
+    "GOODS,100k-200k": ItemFilter(product_types=("GOODS",), min_price=100_000, max_price=200_000),
+}
+
+
+def make_catalog(n_items: int, seed: int = 0) -> ProductCatalog:
+    rng = np.random.default_rng(seed)
+    return ProductCatalog(
+        (f"p{i}" for i in range(n_items)),
+        (f"Product {i}" for i in range(n_items)),
+        np.where(rng.random(n_items) < 0.05, "DIGITAL", "GOODS"),
+        rng.uniform(10_000, 500_000, size=n_items).round(),
+    )
+
+
+def overfetch(catalog: ProductCatalog, item_factors, factor, seen, N: int, factor_n: int, item_filter: ItemFilter):
+    items, _ = rank_items(item_factors, factor, seen, N * factor_n)
+    types = {t.lower() for t in item_filter.product_types or ()}
+    out = []
+    for idx in items:
+        info = catalog.info(int(idx))
+        price = info["price"]
+        if types and info["product_type"].lower() not in types:
+            continue
+        if item_filter.min_price is not None and (price is None or price < item_filter.min_price):
+            continue
+        if item_filter.max_price is not None and (price is None or price > item_filter.max_price):
+            continue
+        out.append(idx)
+        if len(out) == N:
+            break
+    return out
+
+
+def masked(catalog: ProductCatalog, item_factors, factor, seen, N: int, item_filter: ItemFilter):
+    allowed = item_filter.mask(catalog, item_factors.shape[0])
+    return rank_items(item_factors, factor, seen, N, allowed)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--factors", type=int, default=20)
+    parser.add_argument("-N", type=int, default=10)
+    parser.add_argument("--overfetch", type=int, default=5, help="over-fetch factor for the Python baseline")
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'items':>9} {'filter':<16} {'overfetch ms':>13} {'short':>6} {'mask ms':>8} {'short':>6}")
+    for n_items in args.items:
+        catalog = make_catalog(n_items)
+        item_factors = rng.normal(size=(n_items, args.factors)).astype(np.float32)
+        factors = rng.normal(size=(args.queries, args.factors)).astype(np.float32)
+        seen = rng.choice(n_items, size=20, replace=False)
+
+        for name, item_filter in FILTERS.items():
+            results = {}
+            for label, fn in (
+                ("overfetch", lambda f: overfetch(catalog, item_factors, f, seen, args.N, args.overfetch, item_filter)),
+                ("mask", lambda f: masked(catalog, item_factors, f, seen, args.N, item_filter)),
+            ):
+                fn(factors[0])
+                start = time.perf_counter()
+                short = sum(len(fn(f)) < args.N for f in factors)
+                results[label] = ((time.perf_counter() - start) / args.queries, short)
+            (slow, slow_short), (fast, fast_short) = results["overfetch"], results["mask"]
+            print(f"{n_items:>9} {name:<16} {slow * 1000:>13.3f} {slow_short:>6} {fast * 1000:>8.3f} {fast_short:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Fold-in ALS updates vs a full refit as the batch of new interactions grows.
+
+Interactions are sampled from a synthetic latent-factor model. A slice of each
+user's interactions is held out for evaluation and another slice is withheld
+from the base model as the pool of "new" interactions. For each delta size the
+base model is updated with fold-in and, separately, refit from scratch on the
+same data; both are scored by recall@10 on the held-out interactions of the
+users the delta touched, next to the stale base model.
+
+Run from the recsys/ directory:
+
+    python -m benchmarks.bench_fold_in --users 20000 --items 2000 --deltas 0.1 1 5 10
+"""
+import argparse
+import copy
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from implicit.cpu.als import AlternatingLeastSquares
+
+from app.fold_in import fold_in
+
+
+def synthetic_interactions(n_users: int, n_items: int, per_user: int, factors: int = 16, seed: int = 0):
+    """(users, items) pairs drawn from softmax(user . item) for each user."""
+    rng = np.random.default_rng(seed)
+    users_latent = rng.normal(size=(n_users, factors)).astype(np.float32)
+    items_latent = rng.normal(size=(n_items, factors)).astype(np.float32)
+    users, items = [], []
+    for start in range(0, n_users, 1024):
+        logits = users_latent[start:start + 1024] @ items_latent.T
+        # Gumbel top-k samples per_user distinct items per row without replacement
+        picks = np.argpartition(-(logits + rng.gumbel(size=logits.shape)), per_user, axis=1)[:, :per_user]
+        users.append(np.repeat(np.arange(start, start + len(picks)), per_user))
+        items.append(picks.ravel())
+    return np.concatenate(users), np.concatenate(items)
+
+
+def _matrix(users, items, shape):
+    return sp.csr_matrix((np.ones(len(users), dtype=np.float32), (users, items)), shape=shape)
+
+
+def recall_at(model, users, seen, held_out, N: int = 10) -> float:
+    ids, _ = model.recommend(users, seen[users], N=N, filter_already_liked_items=True)
+    truth = held_out[users]
+    hits = sum(len(np.intersect1d(row, truth.indices[truth.indptr[i]:truth.indptr[i + 1]])) for i, row in enumerate(ids))
+    return hits / max(truth.nnz, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--items", type=int, default=1_000)
+    parser.add_argument("--per-user", type=int, default=30, help="interactions per user")
+    parser.add_argument("--factors", type=int, default=32)
+    parser.add_argument("--iterations", type=int, default=15, help="ALS iterations for the base model and refits")
+    parser.add_argument("--deltas", type=float, nargs="+", default=[0.1, 1, 5, 10],
+                        help="new interactions as a percentage of the training data")
+    args = parser.parse_args()
+
+    shape = (args.users, args.items)
+    users, items = synthetic_interactions(args.users, args.items, args.per_user)
+    rng = np.random.default_rng(1)
+    order = rng.permutation(len(users))
+    n_test = len(users) // 5
+    n_pool = int(len(users) * max(args.deltas) / 100)
+    test, pool, base = order[:n_test], order[n_test:n_test + n_pool], order[n_test + n_pool:]
+    held_out = _matrix(users[test], items[test], shape)
+    base_matrix = _matrix(users[base], items[base], shape)
+
+    base_model = AlternatingLeastSquares(factors=args.factors, regularization=0.1, iterations=args.iterations,
+                                         random_state=0)
+    start = time.perf_counter()
+    base_model.fit(base_matrix, show_progress=False)
+    print(f"base model: {base_matrix.nnz} interactions, fit in {time.perf_counter() - start:.2f}s")
+
+    print(f"{'delta %':>8} {'new':>8} {'users':>7} {'fold-in s':>10} {'refit s':>8} {'speedup':>8} "
+          f"{'R@10 stale':>11} {'fold-in':>8} {'refit':>8}")
+    for pct in args.deltas:
+        n_new = max(int(len(base) * pct / 100), 1)
+        new = pool[:n_new]
+        delta = _matrix(users[new], items[new], shape)
+
+        model = copy.deepcopy(base_model)
+        start = time.perf_counter()
+        result = fold_in(model, base_matrix, delta)
+        fold_s = time.perf_counter() - start
+
+        refit = AlternatingLeastSquares(factors=args.factors, regularization=0.1, iterations=args.iterations,
+                                        random_state=0)
+        start = time.perf_counter()
+        refit.fit(result.user_items, show_progress=False)
+        refit_s = time.perf_counter() - start
+
+        touched = result.users
+        recalls = [recall_at(m, touched, result.user_items, held_out) for m in (base_model, model, refit)]
+        print(f"{pct:>8g} {n_new:>8} {len(touched):>7} {fold_s:>10.3f} {refit_s:>8.2f} {refit_s / fold_s:>7.0f}x "
+              f"{recalls[0]:>11.3f} {recalls[1]:>8.3f} {recalls[2]:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
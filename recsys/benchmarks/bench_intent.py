@@ -0,0 +1,58 @@
+"""Fuzzy vocabulary lookup: BK-tree against a linear scan, as the vocabulary grows.
+
+Run from the recsys/ directory:
+
+    python -m benchmarks.bench_intent --sizes 1000 10000 30000
+"""
+import argparse
+import random
+import string
+import time
+
+import numpy as np
+
+from app.intent import BKTree, levenshtein, max_distance
+
+
+def random_words(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return list({"".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))) for _ in range(n)})
+
+
+def typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(len(word))
+    return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 30000])
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    print(f"{'vocab':>8} {'build s':>8} {'bktree ms':>10} {'scan ms':>8} {'ratio':>6}")
+    for size in args.sizes:
+        words = random_words(size)
+        start = time.perf_counter()
+        tree = BKTree(words)
+        build_s = time.perf_counter() - start
+        queries = [typo(rng.choice(words), rng) for _ in range(args.queries)]
+
+        tree_ms, scan_ms = [], []
+        for q in queries:
+            radius = max_distance(q)
+            start = time.perf_counter()
+            found = tree.search(q, radius)
+            tree_ms.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            expected = sorted((d, w) for w in words if (d := levenshtein(q, w)) <= radius)
+            scan_ms.append(time.perf_counter() - start)
+            assert found == expected
+        ratio = np.median(tree_ms) / np.median(scan_ms)
+        print(f"{len(words):>8} {build_s:>8.2f} {np.median(tree_ms) * 1000:>10.2f} "
+              f"{np.median(scan_ms) * 1000:>8.2f} {ratio:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Pairwise scoring throughput: vectorized score_pairs vs a per-pair Python loop.
+
+Run from the recsys/ directory:
+
+    python -m benchmarks.bench_scoring --pairs 1000000 --factors 20 64
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.scoring import score_pairs
+
+
+def loop_scores(user_factors, item_factors, users, items):
+    # What incremental_learning.predict_ratings used to do
+    preds = []
+    for u, p in zip(users, items):
+        if 0 <= u < user_factors.shape[0] and 0 <= p < item_factors.shape[0]:
+            preds.append(user_factors[u].dot(item_factors[p]))
+        else:
+            preds.append(0)
+    return np.array(preds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--factors", type=int, nargs="+", default=[20, 64])
+    parser.add_argument("--chunk-size", type=int, default=16384)
+    parser.add_argument("--loop-pairs", type=int, default=100_000,
+                        help="pairs timed with the Python loop; its rate is extrapolated")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--api-pairs", type=int, default=10_000,
+                        help="pairs per request for the POST /score round trip with the shipped model; 0 skips")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    users = rng.integers(0, args.users, args.pairs)
+    items = rng.integers(0, args.items, args.pairs)
+    print(f"{args.pairs} pairs, {args.users} users x {args.items} items")
+    print(f"{'factors':>8} {'loop pairs/s':>13} {'vector s':>9} {'vector pairs/s':>15} {'speedup':>8}")
+    for factors in args.factors:
+        user_factors = rng.normal(size=(args.users, factors)).astype(np.float32)
+        item_factors = rng.normal(size=(args.items, factors)).astype(np.float32)
+
+        n_loop = min(args.loop_pairs, args.pairs)
+        start = time.perf_counter()
+        expected = loop_scores(user_factors, item_factors, users[:n_loop], items[:n_loop])
+        loop_rate = n_loop / (time.perf_counter() - start)
+
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            scores, _ = score_pairs(user_factors, item_factors, users, items, chunk_size=args.chunk_size)
+            best = min(best, time.perf_counter() - start)
+        np.testing.assert_allclose(scores[:n_loop], expected, rtol=1e-4, atol=1e-4)
+
+        rate = args.pairs / best
+        print(f"{factors:>8} {loop_rate:>13,.0f} {best:>9.3f} {rate:>15,.0f} {rate / loop_rate:>7.0f}x")
+
+    if args.api_pairs:
+        api_round_trip(args.api_pairs, args.repeat)
+
+
+def api_round_trip(n_pairs: int, repeat: int):
+    from fastapi.testclient import TestClient
+
+    from app import main as api
+
+    snap = api.model_store.current()
+    rng = np.random.default_rng(1)
+    body = {
+        "user_ids": list(rng.choice(snap.user_encoder.classes_, n_pairs)),
+        "product_ids": list(rng.choice(snap.product_encoder.classes_, n_pairs)),
+    }
+    client = TestClient(api.app)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.post("/api/v1/ecommerce/recommendation/score", json=body)
+        best = min(best, time.perf_counter() - start)
+        response.raise_for_status()
+    print(f"POST /score, {n_pairs} pairs per request: {best * 1000:.1f} ms, {n_pairs / best:,.0f} pairs/s end to end")
+
+
+if __name__ == "__main__":
+    main()
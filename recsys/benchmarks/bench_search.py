@@ -0,0 +1,64 @@
+"""Build time and query latency of the BM25 product search index.
+
+Generates a synthetic catalog with product-like names and descriptions
+drawn from a Zipf-distributed vocabulary, then times queries of 1-4 terms.
+
+Run from the recsys/ directory:
+
+    python -m benchmarks.bench_search --products 100000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.search import BM25Index
+
+
+def synthetic_catalog(n_products: int, vocab_size: int, desc_words: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"w{i}" for i in range(vocab_size)])
+    # Word frequencies in product text are heavy-tailed: a few words are everywhere
+    p = 1.0 / np.arange(1, vocab_size + 1)
+    p /= p.sum()
+    names = [" ".join(vocab[rng.choice(vocab_size, 4, p=p)]) for _ in range(n_products)]
+    lengths = rng.integers(desc_words // 2, desc_words * 2, size=n_products)
+    words = vocab[rng.choice(vocab_size, int(lengths.sum()), p=p)]
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    descriptions = [" ".join(words[bounds[i]:bounds[i + 1]]) for i in range(n_products)]
+    return vocab, p, names, descriptions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--vocab", type=int, default=50_000)
+    parser.add_argument("--desc-words", type=int, default=60)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("-N", type=int, default=10)
+    args = parser.parse_args()
+
+    vocab, p, names, descriptions = synthetic_catalog(args.products, args.vocab, args.desc_words)
+    start = time.perf_counter()
+    index = BM25Index.build(names, descriptions)
+    build_s = time.perf_counter() - start
+    mb = (index.doc_ids.nbytes + index.tfs.nbytes + index.offsets.nbytes) / 1e6
+    print(f"{args.products} products, {len(index.vocabulary)} terms, {len(index.doc_ids)} postings "
+          f"({mb:.0f} MB), built in {build_s:.1f}s")
+
+    rng = np.random.default_rng(1)
+    print(f"{'terms':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for n_terms in (1, 2, 4):
+        # Queries mix common and rare words the way user queries do
+        queries = [" ".join(vocab[rng.choice(args.vocab, n_terms, p=p)]) for _ in range(args.queries)]
+        latencies = []
+        for q in queries:
+            start = time.perf_counter()
+            index.search(q, args.N)
+            latencies.append(time.perf_counter() - start)
+        ms = np.array(latencies) * 1000
+        print(f"{n_terms:>6} {np.percentile(ms, 50):>8.3f} {np.percentile(ms, 95):>8.3f} {np.percentile(ms, 99):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
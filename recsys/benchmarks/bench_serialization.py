@@ -0,0 +1,136 @@
+"""Response encoding: pydantic response models vs. pre-encoded product fragments.
+
+``encode`` times building the JSON body of a response from the enriched
+recommendations the inference functions return, for ``-N`` items per user
+and ``--users`` users per response (1 is the user endpoint, more the batch
+endpoint):
+
+- ``pydantic``: an item model per recommendation, wrapped in the response
+  model, then what FastAPI does with a ``response_model`` (dump, validate
+  again, dump to JSON types, ``json.dumps``);
+- ``fragments``: app.serialization, product fields encoded once up front.
+
+``api`` times the user and batch endpoints end to end through an in-process
+client with ``FAST_RESPONSES`` off and on, against the model in app/models
+(or the newest bundle).
+
+Run from the recsys/ directory:
+
+    python -m benchmarks.bench_serialization -N 10 100 --users 1 100 1000
+"""
+import argparse
+import json
+import time
+import uuid
+
+import numpy as np
+
+from app.catalog import build_product_catalog
+from app.models import (
+    ApiV1EcommerceRecommendationUserBatchPost200Response,
+    RecommendedProductList,
+    RecommendedProductListItem,
+    UserRecommendationList,
+)
+from app.serialization import ProductFragments, user_recommendations_json
+from benchmarks.bench_catalog import make_sales
+
+
+def _time_per_call(fn, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def encode_pydantic(batch) -> bytes:
+    response = ApiV1EcommerceRecommendationUserBatchPost200Response(results=[
+        UserRecommendationList(
+            user_id=user_id,
+            items=RecommendedProductList(root=[RecommendedProductListItem(**rec) for rec in recs]),
+        )
+        for user_id, recs in batch
+    ])
+    # What FastAPI's serialize_response does with a response_model
+    validated = ApiV1EcommerceRecommendationUserBatchPost200Response.model_validate(response.model_dump())
+    return json.dumps(validated.model_dump(mode="json"), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def encode_fragments(fragments: ProductFragments, batch) -> bytes:
+    return b'{"results":[' + b",".join(
+        user_recommendations_json(user_id, fragments.encode_items(recs)) for user_id, recs in batch
+    ) + b"]}"
+
+
+def bench_encode(args) -> None:
+    rng = np.random.default_rng(0)
+    df_sale = make_sales(args.products * 5, args.products)
+    catalog = build_product_catalog(df_sale, sorted(df_sale["product_id"].unique()))
+
+    start = time.perf_counter()
+    fragments = ProductFragments(catalog)
+    print(f"Encoded {len(fragments)} product fragments in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    print(f"{'N':>5} {'users':>6} {'pydantic ms':>12} {'fragments ms':>13} {'speedup':>8}")
+    for n in args.N:
+        for users in args.users:
+            batch = []
+            for _ in range(users):
+                recs = []
+                for idx, score in zip(rng.choice(catalog.n_encoded, size=n, replace=False), rng.random(n)):
+                    rec = catalog.info(int(idx))
+                    rec["relevance_score"] = float(score)
+                    rec["recommendation_id"] = str(uuid.uuid4())
+                    recs.append(rec)
+                batch.append((str(uuid.uuid4()), recs))
+            repeat = max(3, args.items // (n * users))
+            slow = _time_per_call(lambda: encode_pydantic(batch), repeat)
+            fast = _time_per_call(lambda: encode_fragments(fragments, batch), repeat)
+            print(f"{n:>5} {users:>6} {slow * 1000:>12.3f} {fast * 1000:>13.3f} {slow / fast:>7.1f}x")
+
+
+def bench_api(args) -> None:
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    main.response_cache.maxsize = 0
+    client = TestClient(main.app)
+    user_ids = list(main.model_store.current().user_encoder.classes_)
+    rng = np.random.default_rng(0)
+
+    print(f"{'endpoint':<24} {'N':>5} {'pydantic ms':>12} {'fragments ms':>13} {'speedup':>8}")
+    for n in args.N:
+        batch = {"user_ids": [user_ids[i] for i in rng.integers(len(user_ids), size=max(args.users))], "N": n}
+        calls = {
+            "user": lambda: client.get(f"/api/v1/ecommerce/recommendation/user/{user_ids[0]}?N={n}"),
+            f"users x{len(batch['user_ids'])}": lambda: client.post("/api/v1/ecommerce/recommendation/users", json=batch),
+        }
+        for name, call in calls.items():
+            timings = []
+            for fast in (False, True):
+                main.FAST_RESPONSES = fast
+                timings.append(_time_per_call(call, args.requests))
+            print(f"{name:<24} {n:>5} {timings[0] * 1000:>12.3f} {timings[1] * 1000:>13.3f} "
+                  f"{timings[0] / timings[1]:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", nargs="+", choices=["encode", "api"], default=["encode", "api"])
+    parser.add_argument("-N", type=int, nargs="+", default=[10, 100], help="items per user")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 100, 1000], help="users per response")
+    parser.add_argument("--products", type=int, default=20_000, help="catalog size for the encode benchmark")
+    parser.add_argument("--items", type=int, default=200_000, help="items to encode per measurement")
+    parser.add_argument("--requests", type=int, default=50, help="requests per endpoint in the api benchmark")
+    args = parser.parse_args()
+
+    if "encode" in args.mode:
+        bench_encode(args)
+    if "api" in args.mode:
+        bench_api(args)
+
+
+if __name__ == "__main__":
+    main()
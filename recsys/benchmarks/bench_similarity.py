@@ -0,0 +1,67 @@
+"""Recall@10 and query latency of the IVF similarity index against exact search.
+
+Run from the recsys/ directory:
+
+    python -m benchmarks.bench_similarity --items 100000 --probes 1 4 8 16
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.similarity import ExactIndex, IVFIndex
+
+
+def clustered_factors(n_items: int, factors: int, clusters: int, noise: float, seed: int = 0) -> np.ndarray:
+    # ALS item factors are far from uniform: related products sit close together
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, factors))
+    labels = rng.integers(0, clusters, size=n_items)
+    return (centers[labels] + rng.normal(scale=noise, size=(n_items, factors))).astype(np.float32)
+
+
+def run_queries(index, queries, N):
+    results, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        items, _ = index.search(int(q), N)
+        latencies.append(time.perf_counter() - start)
+        results.append(set(items.tolist()))
+    return results, np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--factors", type=int, default=64)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=1.0, help="spread of items around their cluster")
+    parser.add_argument("--lists", type=int, default=None, help="IVF lists (default sqrt(items))")
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-N", type=int, default=10)
+    args = parser.parse_args()
+
+    factors = clustered_factors(args.items, args.factors, args.clusters, args.noise)
+    queries = np.random.default_rng(1).integers(0, args.items, size=args.queries)
+
+    exact = ExactIndex(factors)
+    truth, exact_ms = run_queries(exact, queries, args.N)
+
+    start = time.perf_counter()
+    ivf = IVFIndex(factors, n_lists=args.lists)
+    build_s = time.perf_counter() - start
+
+    print(f"{args.items} items x {args.factors} factors, {ivf.n_lists} IVF lists (built in {build_s:.1f}s)")
+    print(f"{'mode':>12} {'recall@' + str(args.N):>10} {'p50 ms':>8} {'p99 ms':>8}")
+    print(f"{'exact':>12} {1.0:>10.3f} {np.percentile(exact_ms, 50):>8.3f} {np.percentile(exact_ms, 99):>8.3f}")
+    for n_probe in args.probes:
+        ivf.n_probe = min(n_probe, ivf.n_lists)
+        found, ivf_ms = run_queries(ivf, queries, args.N)
+        recall = np.mean([len(f & t) / args.N for f, t in zip(found, truth)])
+        print(f"{'ivf/' + str(ivf.n_probe):>12} {recall:>10.3f} "
+              f"{np.percentile(ivf_ms, 50):>8.3f} {np.percentile(ivf_ms, 99):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
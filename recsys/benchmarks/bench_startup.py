@@ -0,0 +1,126 @@
+"""Import and startup time of the API.
+
+Measures, in fresh interpreters:
+
+- ``import``: wall time of ``import app.main`` (median of ``--repeat`` runs),
+  and the slowest modules by cumulative time from ``python -X importtime``;
+- ``server``: time from starting ``uvicorn app.main:app`` until ``/ping``
+  answers (accepting connections) and until ``/ready`` returns 200 (the
+  model is loaded and requests are served without waiting).
+
+Run from the recsys/ directory:
+
+    python -m benchmarks.bench_startup --repeat 5 --top 15
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_seconds(repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _IMPORT_SNIPPET], cwd=BASE_DIR, check=True,
+                             capture_output=True, text=True).stdout
+        times.append(float(out.strip().splitlines()[-1]))
+    return times
+
+
+def slowest_imports(top: int) -> List[Tuple[str, float, float]]:
+    """(module, self seconds, cumulative seconds) of the ``top`` top-level imports by cumulative time."""
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=BASE_DIR,
+                         check=True, capture_output=True, text=True).stderr
+    rows = []
+    for line in err.splitlines():
+        match = _IMPORTTIME.match(line)
+        # Depth 1 are the imports app.* triggers directly or the interpreter runs itself
+        if match and len(match.group(3)) <= 3:
+            rows.append((match.group(4), int(match.group(1)) / 1e6, int(match.group(2)) / 1e6))
+    rows.sort(key=lambda row: -row[2])
+    return rows[:top]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_seconds(timeout: float = 180.0) -> Dict[str, float]:
+    port = _free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BASE_DIR, env=dict(os.environ, MODEL_RELOAD_INTERVAL="0"),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    result = {}
+    try:
+        while time.perf_counter() - start < timeout and proc.poll() is None:
+            for name in ("ping", "ready"):
+                if name in result:
+                    continue
+                try:
+                    if httpx.get(f"http://127.0.0.1:{port}/{name}", timeout=1).is_success:
+                        result[name] = time.perf_counter() - start
+                except httpx.HTTPError:
+                    pass
+            if "ready" in result:
+                return result
+            time.sleep(0.02)
+        raise RuntimeError(f"uvicorn was not ready within {timeout:g}s ({result})")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--no-server", action="store_true", help="only measure the import")
+    parser.add_argument("--out", default=None, help="also write the results as JSON")
+    args = parser.parse_args()
+
+    imports = import_seconds(args.repeat)
+    print(f"import app.main: median {statistics.median(imports):.3f}s "
+          f"(min {min(imports):.3f}s, max {max(imports):.3f}s, {args.repeat} runs)")
+    slowest = slowest_imports(args.top)
+    print(f"{'self s':>8} {'cumul s':>8}  module")
+    for module, own, cumulative in slowest:
+        print(f"{own:>8.3f} {cumulative:>8.3f}  {module}")
+
+    results = {
+        "import_seconds": imports,
+        "slowest_imports": [{"module": m, "self": s, "cumulative": c} for m, s, c in slowest],
+    }
+    if not args.no_server:
+        runs = [server_seconds() for _ in range(args.repeat)]
+        for name in ("ping", "ready"):
+            values = [run[name] for run in runs]
+            print(f"uvicorn start -> /{name}: median {statistics.median(values):.3f}s "
+                  f"(min {min(values):.3f}s, max {max(values):.3f}s)")
+        results["server_seconds"] = runs
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Top-K table build time and on-disk size as users and products scale.
+
+Run from the recsys/ directory:
+
+    python -m benchmarks.bench_topk --sizes 10000x1000 100000x10000 -k 50
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from app.topk import TABLES, TopKStore, build_topk_tables
+
+
+def synthetic_model(n_users: int, n_items: int, factors: int, interactions_per_user: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    user_factors = rng.normal(scale=0.1, size=(n_users, factors)).astype(np.float32)
+    item_factors = rng.normal(scale=0.1, size=(n_items, factors)).astype(np.float32)
+    nnz = n_users * interactions_per_user
+    user_items = sp.csr_matrix(
+        (np.ones(nnz, dtype=np.float32),
+         (np.repeat(np.arange(n_users), interactions_per_user), rng.integers(0, n_items, size=nnz))),
+        shape=(n_users, n_items),
+    )
+    return user_factors, item_factors, user_items
+
+
+def _parse_size(value: str):
+    users, items = value.lower().split("x")
+    return int(users), int(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=_parse_size, nargs="+",
+                        default=[(1_000, 100), (10_000, 1_000), (100_000, 10_000)],
+                        help="USERSxITEMS pairs")
+    parser.add_argument("-k", type=int, default=50)
+    parser.add_argument("--factors", type=int, default=64)
+    parser.add_argument("--block-size", type=int, default=1024)
+    parser.add_argument("--interactions", type=int, default=10, help="interactions per user")
+    args = parser.parse_args()
+
+    print(f"{'users':>9} {'items':>8} {'build s':>9} {'size MB':>9} {'lookup us':>10}")
+    for n_users, n_items in args.sizes:
+        user_factors, item_factors, user_items = synthetic_model(n_users, n_items, args.factors, args.interactions)
+        with tempfile.TemporaryDirectory() as out_dir:
+            start = time.perf_counter()
+            build_topk_tables(out_dir, user_factors, item_factors, user_items, k=args.k, block_size=args.block_size)
+            build_s = time.perf_counter() - start
+            size = sum(os.path.getsize(os.path.join(out_dir, f"{name}.npy")) for name in TABLES)
+
+            store = TopKStore.open(out_dir)
+            users = np.random.default_rng(1).integers(0, n_users, size=10_000)
+            start = time.perf_counter()
+            for u in users:
+                store.user_topk(int(u), 10)
+            lookup_us = (time.perf_counter() - start) / len(users) * 1e6
+            del store
+
+        print(f"{n_users:>9} {n_items:>8} {build_s:>9.2f} {size / 1e6:>9.2f} {lookup_us:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
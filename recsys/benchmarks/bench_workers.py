@@ -0,0 +1,125 @@
+"""Throughput of the API served by gunicorn as the worker count grows.
+
+Starts ``gunicorn -c gunicorn.conf.py app.main:app`` for each worker count,
+drives the user and similar-product endpoints from a pool of keep-alive
+clients for a fixed duration, and reports requests/s and latency
+percentiles. The response cache is disabled so every request is scored.
+
+Run from the recsys/ directory:
+
+    python -m benchmarks.bench_workers --workers 1 2 4 --concurrency 16 --duration 10
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+
+from app.bundle import bundle_root, latest_bundle, load_bundle
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _ids():
+    path = latest_bundle(bundle_root(os.path.join(BASE_DIR, "app")))
+    if path:
+        bundle = load_bundle(path)
+        return list(bundle.user_encoder.classes_), list(bundle.product_encoder.classes_)
+    import pickle
+    with open(os.path.join(BASE_DIR, "app", "models", "user_encoder.pkl"), "rb") as f:
+        users = list(pickle.load(f).classes_)
+    with open(os.path.join(BASE_DIR, "app", "models", "product_encoder.pkl"), "rb") as f:
+        products = list(pickle.load(f).classes_)
+    return users, products
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), RESPONSE_CACHE_SIZE="0",
+               MODEL_RELOAD_INTERVAL="0")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/ready", timeout=1).ok:
+                return proc
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"gunicorn with {workers} workers did not come up")
+
+
+def drive(port: int, urls, concurrency: int, duration: float):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def _client(seed: int):
+        rng = np.random.default_rng(seed)
+        session = requests.Session()
+        local = []
+        while time.perf_counter() < stop_at:
+            url = urls[rng.integers(len(urls))]
+            start = time.perf_counter()
+            try:
+                ok = session.get(f"http://127.0.0.1:{port}{url}", timeout=10).ok
+            except requests.RequestException:
+                ok = False
+            local.append(time.perf_counter() - start)
+            if not ok:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=_client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return np.array(latencies) * 1000, errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("-N", type=int, default=10)
+    args = parser.parse_args()
+
+    users, products = _ids()
+    urls = [f"/api/v1/ecommerce/recommendation/user/{u}?N={args.N}" for u in users]
+    urls += [f"/api/v1/ecommerce/recommendations/products/{p}?N={args.N}" for p in products]
+
+    print(f"{os.cpu_count()} CPUs, {args.concurrency} concurrent clients, {args.duration:g}s per run")
+    print(f"{'workers':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for workers in args.workers:
+        port = _free_port()
+        proc = start_server(workers, port)
+        try:
+            drive(port, urls, args.concurrency, min(2.0, args.duration))  # warm-up
+            latencies, errors = drive(port, urls, args.concurrency, args.duration)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+        print(f"{workers:>8} {len(latencies) / args.duration:>9.0f} {np.percentile(latencies, 50):>8.2f} "
+              f"{np.percentile(latencies, 99):>8.2f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
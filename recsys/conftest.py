@@ -0,0 +1,9 @@
+# Makes the `app` package importable when running `python -m pytest` from recsys/.
+import os
+import tempfile
+
+# Keep the feedback log and LLM cache written by the API tests out of app/data
+os.environ.setdefault("FEEDBACK_LOG_DIR", tempfile.mkdtemp(prefix="feedback-log-"))
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(tempfile.mkdtemp(prefix="llm-cache-"), "llm_cache.sqlite3"))
+# The chatbot refuses to call the LLM without a key; tests talk to a fake server
+os.environ.setdefault("HF_API_KEY", "test-key")
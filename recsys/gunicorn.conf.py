@@ -0,0 +1,50 @@
+"""Gunicorn settings for serving the API with several worker processes.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The app is imported once in the master process before forking, and with
+MODEL_PRELOAD=1 (set here) the master also loads the model, catalog and
+similarity index, so workers share those pages copy-on-write instead of each
+loading their own copy. Memory-mapped model bundles are shared through the
+page cache either way. Plain ``uvicorn app.main:app`` loads the model in the
+background instead and answers /ping straight away (see /ready).
+
+Environment:
+    PORT               port to bind (default 10000)
+    WEB_CONCURRENCY    number of worker processes (default: one per CPU)
+    WORKER_THREADS     BLAS/OpenMP threads per worker (default: CPUs / workers, at least 1)
+    MODEL_PRELOAD      load the model in the master before forking (default 1)
+"""
+import gc
+import multiprocessing
+import os
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", cpu_count))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+os.environ.setdefault("MODEL_PRELOAD", "1")
+
+# Each worker scores requests on its own, so letting every worker's BLAS and
+# OpenMP pools use every core just oversubscribes the CPU. These have to be set
+# before numpy is first imported, which with preload_app is in the master.
+worker_threads = int(os.environ.get("WORKER_THREADS", max(1, cpu_count // max(workers, 1))))
+for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS"):
+    os.environ.setdefault(var, str(worker_threads))
+
+
+def when_ready(server):
+    # Move everything allocated while preloading into the permanent generation so
+    # the cyclic GC in the workers does not touch (and un-share) those pages.
+    gc.freeze()
+    server.log.info(f"Serving with {workers} workers x {worker_threads} BLAS threads")
+
+
+def post_fork(server, worker):
+    from threadpoolctl import threadpool_limits  # installed with scikit-learn
+
+    # Catches thread pools that were already initialised before the env vars took effect
+    threadpool_limits(limits=worker_threads)
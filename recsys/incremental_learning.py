@@ -7,6 +7,10 @@ from sklearn.metrics import mean_squared_error, precision_score, recall_score, f
 from implicit.als import AlternatingLeastSquares
 import os
 
+from app.bundle import orient_model
+from app.fold_in import fold_in
+from app.scoring import score_pairs
+
 # --- File paths for saved model and encoders ---
 MODEL_DIR = "models"
 MODEL_FILE = os.path.join(MODEL_DIR, "als_model.pkl")
@@ -30,18 +34,15 @@ def load_model_and_encoders():
     with open(USER_ITEMS_FILE, "rb") as f:
         user_items_csr = pickle.load(f)
     
+    model = orient_model(model, len(user_enc.classes_), len(product_enc.classes_))
     return model, user_enc, product_enc, user_items_csr
 
 
 # function to predict ratings from user and product latent factors
 def predict_ratings(model, user_indices, product_indices):
-    preds = []
-    for u, p in zip(user_indices, product_indices):
-        if 0 <= u < model.user_factors.shape[0] and 0 <= p < model.item_factors.shape[0]:
-            preds.append(model.user_factors[u].dot(model.item_factors[p]))
-        else:
-            preds.append(0)
-    return np.array(preds)
+    # out-of-range pairs score 0
+    preds, _ = score_pairs(model.user_factors, model.item_factors, user_indices, product_indices)
+    return preds
 
 
 # --- Streamlit UI ---
@@ -110,10 +111,9 @@ if uploaded_file:
             (df_new[interaction_col], (df_new['user_encoded'], df_new['product_encoded'])),
             shape=user_items_csr.shape
         )
-        updated_matrix = user_items_csr + new_matrix.tocsr()
-
-        # incremental update of the model (re-fit on updated matrix)
-        model.fit(updated_matrix.T)
+        # incremental update of the model: re-solve only the users and products in the upload
+        result = fold_in(model, user_items_csr, new_matrix.tocsr())
+        st.write(f"🔁 Folded in **{len(result.users)}** users and **{len(result.items)}** products; all other factors unchanged.")
 
         # Predictions AFTER model update
         preds_after = predict_ratings(model, df_new['user_encoded'], df_new['product_encoded'])